@@ -0,0 +1,6 @@
+"""API > filters > __init__.py"""
+from .user import UserFilter
+
+# update the following list to allow classes to be available for import
+# this is very useful especially when using from .file import *
+__all__ = [UserFilter, ]
@@ -0,0 +1,50 @@
+"""API > filters > user.py"""
+# PYTHON IMPORTS
+import logging
+from sys import _getframe
+# DJANGO IMPORTS
+from django.contrib.auth import get_user_model
+# PLUGIN IMPORTS
+import django_filters
+# CORE IMPORTS
+from Core.models.profile import AGE_BANDS, age_band_label, age_q
+
+
+logger = logging.getLogger(__name__)
+USER_MODEL = get_user_model()
+AGE_BAND_CHOICES = [
+    (age_band_label(low, high), age_band_label(low, high))
+    for low, high in AGE_BANDS
+]
+
+
+class UserFilter(django_filters.FilterSet):
+    """Filters users by account and profile fields
+    Ages are translated into birthday range predicates, ex: ?age_min=18"""
+    age = django_filters.RangeFilter(method='filter_age')
+    age_band = django_filters.ChoiceFilter(
+        choices=AGE_BAND_CHOICES, method='filter_age_band'
+    )
+    gender = django_filters.CharFilter(field_name='profile__gender')
+
+    class Meta:
+        """Meta class"""
+        model = USER_MODEL
+        fields = ('is_active', 'is_staff', )
+
+    def filter_age(self, queryset, name, value):
+        """Filters by age range, both bounds inclusive"""
+        min_age = int(value.start) if value.start is not None else None
+        max_age = int(value.stop) if value.stop is not None else None
+        logger.debug(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"Filtering ages between {min_age} and {max_age}"
+        )
+        return queryset.filter(age_q(min_age, max_age, 'profile__birthday'))
+
+    def filter_age_band(self, queryset, name, value):
+        """Filters by one of the AGE_BANDS labels"""
+        for low, high in AGE_BANDS:
+            if age_band_label(low, high) == value:
+                return queryset.filter(age_q(low, high, 'profile__birthday'))
+        return queryset
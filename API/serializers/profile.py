@@ -3,20 +3,39 @@
 from rest_framework import serializers
 # CORE IMPORTS
 from Core.models import Profile
+from Core.renditions import rendition_urls
+
+
+class RenditionsField(serializers.ReadOnlyField):
+    """URLs of the profile image renditions by size and format
+    ex: {"thumb": {"jpeg": "...", "webp": "..."}}, empty until generated"""
+
+    def __init__(self, **kwargs):
+        """init, reads from the whole profile"""
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        """Returns absolute rendition URLs when the request is known"""
+        return rendition_urls(value, self.context.get('request'))
 
 
 class ProfileSerializer(serializers.ModelSerializer):
     """Serializer for One-to-One Profile model"""
+    renditions = RenditionsField()
+
     class Meta:
         """Meta class"""
         model = Profile
-        fields = '__all__'
+        exclude = ('image_renditions', )
         read_only_fields = ('user', 'is_active', )
 
 
 class ImageSerializer(serializers.ModelSerializer):
     """Serializer for the Image field in the Profile model"""
+    renditions = RenditionsField()
+
     class Meta:
         """Meta class"""
         model = Profile
-        fields = ('image', )
+        fields = ('image', 'renditions', )
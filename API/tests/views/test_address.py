@@ -0,0 +1,51 @@
+"""API > tests > views > test_address.py"""
+# DJANGO IMPORTS
+from django.test import TestCase
+from django.urls import reverse
+# DRF IMPORTS
+from rest_framework import status
+from rest_framework.test import APIClient
+# CORE IMPORTS
+from Core.autocomplete import reset_address_index
+from Core.tests import samples, utils
+
+AUTOCOMPLETE_URL = reverse('api:address-autocomplete')
+
+
+class AddressAutocompleteAPITests(TestCase):
+    """Tests API for the address autocomplete endpoint"""
+    def setUp(self):
+        """setup the client"""
+        reset_address_index()
+        self.user = samples.sample_user()
+        self.client = APIClient()
+
+    @utils.suppress_warnings
+    def test_autocomplete_public(self):
+        """Tests autocomplete API for non-authenticated requests"""
+        response = self.client.get(AUTOCOMPLETE_URL, {'q': 'dha'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_autocomplete(self):
+        """Tests autocomplete API for districts"""
+        self.client.force_authenticate(self.user)
+        response = self.client.get(
+            AUTOCOMPLETE_URL, {'q': 'dha', 'field': 'district'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['field'], 'district')
+        self.assertEqual(response.data['results'][0]['value'], 'Dhaka')
+        self.assertIsNotNone(response.data['results'][0]['id'])
+
+    @utils.suppress_warnings
+    def test_autocomplete_invalid(self):
+        """Tests autocomplete API with an invalid field"""
+        self.client.force_authenticate(self.user)
+        response = self.client.get(
+            AUTOCOMPLETE_URL, {'q': 'dha', 'field': 'address'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def tearDown(self):
+        """cleanup"""
+        reset_address_index()
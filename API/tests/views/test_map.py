@@ -0,0 +1,183 @@
+"""API > tests > views > test_map.py"""
+# PYTHON IMPORTS
+import json
+# DJANGO IMPORTS
+from django.test import TestCase, override_settings
+from django.urls import reverse
+# DRF IMPORTS
+from rest_framework import status
+from rest_framework.test import APIClient
+# CORE IMPORTS
+from Core.models import Profile
+from Core.spatial_index import reset_spatial_index
+from Core.tests import samples, utils
+
+MAP_URL = reverse('api:map-profiles')
+REGIONS_URL = reverse('api:map-regions')
+NEAREST_URL = reverse('api:map-nearest')
+CHECK_URL = reverse('api:map-nearest-check')
+BANGLADESH = '88.0,20.5,92.7,26.7'
+
+
+def get_features(response):
+    """Returns the features of a streamed GeoJSON response"""
+    content = b''.join(response.streaming_content)
+    return json.loads(content)['features']
+
+
+class ProfileMapAPITests(TestCase):
+    """Tests API for the profile map endpoint"""
+    def setUp(self):
+        """setup the client and located profiles"""
+        locations = [
+            (23.7461, 90.3742), (23.7925, 90.4078), (22.3569, 91.7832)
+        ]
+        for i, location in enumerate(locations):
+            user = samples.sample_user(f'user{i}@email.com')
+            user.profile.set_location(*location)
+            user.profile.gender = 'F' if i else 'M'
+            user.profile.save()
+        self.client = APIClient()
+        self.client.force_authenticate(samples.sample_staffuser())
+
+    @utils.suppress_warnings
+    def test_map_normal_user(self):
+        """Tests map API is restricted to staff users"""
+        self.client.force_authenticate(samples.sample_user())
+        response = self.client.get(MAP_URL, {'bbox': BANGLADESH, 'zoom': 7})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_map_clusters(self):
+        """Tests map API clusters profiles at country level"""
+        response = self.client.get(MAP_URL, {'bbox': BANGLADESH, 'zoom': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/geo+json')
+        features = get_features(response)
+        self.assertEqual(
+            sorted(f['properties']['count'] for f in features), [1, 2]
+        )
+        self.assertTrue(all(f['properties']['cluster'] for f in features))
+
+    def test_map_points(self):
+        """Tests map API returns profiles at street level"""
+        response = self.client.get(
+            MAP_URL, {'bbox': '90.3,23.7,90.5,23.8', 'zoom': 16}
+        )
+        features = get_features(response)
+        self.assertEqual(len(features), 2)
+        self.assertFalse(features[0]['properties']['cluster'])
+
+    @override_settings(MAP_MAX_POINTS=1)
+    def test_map_points_limit(self):
+        """Tests map API clusters street level boxes with too many points"""
+        response = self.client.get(
+            MAP_URL, {'bbox': '90.3,23.7,90.5,23.8', 'zoom': 16}
+        )
+        features = get_features(response)
+        self.assertEqual(
+            sum(f['properties']['count'] for f in features), 2
+        )
+        self.assertTrue(all(f['properties']['cluster'] for f in features))
+        self.assertEqual({len(f['properties']['cell']) for f in features}, {7})
+
+    @utils.suppress_warnings
+    def test_map_invalid_bbox(self):
+        """Tests map API with an invalid bounding box"""
+        response = self.client.get(MAP_URL, {'bbox': '1,2,3', 'zoom': 5})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_density_tile(self):
+        """Tests density tile API counts profiles per grid cell"""
+        url = reverse('api:map-tile', args=[5, 24, 13])  # Bangladesh
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sum(f['properties']['count'] for f in response.data['features']),
+            3
+        )
+        response = self.client.get(url, {'gender': 'M'})
+        self.assertEqual(
+            sum(f['properties']['count'] for f in response.data['features']),
+            1
+        )
+
+    @utils.suppress_warnings
+    def test_density_tile_out_of_range(self):
+        """Tests density tile API with an invalid tile"""
+        url = reverse('api:map-tile', args=[1, 2, 0])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_density_regions(self):
+        """Tests region density API counts profiles per district"""
+        for profile in Profile.objects.filter(user__email__startswith='user'):
+            profile.district = 'Dhaka'
+            profile.save()
+        response = self.client.get(REGIONS_URL, {'level': 'district'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['name'], 'Dhaka')
+        self.assertEqual(response.data['results'][0]['count'], 3)
+
+        response = self.client.get(REGIONS_URL, {'level': 'division'})
+        self.assertEqual(response.data['results'][0]['count'], 3)
+
+    def test_nearest_database(self):
+        """Tests nearest API without the spatial index"""
+        response = self.client.get(NEAREST_URL, {'lat': 23.8, 'lng': 90.4})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]['latitude'], 23.7925)
+        self.assertLess(results[0]['distance'], results[1]['distance'])
+
+    @override_settings(SPATIAL_INDEX_ENABLED=True)
+    def test_nearest_index(self):
+        """Tests nearest API from the spatial index, updated by signals"""
+        reset_spatial_index()
+        self.addCleanup(reset_spatial_index)
+        params = {'lat': 22.3, 'lng': 91.8, 'k': 2}
+        response = self.client.get(NEAREST_URL, params)
+        results = response.data['results']
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['latitude'], 22.3569)
+
+        profile = Profile.objects.get(latitude=23.7461)
+        profile.set_location(22.31, 91.8)
+        profile.save()
+        response = self.client.get(NEAREST_URL, params)
+        self.assertEqual(response.data['results'][0]['id'], profile.pk)
+
+        profile.user.delete()
+        response = self.client.get(NEAREST_URL, params)
+        ids = [r['id'] for r in response.data['results']]
+        self.assertNotIn(profile.pk, ids)
+
+    @override_settings(SPATIAL_INDEX_ENABLED=True)
+    def test_nearest_index_check(self):
+        """Tests the check of the process index against the database"""
+        reset_spatial_index()
+        self.addCleanup(reset_spatial_index)
+        response = self.client.get(CHECK_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['consistent'])
+
+        # moved without the signals updating the process index
+        profile = Profile.objects.get(latitude=23.7461)
+        Profile.objects.filter(pk=profile.pk).update(
+            latitude=23.0, longitude=91.0
+        )
+        response = self.client.get(CHECK_URL)
+        self.assertFalse(response.data['consistent'])
+        self.assertEqual(response.data['stale'], [profile.pk])
+
+    @utils.suppress_warnings
+    def test_nearest_index_disabled(self):
+        """Tests the index check without spatial index"""
+        response = self.client.get(CHECK_URL)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @utils.suppress_warnings
+    def test_nearest_invalid(self):
+        """Tests nearest API with invalid coordinates"""
+        response = self.client.get(NEAREST_URL, {'lat': 95, 'lng': 90.4})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
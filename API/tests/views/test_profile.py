@@ -3,15 +3,18 @@
 import io
 import os
 import tempfile
+from unittest.mock import patch
 from PIL import Image
 # DJANGO IMPORTS
 from django.conf import settings
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 # DRF IMPORTS
 from rest_framework import status
 from rest_framework.test import APIClient
 # CORE IMPORTS
+from Core.renditions import available_formats
+from Core.tasks import generate_profile_renditions
 from Core.tests import samples, utils
 
 
@@ -116,6 +119,52 @@ class PrivateImageUploadAPITests(TestCase):
         if os.path.exists(path):
             os.remove(path)
 
+    def test_image_renditions(self):
+        """Tests rendition URLs after the renditions task ran"""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        with override_settings(MEDIA_ROOT=media.name), patch(
+            'Core.tasks.generate_profile_renditions.delay',
+            side_effect=generate_profile_renditions
+        ), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                get_image_upload_url(self.user.pk),
+                data={'image': self.image_file}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['renditions'], {})  # not yet
+
+        response = self.client.get(get_image_upload_url(self.user.pk))
+        renditions = response.data['renditions']
+        self.assertEqual(set(renditions), set(settings.IMAGE_RENDITIONS))
+        self.assertEqual(list(renditions['thumb']), available_formats())
+        self.assertTrue(renditions['thumb']['jpeg'].startswith('http'))
+        self.assertTrue(renditions['thumb']['jpeg'].endswith('.jpg'))
+
+    @utils.suppress_warnings
+    def test_invalid_image(self):
+        """Tests API rejects files which are not images"""
+        file = io.BytesIO(b'%PDF-1.4' + b'0' * 4096)
+        file.name = 'django_api_test_image.png'
+        with self.assertLogs('Core.uploads', 'WARNING'):
+            response = self.client.patch(
+                get_image_upload_url(self.user.pk), data={'image': file}
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('valid image', response.data['detail'])
+
+    @utils.suppress_warnings
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=50 * 50)
+    def test_image_pixel_limit(self):
+        """Tests API rejects images over the pixel limit"""
+        with self.assertLogs('Core.uploads', 'WARNING'):
+            response = self.client.patch(
+                get_image_upload_url(self.user.pk),
+                data={'image': self.image_file}  # 100 x 100
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pixels', response.data['detail'])
+
     def tearDown(self):
         """Reset settings and delete temporary files"""
         settings.MEDIA_ROOT = self.media_dir
@@ -0,0 +1,63 @@
+"""API > tests > views > test_stats.py"""
+# DJANGO IMPORTS
+from django.test import TestCase
+from django.urls import reverse
+# DRF IMPORTS
+from rest_framework import status
+from rest_framework.test import APIClient
+# CORE IMPORTS
+from Core.models.stats import refresh_region_stats
+from Core.tests import samples, utils
+
+STATS_URL = reverse('api:stats-regions')
+
+
+class RegionStatsAPITests(TestCase):
+    """Tests API for the region statistics endpoint"""
+    def setUp(self):
+        """setup the client and refreshed statistics"""
+        for i, (district, gender) in enumerate([
+            ('Dhaka', 'M'), ('Dhaka', 'F'), ('Chittagong', 'M'),
+        ]):
+            user = samples.sample_user(f'user{i}@email.com')
+            user.profile.district = district
+            user.profile.gender = gender
+            user.profile.save()
+        staff = samples.sample_staffuser()
+        staff.profile.gender = 'F'
+        staff.profile.save()
+        refresh_region_stats()
+        self.client = APIClient()
+        self.client.force_authenticate(staff)
+
+    @utils.suppress_warnings
+    def test_stats_normal_user(self):
+        """Tests statistics API is restricted to staff users"""
+        self.client.force_authenticate(samples.sample_user())
+        response = self.client.get(STATS_URL)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stats_divisions(self):
+        """Tests profile counts per division"""
+        response = self.client.get(STATS_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(response.data['refreshed_at'])
+        counts = {r['name']: r['count'] for r in response.data['results']}
+        self.assertEqual(counts, {'Dhaka': 2, 'Chittagong': 1, None: 1})
+
+    def test_stats_group_by(self):
+        """Tests profile counts per district split by gender"""
+        response = self.client.get(STATS_URL, {
+            'level': 'district', 'group_by': 'gender', 'gender': 'M',
+        })
+        counts = {
+            (r['name'], r['gender']): r['count']
+            for r in response.data['results']
+        }
+        self.assertEqual(counts, {('Dhaka', 'M'): 1, ('Chittagong', 'M'): 1})
+
+    @utils.suppress_warnings
+    def test_stats_invalid_group_by(self):
+        """Tests statistics API with an invalid group_by field"""
+        response = self.client.get(STATS_URL, {'group_by': 'gender,nid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
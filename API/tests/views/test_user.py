@@ -1,4 +1,9 @@
 """API > tests > views > user.py"""
+# PYTHON IMPORTS
+import csv
+import gzip
+import io
+import json
 # DJANGO IMPORTS
 from django.contrib.auth import get_user_model
 from django.test import TestCase
@@ -7,11 +12,13 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 # CORE IMPORTS
+from Core.models.profile import years_ago
 from Core.tests import samples, utils
 
 LOGIN_URL = reverse('api:auth-login')
 SIGNUP_URL = reverse('api:auth-signup')
 USERS_URL = reverse('api:user-list')
+EXPORT_URL = reverse('api:user-export')
 
 
 def get_detail_url(pk):
@@ -81,6 +88,12 @@ class PrivateUserAPITests(TestCase):
         response = self.client.get(USERS_URL)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    @utils.suppress_warnings
+    def test_user_export(self):
+        """Tests user export API for normal user"""
+        response = self.client.get(EXPORT_URL)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
     def test_user_detail_self(self):
         """Tests user detail API of self for normal user"""
         response = self.client.get(get_detail_url(self.user.pk))
@@ -160,6 +173,60 @@ class PrivateStaffAPITests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 3)
 
+    def test_user_list_age_filter(self):
+        """Tests user list API filtered by age for staff user"""
+        for i, age in enumerate((20, 30, 40)):
+            user = samples.sample_user(f'test{i}@email.com', 'te$tpwd1')
+            user.profile.birthday = years_ago(age)
+            user.profile.save()
+        response = self.client.get(USERS_URL, {'age_min': 25, 'age_max': 40})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+        response = self.client.get(USERS_URL, {'age_band': '18-24'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['email'], 'test0@email.com')
+
+    def test_user_export(self):
+        """Tests streaming user export API as CSV, NDJSON and gzip"""
+        user = samples.sample_user('test1@email.com', 'te$tpwd1')
+        user.profile.gender = 'F'
+        user.profile.birthday = years_ago(30)
+        user.profile.save()
+
+        response = self.client.get(EXPORT_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn('users.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([r['email'] for r in rows],
+                         [self.user.email, user.email])
+        self.assertEqual(rows[1]['gender'], 'F')
+
+        response = self.client.get(
+            EXPORT_URL, {'file_format': 'ndjson', 'gender': 'F'}
+        )
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(
+            json.loads(lines[0])['birthday'], str(years_ago(30))
+        )
+
+        response = self.client.get(EXPORT_URL, {'compress': 'true'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)).decode(),
+            content
+        )
+
+    @utils.suppress_warnings
+    def test_user_export_invalid(self):
+        """Tests user export API rejects unknown formats"""
+        response = self.client.get(EXPORT_URL, {'file_format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_user_detail_self(self):
         """Tests user detail API of self for staff user"""
         response = self.client.get(get_detail_url(self.user.pk))
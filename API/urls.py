@@ -23,6 +23,37 @@ urlpatterns = [
         name='profile-image'
     ),
 
+    # address
+    path(
+        'address/autocomplete/',
+        views.AddressAutocompleteView.as_view(),
+        name='address-autocomplete'
+    ),
+
+    # map
+    path('map/profiles/', views.ProfileMapView.as_view(), name='map-profiles'),
+    path(
+        'map/tiles/<int:zoom>/<int:x>/<int:y>/',
+        views.DensityTileView.as_view(),
+        name='map-tile'
+    ),
+    path(
+        'map/regions/', views.RegionDensityView.as_view(), name='map-regions'
+    ),
+    path(
+        'map/nearest/', views.NearestProfileView.as_view(), name='map-nearest'
+    ),
+    path(
+        'map/nearest/check/', views.SpatialIndexCheckView.as_view(),
+        name='map-nearest-check'
+    ),
+
+    # statistics
+    path(
+        'stats/regions/', views.RegionStatsView.as_view(),
+        name='stats-regions'
+    ),
+
     # auth --------------------------------------------------------------------
     path('auth/signup/', views.UserCreateView.as_view(), name='auth-signup'),
     path('auth/login/', views.ObtainTokenView.as_view(), name='auth-login'),
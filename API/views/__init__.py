@@ -1,10 +1,19 @@
 """API > views > __init__.py"""
+from .address import AddressAutocompleteView
+from .map import (
+    ProfileMapView, DensityTileView, RegionDensityView, NearestProfileView,
+    SpatialIndexCheckView
+)
 from .profile import ImageUploadAPI
+from .stats import RegionStatsView
 from .user import UserCreateView, UserViewSet
 from .token import ObtainTokenView, LogoutView
 
 # update the following list to allow classes to be available for import
 # this is very useful especially when using from .file import *
 __all__ = [
-    ImageUploadAPI, UserCreateView, UserViewSet, ObtainTokenView, LogoutView
+    ImageUploadAPI, UserCreateView, UserViewSet, ObtainTokenView, LogoutView,
+    AddressAutocompleteView, ProfileMapView, DensityTileView,
+    RegionDensityView, NearestProfileView, RegionStatsView,
+    SpatialIndexCheckView
 ]
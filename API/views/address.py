@@ -0,0 +1,45 @@
+"""API > views > address.py"""
+# PYTHON IMPORTS
+import logging
+from sys import _getframe
+# DRF IMPORTS
+from rest_framework import serializers, views
+from rest_framework.response import Response
+# CORE IMPORTS
+from Core.autocomplete import ADDRESS_FIELDS, get_address_index
+
+
+logger = logging.getLogger(__name__)
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    """Validates address autocomplete query parameters"""
+    q = serializers.CharField(max_length=255, trim_whitespace=False)
+    field = serializers.ChoiceField(choices=ADDRESS_FIELDS, default='thana')
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
+class AddressAutocompleteView(views.APIView):
+    """Completes division, district, thana and postal code prefixes
+    Served from the in-memory address index, ex: ?field=thana&q=dhan"""
+    # authentication_classes = ()  # check defaults in settings
+    # permission_classes = ()  # check defaults in settings
+
+    def get(self, request, *args, **kwargs):
+        """GET method"""
+        params = AutocompleteQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        field, prefix, limit = (
+            params.validated_data[k] for k in ('field', 'q', 'limit')
+        )
+        logger.debug(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"Completing {field}: {prefix}"
+        )
+        results = [
+            {'value': value, 'id': place_id}
+            for value, place_id in get_address_index().complete(
+                field, prefix, limit
+            )
+        ]
+        return Response({'field': field, 'results': results})
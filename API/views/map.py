@@ -0,0 +1,286 @@
+"""API > views > map.py"""
+# PYTHON IMPORTS
+import json
+import logging
+from sys import _getframe
+# DJANGO IMPORTS
+from django.conf import settings
+from django.db.models import Q, Sum
+from django.http import StreamingHttpResponse
+# DRF IMPORTS
+from rest_framework import permissions, serializers, views
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+# CORE IMPORTS
+from Core import geo
+from Core.gazetteer import get_gazetteer
+from Core.models import CellDensity, Profile, RegionDensity
+from Core.models.density import REGION_LEVELS
+from Core.spatial_index import check_spatial_index, get_spatial_index
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+
+
+class BBoxField(serializers.CharField):
+    """Bounding box as "west,south,east,north" (GeoJSON bbox order)"""
+
+    def to_internal_value(self, data):
+        """Returns (south, west, north, east) floats"""
+        try:
+            west, south, east, north = (
+                float(v) for v in super().to_internal_value(data).split(',')
+            )
+        except ValueError:
+            raise serializers.ValidationError(
+                'Expected "west,south,east,north" coordinates'
+            )
+        if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+            raise serializers.ValidationError('Invalid bounding box')
+        return south, west, north, east
+
+
+class MapQuerySerializer(serializers.Serializer):
+    """Validates map query parameters"""
+    bbox = BBoxField()
+    zoom = serializers.IntegerField(min_value=0, max_value=22)
+
+
+class DensityQuerySerializer(serializers.Serializer):
+    """Validates density filter query parameters"""
+    gender = serializers.ChoiceField(
+        choices=['M', 'F', ''], required=False, allow_blank=True
+    )
+    is_active = serializers.BooleanField(
+        required=False, allow_null=True, default=None
+    )
+    level = serializers.ChoiceField(
+        choices=[level for level, field in REGION_LEVELS], default='district'
+    )
+
+    def filter(self, queryset):
+        """Returns the queryset filtered by gender and is_active"""
+        for key in ('gender', 'is_active'):
+            if self.validated_data.get(key) is not None:
+                queryset = queryset.filter(**{key: self.validated_data[key]})
+        return queryset
+
+
+class NearestQuerySerializer(serializers.Serializer):
+    """Validates nearest profiles query parameters"""
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    k = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+def feature(longitude, latitude, **properties):
+    """Returns a GeoJSON point feature"""
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [longitude, latitude]},
+        'properties': properties,
+    }
+
+
+def stream_feature_collection(features):
+    """Yields a GeoJSON FeatureCollection chunk by chunk"""
+    yield '{"type": "FeatureCollection", "features": ['
+    separator = ''
+    for item in features:
+        yield separator + json.dumps(item)
+        separator = ', '
+    yield ']}'
+
+
+class ProfileMapView(views.APIView):
+    """Streams profile locations within a bounding box as GeoJSON, clustered
+    by grid cells for the zoom level, ex: ?bbox=88,20.5,92.7,26.7&zoom=7
+    Street level boxes with more than MAP_MAX_POINTS profiles are clustered
+    by the finest grid cells instead"""
+    # authentication_classes = ()  # check defaults in settings
+    permission_classes = (permissions.IsAuthenticated, permissions.IsAdminUser)
+
+    def get(self, request, *args, **kwargs):
+        """GET method"""
+        params = MapQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        bbox = params.validated_data['bbox']
+        zoom = params.validated_data['zoom']
+        precision = geo.zoom_precision(zoom)
+        logger.debug(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"Map of {bbox} at zoom {zoom}, precision {precision}"
+        )
+        if precision:
+            features = self.clusters(bbox, precision)
+        else:
+            queryset = Profile.objects.in_bbox(*bbox)
+            if queryset[:settings.MAP_MAX_POINTS + 1].count() > \
+                    settings.MAP_MAX_POINTS:  # too many points to draw
+                features = self.clusters(bbox, max(geo.GRID_PRECISIONS))
+            else:
+                features = self.points(queryset)
+        return StreamingHttpResponse(
+            stream_feature_collection(features),
+            content_type='application/geo+json'
+        )
+
+    @staticmethod
+    def clusters(bbox, precision):
+        """Yields cluster features of the precomputed cell densities at the
+        centres of the grid cells intersecting the bounding box"""
+        cover, prefixes = geo.covering_cells(*bbox)
+        if cover >= precision:  # few cells of the precision cover the bbox
+            cell_q = Q(cell__in=geo.cells_at(*bbox, precision))
+        else:
+            cell_q = Q()
+            for prefix in prefixes:
+                cell_q |= Q(cell__startswith=prefix)
+        rows = CellDensity.objects.filter(
+            cell_q, precision=precision
+        ).values('cell').annotate(total=Sum('count')).filter(
+            total__gt=0
+        ).order_by()
+        south, west, north, east = geo.clamp_bbox(*bbox)
+        for row in rows.iterator(chunk_size=CHUNK_SIZE):
+            cell_south, cell_west, cell_north, cell_east = geo.decode_bbox(
+                row['cell']
+            )
+            if cell_north < south or cell_south > north or \
+                    cell_east < west or cell_west > east:
+                continue  # prefix cell outside the bbox
+            yield feature(
+                (cell_west + cell_east) / 2, (cell_south + cell_north) / 2,
+                cluster=True, cell=row['cell'], count=row['total']
+            )
+
+    @staticmethod
+    def points(queryset):
+        """Yields a feature per profile"""
+        rows = queryset.values_list('user_id', 'latitude', 'longitude')
+        for user_id, latitude, longitude in rows.iterator(
+            chunk_size=CHUNK_SIZE
+        ):
+            yield feature(longitude, latitude, cluster=False, id=user_id)
+
+
+class DensityTileView(views.APIView):
+    """Returns precomputed profile counts per grid cell of an XYZ map tile
+    as GeoJSON, optionally filtered by ?gender=M|F and ?is_active=true"""
+    # authentication_classes = ()  # check defaults in settings
+    permission_classes = (permissions.IsAuthenticated, permissions.IsAdminUser)
+
+    def get(self, request, zoom, x, y, *args, **kwargs):
+        """GET method"""
+        if zoom > 22 or max(x, y) >= 1 << zoom:
+            raise NotFound('Tile out of range')
+        params = DensityQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        precision = geo.zoom_precision(zoom) or max(geo.GRID_PRECISIONS)
+        logger.debug(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"Density tile {zoom}/{x}/{y}, precision {precision}"
+        )
+        cells = geo.cells_at(*geo.tile_bbox(zoom, x, y), precision)
+        rows = params.filter(CellDensity.objects.filter(
+            precision=precision, cell__in=cells
+        )).values('cell').annotate(total=Sum('count')).filter(
+            total__gt=0
+        ).order_by('cell')
+
+        features = []
+        for row in rows:
+            south, west, north, east = geo.decode_bbox(row['cell'])
+            features.append(feature(
+                (west + east) / 2, (south + north) / 2,
+                cell=row['cell'], count=row['total'],
+                bbox=[west, south, east, north],
+            ))
+        return Response({'type': 'FeatureCollection', 'features': features})
+
+
+class RegionDensityView(views.APIView):
+    """Returns precomputed profile counts per division, district or thana,
+    ex: ?level=district&gender=F"""
+    # authentication_classes = ()  # check defaults in settings
+    permission_classes = (permissions.IsAuthenticated, permissions.IsAdminUser)
+
+    def get(self, request, *args, **kwargs):
+        """GET method"""
+        params = DensityQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        level = params.validated_data['level']
+        rows = params.filter(RegionDensity.objects.filter(
+            level=level
+        )).values('code').annotate(total=Sum('count')).filter(
+            total__gt=0
+        ).order_by('code')
+
+        gazetteer, results = get_gazetteer(), []
+        for row in rows:
+            place = gazetteer.get(level, row['code'])
+            results.append({
+                'id': row['code'],
+                'name': place.name if place else None,
+                'latitude': place.latitude if place else None,
+                'longitude': place.longitude if place else None,
+                'count': row['total'],
+            })
+        return Response({'level': level, 'results': results})
+
+
+class NearestProfileView(views.APIView):
+    """Returns the k profiles nearest to a point, ex: ?lat=23.8&lng=90.4&k=5
+    Served from the in-process spatial index when enabled"""
+    # authentication_classes = ()  # check defaults in settings
+    permission_classes = (permissions.IsAuthenticated, permissions.IsAdminUser)
+
+    def get(self, request, *args, **kwargs):
+        """GET method"""
+        params = NearestQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        lat, lng, k = (
+            params.validated_data[key] for key in ('lat', 'lng', 'k')
+        )
+        index = get_spatial_index()
+        logger.debug(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"{k} nearest to ({lat}, {lng}) from the "
+            f"{'index' if index else 'database'}"
+        )
+        if index is not None:
+            rows = index.nearest(lat, lng, k)
+        else:
+            rows = Profile.objects.exclude(
+                longitude__isnull=True
+            ).with_distance(lat, lng).order_by('distance').values_list(
+                'distance', 'user_id', 'latitude', 'longitude'
+            )[:k]
+        return Response({'results': [{
+            'id': user_id, 'latitude': latitude, 'longitude': longitude,
+            'distance': round(distance, 3),
+        } for distance, user_id, latitude, longitude in rows]})
+
+
+class SpatialIndexCheckView(views.APIView):
+    """Compares the spatial index of the process serving the request, with
+    the changes it received through the signals, with the database
+    Each server process holds its own index"""
+    # authentication_classes = ()  # check defaults in settings
+    permission_classes = (permissions.IsAuthenticated, permissions.IsAdminUser)
+
+    def get(self, request, *args, **kwargs):
+        """GET method"""
+        report = check_spatial_index()
+        if report is None:
+            raise NotFound('Spatial index is not enabled')
+        logger.debug(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"Spatial index check: {report}"
+        )
+        return Response({
+            'consistent': not any(report.values()),
+            **{key: ids[:100] for key, ids in report.items()},
+        })
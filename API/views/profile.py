@@ -6,6 +6,7 @@ from sys import _getframe
 from rest_framework import generics
 # CORE IMPORTS
 from Core.models import Profile
+from Core.uploads import ImageUploadHandler
 # API IMPORTS
 from API.serializers import ImageSerializer
 
@@ -20,6 +21,12 @@ class ImageUploadAPI(generics.RetrieveUpdateAPIView):
     # authentication_classes = ()  # check defaults in settings
     # permission_classes = ()  # check defaults in settings
 
+    def initialize_request(self, request, *args, **kwargs):
+        """Streams uploads through the size capped image upload handler,
+        set before authentication may parse the body for the csrf token"""
+        request.upload_handlers = [ImageUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
     def retrieve(self, request, *args, **kwargs):
         """overriding to enable logging"""
         logger.debug(  # prints class and function name
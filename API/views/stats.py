@@ -0,0 +1,100 @@
+"""API > views > stats.py"""
+# PYTHON IMPORTS
+import logging
+from sys import _getframe
+# DRF IMPORTS
+from rest_framework import permissions, serializers, views
+from rest_framework.response import Response
+# CORE IMPORTS
+from Core.gazetteer import get_gazetteer
+from Core.models.density import REGION_LEVELS
+from Core.models.profile import AGE_BANDS, age_band_label
+from Core.models.stats import (
+    GROUP_FIELDS, region_stat_counts, stats_refreshed_at
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class GroupByField(serializers.CharField):
+    """Comma separated fields to split counts by, ex: gender,age_band"""
+
+    def to_internal_value(self, data):
+        """Returns a tuple of field names"""
+        fields = tuple(
+            f.strip() for f in super().to_internal_value(data).split(',')
+            if f.strip()
+        )
+        invalid = set(fields) - set(GROUP_FIELDS)
+        if invalid:
+            raise serializers.ValidationError(
+                f'Invalid fields: {", ".join(sorted(invalid))}'
+            )
+        return tuple(dict.fromkeys(fields))  # unique, in given order
+
+
+class StatsQuerySerializer(serializers.Serializer):
+    """Validates region statistics query parameters"""
+    level = serializers.ChoiceField(
+        choices=[level for level, field in REGION_LEVELS], default='division'
+    )
+    group_by = GroupByField(required=False, default=())
+    division = serializers.IntegerField(required=False, min_value=0)
+    district = serializers.IntegerField(required=False, min_value=0)
+    gender = serializers.ChoiceField(
+        choices=['M', 'F', ''], required=False, allow_blank=True
+    )
+    age_band = serializers.ChoiceField(
+        choices=[age_band_label(*band) for band in AGE_BANDS] + [''],
+        required=False, allow_blank=True
+    )
+    is_active = serializers.BooleanField(
+        required=False, allow_null=True, default=None
+    )
+
+    def filters(self):
+        """Returns RegionStat lookups of the given filters"""
+        data, codes = self.validated_data, dict(REGION_LEVELS)
+        lookups = {
+            key: data[key] for key in ('gender', 'age_band', 'is_active')
+            if data.get(key) is not None
+        }
+        for level in ('division', 'district'):
+            if data.get(level) is not None:
+                lookups[codes[level]] = data[level]
+        return lookups
+
+
+class RegionStatsView(views.APIView):
+    """Returns profile counts per division, district or thana, optionally
+    split by gender, age band and is_active, from the materialized region
+    statistics, ex: ?level=district&division=3&group_by=gender,age_band"""
+    # authentication_classes = ()  # check defaults in settings
+    permission_classes = (permissions.IsAuthenticated, permissions.IsAdminUser)
+
+    def get(self, request, *args, **kwargs):
+        """GET method"""
+        params = StatsQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        level = params.validated_data['level']
+        group_by = params.validated_data['group_by']
+        filters = params.filters()
+        logger.debug(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"Counts per {level} by {group_by} where {filters}"
+        )
+        code_field, gazetteer, results = dict(REGION_LEVELS)[level], \
+            get_gazetteer(), []
+        for row in region_stat_counts(level, group_by, **filters):
+            place = gazetteer.get(level, row.pop(code_field))
+            count = row.pop('total')
+            results.append({
+                'id': place.id if place else None,
+                'name': place.name if place else None,
+                **row, 'count': count,
+            })
+        return Response({
+            'level': level, 'refreshed_at': stats_refreshed_at(),
+            'results': results,
+        })
@@ -4,10 +4,15 @@ import logging
 from sys import _getframe
 # DJANGO IMPORTS
 from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
 # DRF IMPORTS
-from rest_framework import generics, permissions, viewsets
+from rest_framework import generics, permissions, serializers, viewsets
+from rest_framework.decorators import action
 # API IMPORTS
+from API.filters import UserFilter
 from API.serializers import UserSerializer
+# CORE IMPORTS
+from Core.exports import EXPORT_FORMATS, export_chunks
 
 
 logger = logging.getLogger(__name__)
@@ -29,6 +34,14 @@ class UserCreateView(generics.CreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
+class ExportQuerySerializer(serializers.Serializer):
+    """Validates user export query parameters"""
+    file_format = serializers.ChoiceField(
+        choices=list(EXPORT_FORMATS), default='csv'
+    )
+    compress = serializers.BooleanField(default=False)
+
+
 class UserViewSet(viewsets.ModelViewSet):
     """CRUD view set for User model and serializer"""
     queryset = USER_MODEL.objects.all()
@@ -36,6 +49,7 @@ class UserViewSet(viewsets.ModelViewSet):
     # authentication_classes = ()  # check defaults in settings
     # permission_classes = ()  # check defaults in settings
     # filter_backends = ()  # check defaults in settings
+    filterset_class = UserFilter
     search_field = ('email', 'first_name', 'last_name', 'phone')
     ordering_fields = ('id', 'email', 'first_name', 'last_name', 'phone')
     ordering = 'id'
@@ -44,6 +58,7 @@ class UserViewSet(viewsets.ModelViewSet):
         """Restrict normal users to only detail and update views"""
         if self.action == 'create' or \
                 self.action == 'list' or \
+                self.action == 'export' or \
                 self.action == 'destroy':
             return (  # execute the function, example: IsAdminUser()
                 permissions.IsAuthenticated(),
@@ -104,3 +119,27 @@ class UserViewSet(viewsets.ModelViewSet):
             f"Deleting user... {self.lookup_field}={kwargs[self.lookup_field]}"
         )
         return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request, *args, **kwargs):
+        """Streams the filtered users and profiles as CSV or NDJSON, gzipped
+        with ?compress=true, ex: ?file_format=ndjson&gender=F"""
+        params = ExportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        file_format = params.validated_data['file_format']
+        compress = params.validated_data['compress']
+        logger.debug(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"Exporting users as {file_format}..."
+        )
+        queryset = self.filter_queryset(self.get_queryset())
+        extension, content_type = EXPORT_FORMATS[file_format]
+        if compress:
+            extension, content_type = f'{extension}.gz', 'application/gzip'
+        response = StreamingHttpResponse(
+            export_chunks(queryset, file_format, compress),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="users.{extension}"'
+        return response
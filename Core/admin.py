@@ -1,30 +1,78 @@
 """Core > admin.py"""
 # PYTHON IMPORTS
 import logging
+import posixpath
+from functools import lru_cache
+from itertools import islice
 # DJANGO IMPORTS
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.admin.models import LogEntry, DELETION
+from django.contrib.admin.utils import quote
+from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth.admin import UserAdmin
-from django.urls import reverse
-from django.utils.html import escape
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Sum
+from django.http import FileResponse, Http404, HttpRequest, QueryDict
+from django.shortcuts import get_object_or_404, redirect
+from django.urls import NoReverseMatch, get_script_prefix, path, reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.http import urlencode
 from django.utils.safestring import mark_safe
 # PLUGIN IMPORTS
-from import_export import resources
 from import_export.admin import (
-    ImportExportModelAdmin, ImportExportActionModelAdmin)
+    ExportActionMixin, ImportExportModelAdmin, ImportExportActionModelAdmin)
+from import_export.formats import base_formats
+from import_export.forms import ExportForm, ImportForm
 # PROJECT IMPORTS
 from Core import models
+from Core.archive import archived_entries
+from Core.gazetteer import DIVISION, get_gazetteer
+from Core.models.stats import region_stat_counts, stats_refreshed_at
+from Core.paginators import EstimatedCountPaginator
+from Core.resources import UserResource
 
 logger = logging.getLogger(__name__)
 
 
+PK_PLACEHOLDER = '__pk__'
+
+
+@lru_cache(maxsize=None)
+def change_url_pattern(app_label, model_name, script_prefix):
+    """Returns the admin change url of a model with PK_PLACEHOLDER for the
+    object id, reversed once per model instead of once per row
+    None when the model is not registered"""
+    try:
+        return reverse(f'admin:{app_label}_{model_name}_change',
+                       args=[PK_PLACEHOLDER])
+    except NoReverseMatch:
+        return None
+
+
+def change_url(app_label, model_name, object_id):
+    """Returns the admin change url of an object, None when the model is
+    not registered"""
+    pattern = change_url_pattern(app_label, model_name, get_script_prefix())
+    return pattern and pattern.replace(PK_PLACEHOLDER, quote(str(object_id)))
+
+
+class FastChangeListMixin:
+    """Changelist of large tables: counts are estimated above
+    settings.ADMIN_COUNT_ESTIMATE_THRESHOLD and the unfiltered total is not
+    counted on filtered pages"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
 @admin.register(LogEntry)
-class LogEntryAdmin(admin.ModelAdmin):
+class LogEntryAdmin(FastChangeListMixin, admin.ModelAdmin):
     """Django Admin Log Entries"""
-    date_hierarchy = 'action_time'
+    date_hierarchy = 'action_time'  # read from DailyCount
     list_display = ('action_time', 'user_link', 'content_type', 'object_link',
                     'action_flag', 'change_message')
     list_filter = ('action_flag', 'content_type')
+    list_select_related = ('user', 'content_type')
     search_fields = ('user__first_name', 'user__last_name', 'user__email',
                      'user__phone', 'object_repr', 'change_message')
 
@@ -46,36 +94,71 @@ class LogEntryAdmin(admin.ModelAdmin):
 
     def user_link(self, obj):
         """Show link to the User"""
-        try:
-            url = reverse('admin:core_user_change', args=[obj.user_id])
-            link = f'<a href="{url}">{escape(obj.user)}</a>'
-        except Exception as e:
-            logger.debug(e)
-            link = escape(obj.user)
-        return mark_safe(link)
+        opts = obj.user._meta
+        url = change_url(opts.app_label, opts.model_name, obj.user_id)
+        if url is None:
+            return obj.user
+        return format_html('<a href="{}">{}</a>', url, obj.user)
 
     user_link.admin_order_field = "user"
     user_link.short_description = "user"
 
     def object_link(self, obj):
         """Show link to the object"""
-        if obj.action_flag == DELETION:
-            link = escape(obj.object_repr)
-        else:
-            try:
-                ct = obj.content_type
-                url = reverse(f'admin:{ct.app_label}_{ct.model}_change',
-                              args=[obj.object_id])
-                link = f'<a href="{url}">{escape(obj.object_repr)}</a>'
-            except Exception as e:
-                logger.debug(e)
-                link = escape(obj.object_repr)
-        return mark_safe(link)
+        ct = obj.content_type
+        url = None if obj.action_flag == DELETION or ct is None else \
+            change_url(ct.app_label, ct.model, obj.object_id)
+        if url is None:
+            return obj.object_repr
+        return format_html('<a href="{}">{}</a>', url, obj.object_repr)
 
     object_link.admin_order_field = "object_repr"
     object_link.short_description = "object"
 
 
+@admin.register(models.LogArchive)
+class LogArchiveAdmin(admin.ModelAdmin):
+    """Read only list of the archived batches of admin log entries"""
+    MAX_DISPLAY = 1000  # entries shown on the archive page
+    date_hierarchy = 'first_action_time'
+    list_display = (
+        '__str__', 'first_action_time', 'last_action_time', 'count', 'size',
+        'created_at',
+    )
+    exclude = ('data', )
+    readonly_fields = ('entries_display', )
+
+    def has_add_permission(self, request):
+        """Permission to ADD a LogArchive"""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Permission to CHANGE a LogArchive"""
+        return False
+
+    def has_view_permission(self, request, obj=None):
+        """Permission to VIEW a LogArchive"""
+        return request.user.is_superuser
+
+    def entries_display(self, obj):
+        """Show the archived entries, one per line"""
+        flags = dict(LogEntry._meta.get_field('action_flag').choices)
+        lines = [
+            f"{entry['action_time']} {entry['user'] or entry['user_id']} "
+            f"{flags.get(entry['action_flag'], entry['action_flag'])} "
+            f"{entry['app_label']}.{entry['content_type']} "
+            f"{entry['object_repr']}: {entry['change_message']}"
+            for entry in islice(archived_entries(obj), self.MAX_DISPLAY)
+        ]
+        if obj.count > len(lines):
+            lines.append(f"... {obj.count - len(lines)} more entries")
+        return format_html_join(
+            mark_safe('<br>'), '{}', ((line, ) for line in lines)
+        )
+
+    entries_display.short_description = "entries"
+
+
 class ProfileInline(admin.StackedInline):
     """Stacked inline profile view under User model"""
     model = models.Profile
@@ -85,21 +168,193 @@ class ProfileInline(admin.StackedInline):
     verbose_name_plural = 'Profile'
 
 
-class UserResource(resources.ModelResource):
-    """
-    User model import_export resource
-    https://django-import-export.readthedocs.io/en/stable/index.html
-    """
-    class Meta:
-        """Meta class"""
-        model = models.User
+def queue_job(task, job_model, job_id):
+    """Queues an import or export job, marks it failed when it cannot be
+    queued"""
+    try:
+        task.delay(job_id)
+    except Exception as e:  # broker down
+        logger.error(e)
+        job_model.objects.filter(pk=job_id).update(
+            status=job_model.FAILED, error=str(e)
+        )
+
+
+def queue_export(job_id):
+    """Queues an export job"""
+    from Core.tasks import export_users
+    queue_job(export_users, models.ExportJob, job_id)
+
+
+def queue_import(job_id):
+    """Queues an import job"""
+    from Core.tasks import import_users
+    queue_job(import_users, models.ImportJob, job_id)
+
+
+def import_summary(job):
+    """Returns the created, updated and failed row counts of an import"""
+    return f"{job.created} created, {job.updated} updated, " \
+        f"{job.failed} failed"
+
+
+def notify_finished_jobs(request):
+    """Shows the user's import and export jobs finished since last
+    notified"""
+    for job_model in (models.ExportJob, models.ImportJob):
+        name = job_model._meta.verbose_name.split()[0].capitalize()
+        jobs = list(job_model.objects.filter(
+            requested_by=request.user, notified=False,
+            status__in=(job_model.DONE, job_model.FAILED)
+        ))
+        for job in jobs:
+            if job.status == job_model.FAILED:
+                messages.error(
+                    request, f"{name} #{job.pk} failed: {job.error}"
+                )
+            elif job_model is models.ExportJob:
+                messages.success(request, format_html(
+                    'Export #{} is ready: <a href="{}">download</a>',
+                    job.pk, download_url(job)
+                ))
+            elif job.failed:
+                url = reverse('admin:Core_importjob_change', args=[job.pk])
+                messages.warning(request, format_html(
+                    'Import #{} finished: {}, <a href="{}">see errors</a>',
+                    job.pk, import_summary(job), url
+                ))
+            else:
+                messages.success(request, f"Import #{job.pk} finished: "
+                                          f"{import_summary(job)}")
+        job_model.objects.filter(pk__in=[j.pk for j in jobs]).update(
+            notified=True
+        )
+
+
+def download_url(job):
+    """Returns the admin download url of an export job file"""
+    return reverse('admin:Core_exportjob_download', args=[job.pk])
+
+
+def changelist_queryset(model, user, query):
+    """Returns the queryset of a model's admin changelist as shown to user,
+    filtered and searched by the GET parameters query, {param: [values]}
+    ex: rebuilt by the export task"""
+    request = HttpRequest()
+    request.method = 'GET'
+    request.GET = QueryDict(urlencode(query, doseq=True))
+    request.user = user or AnonymousUser()
+    return admin.site._registry[model].get_export_queryset(request)
+
+
+def job_changelist(job_model):
+    """Redirects to the admin list of a job model"""
+    opts = job_model._meta
+    return redirect(f'admin:{opts.app_label}_{opts.model_name}_changelist')
+
+
+class BackgroundExportMixin:
+    """Runs import-export exports in the export_users celery task, writing
+    the file row by row, instead of building it in the admin request"""
+    actions = ['export_admin_action']
+
+    def get_export_formats(self):
+        """Formats the export task writes incrementally"""
+        return [base_formats.CSV, base_formats.XLSX]
+
+    def start_export(self, request, queryset, file_format, query=None):
+        """Creates and queues an export job, redirects to the jobs list
+        A changelist is exported by its GET parameters query, its queryset
+        rebuilt by the task, selected rows by their ids"""
+        if not self.has_export_permission(request):
+            raise PermissionDenied
+        job = models.ExportJob.objects.create(
+            requested_by=request.user,
+            file_format=file_format.get_extension(),
+            pks=None if query is not None else list(
+                queryset.order_by('pk').values_list('pk', flat=True)
+            ),
+            query=query,
+        )
+        transaction.on_commit(lambda: queue_export(job.pk))
+        self.message_user(
+            request, f"Export #{job.pk} started, you will be notified here "
+            f"when it is ready"
+        )
+        return job_changelist(models.ExportJob)
+
+    def export_action(self, request, *args, **kwargs):
+        """Overriding to export the filtered changelist in the background"""
+        formats = self.get_export_formats()
+        form = ExportForm(formats, request.POST or None)
+        if not form.is_valid():  # renders the format form
+            return super().export_action(request, *args, **kwargs)
+        file_format = formats[int(form.cleaned_data['file_format'])]()
+        return self.start_export(
+            request, None, file_format, dict(request.GET.lists())
+        )
+
+    def export_admin_action(self, request, queryset):
+        """Overriding to export the selected rows in the background"""
+        export_format = request.POST.get('file_format')
+        if not export_format:  # warns about the missing format
+            return super().export_admin_action(request, queryset)
+        file_format = self.get_export_formats()[int(export_format)]()
+        query = None
+        if request.POST.get('select_across') == '1':  # the whole changelist
+            query = dict(request.GET.lists())
+        return self.start_export(request, queryset, file_format, query)
+
+    export_admin_action.short_description = \
+        ExportActionMixin.export_admin_action.short_description
+
+    def changelist_view(self, request, extra_context=None):
+        """Overriding to show finished imports and exports"""
+        notify_finished_jobs(request)
+        return super().changelist_view(request, extra_context)
+
+
+class BackgroundImportMixin:
+    """Runs import-export imports in the import_users celery task, reading
+    the uploaded file in chunks, instead of in the admin request"""
+
+    def get_import_formats(self):
+        """Formats the import task reads as a stream"""
+        return [base_formats.CSV, base_formats.XLSX]
+
+    def import_action(self, request, *args, **kwargs):
+        """Overriding to save the uploaded file in an import job, imported
+        in the background without the dry run and confirmation steps"""
+        if not self.has_import_permission(request):
+            raise PermissionDenied
+        formats = self.get_import_formats()
+        form = ImportForm(formats, request.POST or None, request.FILES or None)
+        if not (request.POST and form.is_valid()):  # renders the upload form
+            return super().import_action(request, *args, **kwargs)
+        file_format = formats[int(form.cleaned_data['input_format'])]()
+        job = models.ImportJob(
+            requested_by=request.user, file_format=file_format.get_extension()
+        )
+        job.file.save(
+            form.cleaned_data['import_file'].name,
+            form.cleaned_data['import_file']
+        )
+        transaction.on_commit(lambda: queue_import(job.pk))
+        self.message_user(
+            request, f"Import #{job.pk} started, you will be notified here "
+            f"when it is finished"
+        )
+        return job_changelist(models.ImportJob)
 
 
 @admin.register(models.User)
 class UserAdmin(
+    FastChangeListMixin, BackgroundImportMixin, BackgroundExportMixin,
     ImportExportActionModelAdmin, ImportExportModelAdmin, UserAdmin
 ):
     """Admin for User model"""
+    change_list_template = 'admin/Core/user/change_list.html'
+    date_hierarchy = 'date_joined'  # read from DailyCount
     ordering = ('email', )
     list_display = (
         'email', 'first_name', 'last_name', 'phone', 'last_login',
@@ -129,3 +384,187 @@ class UserAdmin(
     def get_inline_instances(self, request, obj=None):
         """hides inlines during 'add user' view"""
         return obj and super().get_inline_instances(request, obj) or []
+
+
+@admin.register(models.RegionStat)
+class RegionStatAdmin(admin.ModelAdmin):
+    """Read only dashboard of the materialized region statistics"""
+    list_display = (
+        'division_code', 'district_code', 'thana_code', 'gender', 'age_band',
+        'is_active', 'count',
+    )
+    list_filter = ('gender', 'age_band', 'is_active')
+    change_list_template = 'admin/Core/regionstat/change_list.html'
+
+    def has_add_permission(self, request):
+        """Permission to ADD a RegionStat"""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Permission to CHANGE a RegionStat"""
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        """Permission to DELETE a RegionStat"""
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        """Adds count summaries above the statistics list"""
+        gazetteer, stats = get_gazetteer(), models.RegionStat.objects
+        divisions = [
+            (getattr(gazetteer.get(DIVISION, row['division_code']), 'name',
+                     'Unknown'), row['total'])
+            for row in region_stat_counts(DIVISION)
+        ]
+        summaries = [('Division', divisions)] + [
+            (title, [
+                (row[field] if row[field] != '' else 'Unknown', row['total'])
+                for row in stats.values(field).annotate(
+                    total=Sum('count')
+                ).filter(total__gt=0).order_by(field)
+            ]) for title, field in (
+                ('Gender', 'gender'), ('Age Band', 'age_band'),
+                ('Active', 'is_active'),
+            )
+        ]
+        extra_context = {
+            'summaries': summaries,
+            'total': sum(total for name, total in divisions),
+            'refreshed_at': stats_refreshed_at(),
+            **(extra_context or {}),
+        }
+        return super().changelist_view(request, extra_context)
+
+
+@admin.register(models.DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    """Review of candidate duplicate profiles"""
+    list_display = (
+        'profile_a', 'profile_b', 'score', 'matched', 'status', 'created_at'
+    )
+    list_filter = ('status', )
+    list_select_related = ('profile_a__user', 'profile_b__user')
+    search_fields = ('profile_a__user__email', 'profile_b__user__email')
+    raw_id_fields = ('profile_a', 'profile_b')
+    readonly_fields = (
+        'score', 'matched', 'block_key', 'created_at', 'updated_at'
+    )
+    actions = ('mark_confirmed', 'mark_dismissed')
+
+    def has_add_permission(self, request):
+        """Permission to ADD a DuplicateCandidate"""
+        return False
+
+    def mark_confirmed(self, request, queryset):
+        """Marks selected pairs as confirmed duplicates"""
+        count = queryset.update(status=models.DuplicateCandidate.CONFIRMED)
+        self.message_user(request, f"{count} pairs marked as confirmed")
+
+    mark_confirmed.short_description = "Mark selected pairs as duplicates"
+
+    def mark_dismissed(self, request, queryset):
+        """Marks selected pairs as not duplicates"""
+        count = queryset.update(status=models.DuplicateCandidate.DISMISSED)
+        self.message_user(request, f"{count} pairs dismissed")
+
+    mark_dismissed.short_description = "Dismiss selected pairs"
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Read only list of background admin jobs"""
+    list_filter = ('status', 'file_format')
+
+    def has_add_permission(self, request):
+        """Permission to ADD a job"""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Permission to CHANGE a job"""
+        return False
+
+    def progress_display(self, obj):
+        """Show processed rows and percentage"""
+        return f'{obj.processed}/{obj.total} ({obj.progress}%)'
+
+    progress_display.short_description = "progress"
+
+    def changelist_view(self, request, extra_context=None):
+        """Overriding to show finished imports and exports"""
+        notify_finished_jobs(request)
+        return super().changelist_view(request, extra_context)
+
+
+@admin.register(models.ExportJob)
+class ExportJobAdmin(JobAdmin):
+    """Read only list of the background admin exports"""
+    list_display = (
+        '__str__', 'requested_by', 'status', 'progress_display', 'download',
+        'created_at', 'finished_at',
+    )
+    exclude = ('pks', 'query', 'file')  # file is private, see download_view
+    readonly_fields = ('download', )
+
+    def get_urls(self):
+        """Adds the download view of the exported files"""
+        return [
+            path(
+                '<int:object_id>/download/',
+                self.admin_site.admin_view(self.download_view),
+                name='Core_exportjob_download'
+            ),
+        ] + super().get_urls()
+
+    def has_download_permission(self, request, obj):
+        """Permission to download the file of an export: its requester or
+        users with the export permission on users"""
+        user_admin = self.admin_site._registry.get(models.User)
+        return obj.requested_by_id == request.user.pk or bool(
+            user_admin and user_admin.has_export_permission(request)
+        )
+
+    def download_view(self, request, object_id):
+        """Returns the exported file of a finished job from the private job
+        file storage"""
+        job = get_object_or_404(
+            models.ExportJob, pk=object_id, status=models.ExportJob.DONE
+        )
+        if not self.has_download_permission(request, job):
+            raise PermissionDenied
+        if not job.file:  # deleted after settings.JOB_FILE_RETENTION_DAYS
+            raise Http404('Export file not found')
+        return FileResponse(
+            job.file.open('rb'), as_attachment=True,
+            filename=posixpath.basename(job.file.name)
+        )
+
+    def download(self, obj):
+        """Show link to the exported file"""
+        if obj.status != models.ExportJob.DONE or not obj.file:
+            return '-'
+        return format_html('<a href="{}">download</a>', download_url(obj))
+
+
+@admin.register(models.ImportJob)
+class ImportJobAdmin(JobAdmin):
+    """Read only list of the background admin imports, with the errors
+    of the rejected rows"""
+    list_display = (
+        '__str__', 'requested_by', 'status', 'progress_display', 'created',
+        'updated', 'failed', 'created_at', 'finished_at',
+    )
+    exclude = ('row_errors', 'file')  # private
+    readonly_fields = ('row_errors_display', )
+
+    def row_errors_display(self, obj):
+        """Show the errors of the rejected rows, one row per line"""
+        lines = [
+            f"Row {error['row']}: {'; '.join(error['errors'])}"
+            for error in obj.row_errors
+        ]
+        if obj.failed > len(obj.row_errors):
+            lines.append(f"... {obj.failed - len(obj.row_errors)} more rows")
+        return format_html_join(
+            mark_safe('<br>'), '{}', ((line, ) for line in lines)
+        ) or '-'
+
+    row_errors_display.short_description = "row errors"
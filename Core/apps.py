@@ -6,3 +6,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     """Core app configuration"""
     name = 'Core'
+
+    def ready(self):
+        """Loads the in-memory gazetteer once at startup"""
+        from Core.gazetteer import get_gazetteer
+        get_gazetteer()
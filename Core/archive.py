@@ -0,0 +1,85 @@
+"""Core > archive.py
+Retention of the admin log. django_admin_log only grows, so entries older
+than settings.LOG_ENTRY_RETENTION_DAYS are moved, oldest first and a batch
+per transaction, into LogArchive rows holding the gzipped JSON lines of the
+batch. The admin log list stays on the recent entries and archived ones
+are read back by archived_entries.
+"""
+# PYTHON IMPORTS
+import gzip
+import json
+import logging
+from datetime import timedelta
+from sys import _getframe
+# DJANGO IMPORTS
+from django.conf import settings
+from django.contrib.admin.models import LogEntry
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+# CORE IMPORTS
+from Core.models import LogArchive
+from Core.models.daily import count_days
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000  # entries per LogArchive row
+ARCHIVE_FIELDS = {  # key: LogEntry lookup
+    'id': 'pk', 'action_time': 'action_time', 'user_id': 'user_id',
+    'user': 'user__email', 'content_type': 'content_type__model',
+    'app_label': 'content_type__app_label', 'object_id': 'object_id',
+    'object_repr': 'object_repr', 'action_flag': 'action_flag',
+    'change_message': 'change_message',
+}
+
+
+def archive_batch(cutoff, batch_size=BATCH_SIZE):
+    """Moves the oldest batch of entries before cutoff into a LogArchive
+    Returns the number of entries archived, 0 when none are left"""
+    with transaction.atomic():
+        rows = [
+            dict(zip(ARCHIVE_FIELDS, values)) for values in
+            LogEntry.objects.filter(action_time__lt=cutoff).order_by(
+                'action_time', 'pk'
+            ).values_list(*ARCHIVE_FIELDS.values())[:batch_size]
+        ]
+        if not rows:
+            return 0
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        data = gzip.compress(''.join(
+            encoder.encode(row) + '\n' for row in rows
+        ).encode(), compresslevel=9)
+        LogArchive.objects.create(
+            first_action_time=rows[0]['action_time'],
+            last_action_time=rows[-1]['action_time'],
+            count=len(rows), size=len(data), data=data,
+        )
+        LogEntry.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        count_days(LogEntry, [row['action_time'] for row in rows], -1)
+    return len(rows)
+
+
+def archive_log_entries(days=None, batch_size=BATCH_SIZE):
+    """Archives the entries older than days, default
+    settings.LOG_ENTRY_RETENTION_DAYS
+    Returns (archives created, entries archived)"""
+    days = settings.LOG_ENTRY_RETENTION_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    archives, entries = 0, 0
+    while True:
+        count = archive_batch(cutoff, batch_size)
+        if not count:
+            break
+        archives, entries = archives + 1, entries + count
+    logger.debug(  # prints function name
+        f"{_getframe().f_code.co_name} Archived {entries} log entries "
+        f"older than {days} days in {archives} archives"
+    )
+    return archives, entries
+
+
+def archived_entries(archive):
+    """Yields the entry dicts of a LogArchive"""
+    for line in gzip.decompress(bytes(archive.data)).splitlines():
+        yield json.loads(line)
@@ -0,0 +1,273 @@
+"""Core > autocomplete.py
+In-process prefix tries for address autocomplete. Each node keeps its best
+completions precomputed, so a lookup is a walk down the prefix with no
+sorting and no database access. The index is built once per process from
+the gazetteer plus the distinct values stored in Profile, warmed in a thread
+when the server starts, then kept up to date by the Profile post_save and
+post_delete signals: stored values are weighted by their number of profiles
+and removed when no profile holds them anymore.
+"""
+# PYTHON IMPORTS
+import heapq
+import logging
+import re
+import threading
+from collections import Counter
+from sys import _getframe
+# CORE IMPORTS
+from Core.gazetteer import DISTRICT, DIVISION, THANA, get_gazetteer
+
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_FIELDS = (DIVISION, DISTRICT, THANA, 'postal')
+MAX_COMPLETIONS = 50  # completions kept per trie node
+GAZETTEER_WEIGHT = 1000000  # canonical names rank before stored values
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_key(text):
+    """Returns the trie key of a text, case and whitespace insensitive"""
+    return WHITESPACE.sub(' ', str(text)).strip().casefold()
+
+
+class TrieNode:
+    """Trie node with its children and best completions"""
+    __slots__ = ('children', 'top', 'key')
+
+    def __init__(self):
+        """init"""
+        self.children = {}
+        self.top = []  # [(-weight, value, place id)], best first
+        self.key = None  # key ending at this node
+
+
+class PrefixTrie:
+    """Prefix trie returning the heaviest completions of a prefix"""
+
+    def __init__(self, size=MAX_COMPLETIONS):
+        """init"""
+        self.root = TrieNode()
+        self.size = size
+        self.values = {}  # key -> (weight, value, place id)
+
+    def __len__(self):
+        """Number of distinct keys"""
+        return len(self.values)
+
+    def __contains__(self, value):
+        """Tests if the value's key is in the trie"""
+        return normalize_key(value) in self.values
+
+    def insert(self, value, weight=1, place_id=None):
+        """Inserts a value, keeps the heavier entry of an existing key"""
+        key = normalize_key(value)
+        if key and self.values.get(key, (float('-inf'), ))[0] < weight:
+            self.put(key, (-weight, value, place_id))
+
+    def set(self, value, weight, place_id=None):
+        """Sets the entry of a value's key, lighter or heavier"""
+        key = normalize_key(value)
+        if key:
+            self.put(key, (-weight, value, place_id))
+
+    def remove(self, value):
+        """Removes a value's key"""
+        key = normalize_key(value)
+        if key in self.values:
+            self.put(key, None)
+
+    def put(self, key, entry):
+        """Replaces the entry of a key, removes it when entry is None
+        Writers must be serialized, readers are not locked: completion lists
+        are never changed in place but replaced by new lists, and new nodes
+        are linked once filled, so a reader sees the old or the new list"""
+        previous = self.values.pop(key, None)
+        old = previous and (-previous[0], previous[1], previous[2])
+        if entry is not None:
+            self.values[key] = (-entry[0], entry[1], entry[2])
+
+        parent, node = None, self.root
+        for char in [''] + list(key):
+            if char:
+                parent, node = node, node.children.get(char)
+                if node is None:
+                    if entry is None:
+                        return
+                    node = TrieNode()
+                    node.top = [entry]
+                    parent.children[char] = node
+                    continue
+            top, full = node.top, len(node.top) >= self.size
+            if old is not None and old in top:
+                top = [e for e in top if e != old]
+                if full and (entry is None or not top or entry > top[-1]):
+                    # the best entry left out of the full list may follow
+                    node.top = self.best(node)
+                    continue
+            if entry is not None and (len(top) < self.size or entry < top[-1]):
+                top = sorted(top + [entry])[:self.size]
+            node.top = top
+        node.key = key if entry is not None else None
+
+    def best(self, node):
+        """Returns the best entries of the keys under a node"""
+        entries, nodes = [], [node]
+        while nodes:
+            node = nodes.pop()
+            if node.key in self.values:  # not the key being removed
+                weight, value, place_id = self.values[node.key]
+                entries.append((-weight, value, place_id))
+            nodes.extend(node.children.values())
+        return heapq.nsmallest(self.size, entries)
+
+    def complete(self, prefix, limit=10):
+        """Returns up to limit (value, place id) completions of a prefix"""
+        node = self.root
+        for char in normalize_key(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [(value, place_id) for _, value, place_id in node.top[:limit]]
+
+
+class AddressIndex:
+    """Prefix tries for each address field"""
+
+    def __init__(self):
+        """init"""
+        self.tries = {field: PrefixTrie() for field in ADDRESS_FIELDS}
+        self.counts = {field: Counter() for field in ADDRESS_FIELDS}
+        self.canonical = {field: {} for field in ADDRESS_FIELDS}
+        self.lock = threading.Lock()  # serializes writers, see put
+
+    def add(self, field, value, weight=1, place_id=None):
+        """Adds a value of an address field"""
+        if field in self.tries and value:
+            with self.lock:
+                self.tries[field].insert(value, weight, place_id)
+
+    def count(self, field, value, delta):
+        """Changes the number of profiles holding a value, which is removed
+        at 0 unless canonical"""
+        key = normalize_key(value)
+        if not key:
+            return
+        with self.lock:
+            counts, trie = self.counts[field], self.tries[field]
+            counts[key] += delta
+            if counts[key] <= 0:
+                del counts[key]
+            if key in self.canonical[field]:
+                name, place_id = self.canonical[field][key]
+                trie.set(name, max(GAZETTEER_WEIGHT, counts[key]), place_id)
+            elif counts[key]:  # keeps the spelling of an indexed value
+                trie.set(trie.values.get(key, (0, value))[1], counts[key])
+            else:
+                trie.remove(value)
+
+    def update_profile(self, old, new):
+        """Applies the change of a profile's address values, from old to
+        new {field: value}"""
+        for field in ADDRESS_FIELDS:
+            before, after = old.get(field), new.get(field)
+            if normalize_key(before or '') != normalize_key(after or ''):
+                if before:
+                    self.count(field, before, -1)
+                if after:
+                    self.count(field, after, 1)
+
+    def complete(self, field, prefix, limit=10):
+        """Returns up to limit (value, place id) completions of a prefix"""
+        return self.tries[field].complete(prefix, limit)
+
+    def load_gazetteer(self, gazetteer):
+        """Adds the canonical gazetteer names and postal codes"""
+        for level in (DIVISION, DISTRICT, THANA):
+            for place in gazetteer.places[level].values():
+                self.canonical[level][normalize_key(place.name)] = (
+                    place.name, place.id
+                )
+                self.add(level, place.name, GAZETTEER_WEIGHT, place.id)
+                if level == THANA and place.postal:
+                    self.canonical['postal'][normalize_key(place.postal)] = (
+                        place.postal, None
+                    )
+                    self.add('postal', place.postal, GAZETTEER_WEIGHT)
+
+    def load_profiles(self, queryset):
+        """Adds the distinct stored values weighted by their frequency"""
+        from django.db.models import Count
+        for field in ADDRESS_FIELDS:
+            rows = queryset.exclude(**{f'{field}__isnull': True}).values(
+                field
+            ).annotate(count=Count('pk')).order_by()
+            for row in rows.iterator():  # spellings of a key add up
+                key = normalize_key(row[field])
+                if key:
+                    self.counts[field][key] += row['count']
+                    self.add(field, row[field], self.counts[field][key])
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def address_values(profile):
+    """Returns the {field: value} of a profile's address"""
+    return {field: getattr(profile, field, None) for field in ADDRESS_FIELDS}
+
+
+def get_address_index():
+    """Returns the process wide address index, built on first call"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = build_address_index()
+    return _index
+
+
+def build_address_index():
+    """Builds a new address index from the gazetteer and profiles"""
+    from Core.models import Profile
+    index = AddressIndex()
+    index.load_gazetteer(get_gazetteer())
+    index.load_profiles(Profile.objects.all())
+    logger.debug(  # prints function name
+        f"{_getframe().f_code.co_name} Built address index: " + ', '.join(
+            f"{len(index.tries[field])} {field}" for field in ADDRESS_FIELDS
+        )
+    )
+    return index
+
+
+def reset_address_index():
+    """Drops the address index, it is rebuilt on next use"""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def warm_address_index():
+    """Builds the address index in a thread, so the first request does not
+    wait for the scan of the profiles, ex: when the server starts"""
+    thread = threading.Thread(target=get_address_index, daemon=True)
+    thread.start()
+    return thread
+
+
+def update_address_index(profile, created=False, deleted=False):
+    """Applies a saved or deleted profile's address change to the index if
+    it is built, from the values the profile was loaded with"""
+    old = getattr(profile, '_address', None)
+    new = {} if deleted else address_values(profile)
+    profile._address = new
+    if _index is None:
+        return
+    if old is None:  # loaded values unknown, adds the missing ones only
+        old = {} if created else {
+            field: value for field, value in new.items()
+            if value and value in _index.tries[field]
+        }
+    _index.update_profile(old, new)
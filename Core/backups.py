@@ -0,0 +1,719 @@
+"""Core > backups.py
+Database backups compressed on several cores while they are dumped. The
+dump is cut in blocks gzipped in parallel by a thread pool (zlib releases
+the GIL) and written in order as the members of a multi-member gzip file,
+which gunzip and dbrestore read as one stream. The compressed stream is
+piped into the dbbackup storage, so neither the uncompressed dump nor the
+whole backup is ever held in a temporary file.
+
+Table backups write a gzipped JSON lines fixture per table into a run
+folder of the dbbackup storage, ex: tables/20210101-010000-000000-full/,
+with a manifest of the rows and SHA-256 of each file. Incremental runs dump
+the rows whose last_updated changed since the previous run (a Watermark
+per table, the creation time of append-only tables) and the whole of the
+other tables, whose updates cannot be found, all read in one REPEATABLE
+READ transaction so a run is a consistent snapshot. A run is restored by
+loading the files of the last full run and of each later run in order with
+the loaddata command, skipping partial runs of some tables only; rows
+deleted since the full run are not removed.
+
+Media backups archive the files of MEDIA_ROOT changed since the previous
+run into a run folder of settings.BACKUP_MEDIA_DIR: a tar stream gzipped in
+parallel, with a manifest of the size, modification time, SHA-256 and
+archive of every file. The files of given users are restored selectively
+from the archives holding them.
+"""
+# PYTHON IMPORTS
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import shlex
+import tarfile
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import timedelta
+from shutil import copyfileobj
+from subprocess import PIPE, Popen
+from sys import _getframe
+from tempfile import NamedTemporaryFile, SpooledTemporaryFile
+# DJANGO IMPORTS
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils._os import safe_join
+# PLUGIN IMPORTS
+from dbbackup import settings as dbbackup_settings
+from dbbackup.db.base import BaseCommandDBConnector, get_connector
+from dbbackup.db.exceptions import CommandConnectorError
+from dbbackup.db.sqlite import SqliteConnector
+from dbbackup.storage import get_storage
+# CORE IMPORTS
+from Core.models import Profile, Watermark
+from Core.renditions import rendition_names
+
+
+logger = logging.getLogger(__name__)
+
+COPY_SIZE = 1024 * 1024  # bytes read at once from a dump command
+WATERMARK_FIELD = 'last_updated'
+OVERLAP = timedelta(minutes=5)  # rows of transactions committed late
+MANIFEST = 'manifest.json'
+FULL, INCREMENTAL = 'full', 'incremental'
+PARTIAL = '-partial'  # suffix of the runs of some tables
+ARCHIVE = 'media.tar.gz'
+
+
+def compress_block(block, level):
+    """Returns a block of bytes as a complete gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(block) + compressor.flush()
+
+
+class ParallelGzipWriter:
+    """Write-only file object gzipping blocks of what is written in a thread
+    pool and writing them in order to fileobj, with at most two blocks per
+    worker in memory"""
+
+    def __init__(self, fileobj, workers=None, level=6, block_size=None):
+        """Initializes the writer, see settings.DBBACKUP_COMPRESS_WORKERS
+        and DBBACKUP_COMPRESS_BLOCK_SIZE"""
+        self.fileobj, self.level = fileobj, level
+        self.workers = workers or settings.DBBACKUP_COMPRESS_WORKERS
+        self.block_size = block_size or settings.DBBACKUP_COMPRESS_BLOCK_SIZE
+        self.executor = ThreadPoolExecutor(self.workers)
+        self.pending, self.buffer = deque(), bytearray()
+        self.bytes_in, self.bytes_out = 0, 0
+
+    def write(self, data):
+        """Buffers data, queuing the compression of each full block"""
+        if isinstance(data, str):
+            data = data.encode()
+        self.buffer += data
+        self.bytes_in += len(data)
+        while len(self.buffer) >= self.block_size:
+            self.submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def submit(self, block):
+        """Queues the compression of a block, writing the oldest compressed
+        blocks out while too many are pending"""
+        self.pending.append(
+            self.executor.submit(compress_block, block, self.level)
+        )
+        while len(self.pending) > 2 * self.workers:
+            self.write_out(self.pending.popleft().result())
+
+    def write_out(self, data):
+        """Writes a compressed block to the file object"""
+        self.fileobj.write(data)
+        self.bytes_out += len(data)
+
+    def close(self):
+        """Compresses the last block and writes all pending blocks"""
+        try:
+            if self.buffer:
+                self.submit(bytes(self.buffer))
+                self.buffer = bytearray()
+            while self.pending:
+                self.write_out(self.pending.popleft().result())
+        finally:
+            self.abort()
+
+    def abort(self):
+        """Drops the pending blocks and stops the workers"""
+        for future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown()
+
+
+class StreamingCommandMixin(BaseCommandDBConnector):
+    """Command connector copying the output of the dump command to
+    self.output as it is produced, instead of spooling it to a file"""
+    output = None
+
+    def run_command(self, command, stdin=None, env=None):
+        """Runs a dump command, its output is copied to self.output"""
+        if self.output is None:  # restores
+            return super().run_command(command, stdin, env)
+        full_env = os.environ.copy() if self.use_parent_env else {}
+        full_env.update(self.env)
+        full_env.update(env or {})
+        with SpooledTemporaryFile(max_size=1024 * 1024) as stderr:
+            try:
+                process = Popen(shlex.split(command), stdout=PIPE,
+                                stderr=stderr, env=full_env)
+            except OSError as err:
+                raise CommandConnectorError(f"Error running: {command}\n{err}")
+            with process:
+                copyfileobj(process.stdout, self.output, COPY_SIZE)
+            if process.returncode:
+                stderr.seek(0)
+                raise CommandConnectorError(
+                    f"Error running: {command}\n{stderr.read().decode()}"
+                )
+        return None, None
+
+
+def write_dump(connector, fileobj):
+    """Writes the dump of a dbbackup connector's database to fileobj"""
+    if isinstance(connector, BaseCommandDBConnector):
+        connector_class = type(  # runs the command of the connector class
+            f'Streaming{connector.__class__.__name__}',
+            (connector.__class__, StreamingCommandMixin), {'output': fileobj}
+        )
+        connector_class(
+            connector.database_name,
+            **dbbackup_settings.CONNECTORS.get(connector.database_name, {})
+        ).create_dump()
+    elif isinstance(connector, SqliteConnector):
+        connector.connection.ensure_connection()
+        connector._write_dump(fileobj)
+    else:  # dumped to a temporary file by the connector
+        copyfileobj(connector.create_dump(), fileobj, COPY_SIZE)
+
+
+def save_stream(storage, filename, produce):
+    """Saves to storage what produce(fileobj) writes, through a pipe read by
+    a thread: the storage reads while this thread, and its database
+    connection, produces. The saved file is deleted when either fails
+    Returns the saved name"""
+    read_fd, write_fd = os.pipe()
+    saved, errors, failed = [], [], []
+
+    def consume():
+        """Saves the read end of the pipe to the storage"""
+        try:
+            with open(read_fd, 'rb') as pipe:
+                saved.append(storage.save(filename, File(pipe)))
+        except BaseException as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=consume, daemon=True)
+    thread.start()
+    try:
+        with open(write_fd, 'wb') as pipe:
+            produce(pipe)
+    except BaseException as e:  # a broken pipe when the storage failed
+        failed.append(e)
+    thread.join()
+    if errors or failed:
+        if saved:  # incomplete file
+            storage.delete(saved[0])
+        raise (errors or failed)[0]
+    return saved[0]
+
+
+def backup_database(database='default', filename=None, path=None,
+                    workers=None, level=6):
+    """Dumps a database gzipped in parallel to the dbbackup storage, or to
+    a local path, with the file name of the dbbackup command
+    Returns a dict of metrics: name, workers, bytes_in, bytes_out, seconds
+    and the throughput in MiB of dump per second"""
+    connector = get_connector(database)
+    filename = filename or f'{connector.generate_filename()}.gz'
+    start, writers = time.monotonic(), []
+
+    def dump(fileobj):
+        """Writes the compressed dump to fileobj"""
+        writer = ParallelGzipWriter(fileobj, workers, level)
+        writers.append(writer)
+        try:
+            write_dump(connector, writer)
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+
+    if path:
+        with open(path, 'wb') as file:
+            dump(file)
+    else:
+        filename = save_stream(get_storage().storage, filename, dump)
+    writer = writers[0]
+
+    seconds = time.monotonic() - start
+    metrics = {
+        'name': path or filename, 'workers': writer.workers,
+        'bytes_in': writer.bytes_in, 'bytes_out': writer.bytes_out,
+        'seconds': round(seconds, 3),
+        'mib_per_second': round(writer.bytes_in / 2 ** 20 / seconds, 1)
+        if seconds else 0,
+    }
+    logger.info(  # prints function name
+        f"{_getframe().f_code.co_name} Backed up {database}: {metrics}"
+    )
+    return metrics
+
+
+def backup_models(labels=None):
+    """Returns the models of settings.BACKUP_APPS not in BACKUP_EXCLUDE,
+    or of the given labels, ex: ['Core.User'], by label
+    Proxy and unmanaged models are skipped, their table is another's"""
+    if labels:
+        models = [apps.get_model(label) for label in labels]
+    else:
+        models = [
+            model for app_label in settings.BACKUP_APPS
+            for model in apps.get_app_config(app_label).get_models()
+            if model._meta.label not in settings.BACKUP_EXCLUDE
+        ]
+    return {
+        model._meta.label: model for model in models
+        if not model._meta.proxy and model._meta.managed
+    }
+
+
+def watermark_field(model):
+    """Returns the field the changed rows of a model are found by:
+    WATERMARK_FIELD or the creation time of the append-only tables of
+    settings.BACKUP_APPEND_ONLY, None when changes cannot be found"""
+    if any(field.name == WATERMARK_FIELD for field in model._meta.fields):
+        return WATERMARK_FIELD
+    return settings.BACKUP_APPEND_ONLY.get(model._meta.label)
+
+
+class HashingFile:
+    """Write-only file object computing the SHA-256 and size of what is
+    written to fileobj"""
+
+    def __init__(self, fileobj):
+        """Initializes the hash"""
+        self.fileobj, self.hash, self.size = fileobj, hashlib.sha256(), 0
+
+    def write(self, data):
+        """Writes and hashes data"""
+        self.hash.update(data)
+        self.size += len(data)
+        return self.fileobj.write(data)
+
+    def flush(self):
+        """Flushes fileobj"""
+        self.fileobj.flush()
+
+
+def dump_table(storage, name, queryset):
+    """Saves a queryset as a gzipped JSON lines fixture in storage
+    Returns the manifest entry: file, rows, size and sha256"""
+    rows = 0
+
+    def objects():
+        """Yields the objects, counting them"""
+        nonlocal rows
+        for obj in queryset.iterator():
+            rows += 1
+            yield obj
+
+    with SpooledTemporaryFile(max_size=10 * 1024 * 1024) as temp:
+        hashing = HashingFile(temp)
+        with gzip.GzipFile(fileobj=hashing, mode='wb', mtime=0) as file:
+            text = io.TextIOWrapper(file, encoding='utf-8')
+            serializers.serialize(
+                'jsonl', objects(), stream=text, use_natural_foreign_keys=True
+            )
+            text.flush()
+            text.detach()  # leaves the file open
+        temp.seek(0)
+        name = storage.save(name, File(temp))
+    return {
+        'file': name, 'rows': rows, 'size': hashing.size,
+        'sha256': hashing.hash.hexdigest(),
+    }
+
+
+def table_runs(storage, folder=None):
+    """Returns the run folder names of the table backups, or of the backups
+    in folder, ex: settings.BACKUP_MEDIA_DIR, oldest first"""
+    folder = folder or settings.BACKUP_TABLES_DIR
+    if not storage.exists(folder):
+        return []
+    return sorted(storage.listdir(folder)[0])
+
+
+def read_manifest(storage, run, folder=None):
+    """Returns the manifest dict of a run"""
+    name = f'{folder or settings.BACKUP_TABLES_DIR}/{run}/{MANIFEST}'
+    with storage.open(name) as file:
+        return json.loads(file.read())
+
+
+@contextmanager
+def snapshot():
+    """Runs the block in one read only transaction at REPEATABLE READ, so its
+    queries read the database as of the first one. MySQL InnoDB transactions
+    are REPEATABLE READ by default and a SQLite transaction reads one
+    snapshot; within an outer transaction the isolation cannot be set"""
+    outer = connection.in_atomic_block
+    with transaction.atomic():
+        if not outer and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:  # first statement
+                cursor.execute(
+                    'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, '
+                    'READ ONLY'
+                )
+        yield
+
+
+def backup_tables(incremental=True, labels=None):
+    """Backs up the tables of backup_models(labels), only their changes
+    since the previous run when incremental and a full run exists
+    Runs of given labels are partial: they are not the base of later runs
+    and leave the watermarks, so the next run still dumps their changes
+    Returns the manifest of the run"""
+    storage = get_storage().storage
+    runs = [
+        run for run in table_runs(storage)
+        if not run.endswith(PARTIAL)
+        if storage.exists(f'{settings.BACKUP_TABLES_DIR}/{run}/{MANIFEST}')
+    ]
+    previous = read_manifest(storage, runs[-1]) if runs else None
+    if previous is None:
+        incremental = False
+    now = timezone.now()
+    mode = INCREMENTAL if incremental else FULL
+    run = f'{now:%Y%m%d-%H%M%S-%f}-{mode}{PARTIAL if labels else ""}'
+    manifest = {
+        'run': run, 'mode': mode, 'partial': bool(labels),
+        'created_at': now.isoformat(),
+        'base': previous['run'] if incremental else None,
+        'tables': {},
+    }
+    with snapshot():  # the tables as of one point in time
+        for label, model in backup_models(labels).items():
+            queryset, since = model._default_manager.order_by('pk'), None
+            field = watermark_field(model)
+            if incremental and field:  # others are dumped whole
+                mark = Watermark.objects.filter(
+                    name=f'backup:{label}'
+                ).first()
+                if mark and mark.value:
+                    since = mark.value - OVERLAP
+                    queryset = queryset.filter(**{f'{field}__gte': since})
+            entry = dump_table(
+                storage,
+                f'{settings.BACKUP_TABLES_DIR}/{run}/{label}.jsonl.gz',
+                queryset
+            )
+            if since is not None and not entry['rows']:
+                storage.delete(entry['file'])
+                continue
+            manifest['tables'][label] = {
+                **entry, 'since': since.isoformat() if since else None
+            }
+    storage.save(
+        f'{settings.BACKUP_TABLES_DIR}/{run}/{MANIFEST}',
+        ContentFile(json.dumps(manifest, indent=2).encode())
+    )
+    with transaction.atomic():  # changes are found from this run on
+        for label, model in backup_models(labels).items():
+            if watermark_field(model) and not labels:
+                Watermark.objects.update_or_create(
+                    name=f'backup:{label}', defaults={'value': now}
+                )
+    logger.info(  # prints function name
+        f"{_getframe().f_code.co_name} Backed up {len(manifest['tables'])} "
+        f"tables in {run}"
+    )
+    return manifest
+
+
+def verify_backup(run=None):
+    """Checks the files of a run, default the last one, against its
+    manifest: size, SHA-256 and number of rows
+    Returns the list of problems found, empty when the run is intact"""
+    storage = get_storage().storage
+    runs = table_runs(storage)
+    run = run or (runs[-1] if runs else None)
+    if run is None:
+        return ['No table backup found']
+    try:
+        manifest = read_manifest(storage, run)
+    except (OSError, ValueError) as e:
+        return [f'{run}: Unreadable manifest: {e}']
+    problems = []
+    for label, entry in manifest['tables'].items():
+        digest, size = hashlib.sha256(), 0
+        try:
+            with storage.open(entry['file'], 'rb') as file:
+                for chunk in iter(lambda: file.read(COPY_SIZE), b''):
+                    digest.update(chunk)
+                    size += len(chunk)
+                if (size, digest.hexdigest()) != (
+                    entry['size'], entry['sha256']
+                ):
+                    problems.append(f'{label}: Checksum mismatch')
+                    continue
+                file.seek(0)
+                with gzip.GzipFile(fileobj=file) as lines:
+                    rows = sum(1 for line in lines if line.strip())
+        except (OSError, EOFError) as e:
+            problems.append(f'{label}: {e}')
+            continue
+        if rows != entry['rows']:
+            problems.append(f'{label}: {rows} rows, expected {entry["rows"]}')
+    return problems
+
+
+def clean_backups(keep=None, days=None, folder=None):
+    """Deletes the table backup runs, or the backup runs in folder, beyond
+    the keep newest ones, partial runs not counted, and older than days,
+    default settings.BACKUP_RETENTION_COUNT and _DAYS, keeping the runs
+    kept incremental runs are based on
+    Returns the names of the deleted runs"""
+    keep = settings.BACKUP_RETENTION_COUNT if keep is None else keep
+    days = settings.BACKUP_RETENTION_DAYS if days is None else days
+    folder = folder or settings.BACKUP_TABLES_DIR
+    storage = get_storage().storage
+    runs = table_runs(storage, folder)
+    cutoff = f'{timezone.now() - timedelta(days=days):%Y%m%d-%H%M%S-%f}'
+    regular = [run for run in runs if not run.endswith(PARTIAL)]
+    kept = set(regular[-keep:] if keep else []) | {
+        run for run in runs if run >= cutoff
+    }
+    for run in sorted(kept, reverse=True):  # keeps their base chain
+        base = run
+        while base and base in runs:
+            kept.add(base)
+            try:
+                base = read_manifest(storage, base, folder)['base']
+            except (OSError, ValueError):
+                break
+    deleted = [run for run in runs if run not in kept]
+    for run in deleted:
+        for filename in storage.listdir(f'{folder}/{run}')[1]:
+            storage.delete(f'{folder}/{run}/{filename}')
+        try:
+            os.rmdir(storage.path(f'{folder}/{run}'))
+        except (NotImplementedError, OSError):  # not a local folder
+            pass
+    logger.info(  # prints function name
+        f"{_getframe().f_code.co_name} Deleted {len(deleted)} backups of "
+        f"{folder}"
+    )
+    return deleted
+
+
+def scan_folder(root, folder):
+    """Returns ({name: [size, mtime in ns]} of the files, [sub folders]) of
+    a folder under root, symbolic links are skipped"""
+    files, folders = {}, []
+    with os.scandir(os.path.join(root, folder)) as entries:
+        for entry in entries:
+            name = f'{folder}/{entry.name}' if folder else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                folders.append(name)
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                files[name] = [stat.st_size, stat.st_mtime_ns]
+    return files, folders
+
+
+def scan_media(root, exclude=(), workers=None):
+    """Returns {name: [size, mtime in ns]} of the files under root, except
+    in the excluded folders, scanning folders on a pool of threads"""
+    files = {}
+    if not os.path.isdir(root):
+        return files
+    with ThreadPoolExecutor(workers) as executor:
+        pending = {executor.submit(scan_folder, root, '')}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                folder_files, folders = future.result()
+                files.update(folder_files)
+                pending.update(
+                    executor.submit(scan_folder, root, folder)
+                    for folder in folders if folder not in exclude
+                )
+    return files
+
+
+def file_digest(path):
+    """Returns the SHA-256 of a file, None when it was deleted"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(COPY_SIZE), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def media_runs(storage, folder):
+    """Returns the sorted media backup runs that completed, with manifest"""
+    return [
+        run for run in table_runs(storage, folder)
+        if storage.exists(f'{folder}/{run}/{MANIFEST}')
+    ]
+
+
+def backup_media(incremental=True, workers=None, level=6):
+    """Archives the files of settings.MEDIA_ROOT changed since the previous
+    run, all of them when not incremental or without previous run, as a
+    gzipped tar stream in a run folder of settings.BACKUP_MEDIA_DIR
+    Files of the same size and modification time are not read, the others
+    are hashed in parallel and archived when their content changed
+    Returns the manifest of the run, its files: {name: [size, mtime in ns,
+    sha256, run of the archive holding the file]}"""
+    storage, root = get_storage().storage, settings.MEDIA_ROOT
+    folder = settings.BACKUP_MEDIA_DIR
+    workers = workers or settings.DBBACKUP_COMPRESS_WORKERS
+    runs = media_runs(storage, folder)
+    previous = read_manifest(storage, runs[-1], folder) if runs else None
+    if previous is None:
+        incremental = False
+    known = previous['files'] if incremental else {}
+    now = timezone.now()
+    mode = INCREMENTAL if incremental else FULL
+    run = f'{now:%Y%m%d-%H%M%S-%f}-{mode}'
+    manifest = {
+        'run': run, 'mode': mode, 'created_at': now.isoformat(),
+        'base': previous['run'] if incremental else None,
+        'archive': None, 'files': {},
+    }
+
+    files = scan_media(root, set(settings.BACKUP_MEDIA_EXCLUDE), workers)
+    candidates = []
+    for name, stat in files.items():
+        if known.get(name, [])[:2] == stat:
+            manifest['files'][name] = known[name]
+        else:
+            candidates.append(name)
+    with ThreadPoolExecutor(workers) as executor:
+        digests = list(executor.map(file_digest, [
+            os.path.join(root, name) for name in candidates
+        ]))
+    changed = []
+    for name, digest in zip(candidates, digests):
+        if digest is None:  # deleted since the scan
+            continue
+        entry = known.get(name)
+        if entry and entry[2] == digest:  # touched, in a previous archive
+            manifest['files'][name] = files[name] + entry[2:]
+        else:
+            manifest['files'][name] = files[name] + [digest, run]
+            changed.append(name)
+
+    if changed:
+        archive = manifest['archive'] = {'file': f'{folder}/{run}/{ARCHIVE}'}
+
+        def write_archive(fileobj):
+            """Writes the changed files as a tar stream gzipped in parallel"""
+            hashing = HashingFile(fileobj)
+            writer = ParallelGzipWriter(hashing, workers, level)
+            try:
+                with tarfile.open(fileobj=writer, mode='w|') as tar:
+                    for name in changed:
+                        with open(os.path.join(root, name), 'rb') as file:
+                            tar.addfile(
+                                tar.gettarinfo(arcname=name, fileobj=file),
+                                file
+                            )
+                writer.close()
+            except BaseException:
+                writer.abort()
+                raise
+            archive.update({
+                'files': len(changed), 'bytes_in': writer.bytes_in,
+                'size': hashing.size, 'sha256': hashing.hash.hexdigest(),
+            })
+
+        archive['file'] = save_stream(storage, archive['file'], write_archive)
+    storage.save(
+        f'{folder}/{run}/{MANIFEST}',
+        ContentFile(json.dumps(manifest, indent=2).encode())
+    )
+    logger.info(  # prints function name
+        f"{_getframe().f_code.co_name} Backed up {len(changed)} of "
+        f"{len(manifest['files'])} media files in {run}"
+    )
+    return manifest
+
+
+def user_media(user_ids):
+    """Returns the media file names of users: their profile images and
+    renditions, and the prefixes of their upload folders, ex: Users/1/"""
+    names = set()
+    for image, image_renditions in Profile.objects.filter(
+        user_id__in=user_ids
+    ).values_list('image', 'image_renditions'):
+        if image:
+            names.add(image)
+        names.update(rendition_names(image_renditions))
+    prefixes = tuple(  # see Core.models.profile.media_upload_path
+        f'Users/{user_id}/' for user_id in user_ids
+    )
+    return names, prefixes
+
+
+def extract_file(source, root, name, mtime):
+    """Writes a file object to the name under root with its modification
+    time, replacing the existing file once complete"""
+    path = safe_join(root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with NamedTemporaryFile(
+        dir=os.path.dirname(path), delete=False
+    ) as temp:
+        try:
+            copyfileobj(source, temp, COPY_SIZE)
+        except BaseException:
+            os.remove(temp.name)
+            raise
+    os.chmod(temp.name, 0o644)
+    os.utime(temp.name, ns=(mtime, mtime))  # unchanged for the next run
+    os.replace(temp.name, path)
+
+
+def restore_media(user_ids=None, run=None):
+    """Extracts the files of a media backup run, default the last one, into
+    settings.MEDIA_ROOT, only the files of the given users when user_ids
+    Files are found from the profiles of the users, restore their tables
+    first when they were deleted
+    Returns the restored names"""
+    storage, root = get_storage().storage, settings.MEDIA_ROOT
+    folder = settings.BACKUP_MEDIA_DIR
+    runs = media_runs(storage, folder)
+    run = run or (runs[-1] if runs else None)
+    if run is None:
+        raise FileNotFoundError('No media backup found')
+    files = read_manifest(storage, run, folder)['files']
+    if user_ids is not None:
+        names, prefixes = user_media(user_ids)
+        files = {
+            name: entry for name, entry in files.items()
+            if name in names or name.startswith(prefixes)
+        }
+    archives = defaultdict(dict)
+    for name, entry in files.items():
+        archives[entry[3]][name] = entry
+    restored = []
+    for archive_run, entries in sorted(archives.items()):
+        # gzip reads the members written in parallel, tarfile only the first
+        with storage.open(f'{folder}/{archive_run}/{ARCHIVE}', 'rb') as file, \
+                gzip.GzipFile(fileobj=file) as stream, \
+                tarfile.open(fileobj=stream, mode='r|') as tar:
+            for member in tar:
+                if member.isfile() and member.name in entries:
+                    extract_file(
+                        tar.extractfile(member), root, member.name,
+                        entries[member.name][1]
+                    )
+                    restored.append(member.name)
+    logger.info(  # prints function name
+        f"{_getframe().f_code.co_name} Restored {len(restored)} of "
+        f"{len(files)} media files from {run}"
+    )
+    return restored
@@ -0,0 +1,231 @@
+"""Core > dedupe.py
+Duplicate profile detection without comparing every pair of profiles.
+Profiles are blocked by a key of their region plus phonetic (Soundex) name
+codes, stored in Profile.block_key; pairs are only scored within a block on
+normalized identifiers, names, birthdays and address tokens. Blocks are read
+in block_key order with chunked iteration, so memory is bounded by the
+largest block, and oversized blocks are compared within a sliding window.
+"""
+# PYTHON IMPORTS
+import hashlib
+import logging
+import re
+from itertools import groupby
+from operator import itemgetter
+from sys import _getframe
+# DJANGO IMPORTS
+from django.utils import timezone
+# CORE IMPORTS
+from Core.gazetteer import normalize
+from Core.models import DuplicateCandidate, Profile
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+MAX_BLOCK_SIZE = 500  # larger blocks are compared within WINDOW_SIZE
+WINDOW_SIZE = 50
+THRESHOLD = 0.6  # minimum score, above a namesake at the same address
+REGION_LENGTH = 32  # longer free text regions are hashed, see block_key
+
+# score weights of matching fields, scores are capped at 1.0; passports
+# are unique so never shared by two profiles
+WEIGHTS = {
+    'nid': 0.6, 'phone': 0.4, 'name': 0.2, 'birthday': 0.2, 'address': 0.3,
+}
+
+TOKEN = re.compile(r'[0-9a-z]+')
+# common abbreviations in Bangladesh addresses
+ABBREVIATIONS = {
+    'rd': 'road', 'st': 'street', 'ln': 'lane', 'h': 'house',
+    'hs': 'house', 'hno': 'house', 'r': 'road', 'sec': 'sector',
+    'blk': 'block', 'fl': 'floor', 'apt': 'flat', 'bari': 'house',
+    'para': 'area', 'mohalla': 'area', 'dist': 'district', 'po': 'post',
+}
+STOP_WORDS = {'no', 'of', 'the', 'and', 'near', 'opposite', 'beside', 'at'}
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'), 'l': '4', **dict.fromkeys('mn', '5'),
+    'r': '6',
+}
+PROFILE_FIELDS = (
+    'pk', 'block_key', 'user__first_name', 'user__last_name', 'user__phone',
+    'nid', 'birthday', 'address', 'thana_code', 'district_code',
+    'district',
+)
+
+
+def address_tokens(address):
+    """Returns the set of normalized tokens of a free text address
+    ex: "H# 12, Rd No. 5" -> {'house', '12', 'road', '5'}"""
+    tokens = (
+        ABBREVIATIONS.get(token, token)
+        for token in TOKEN.findall(str(address or '').casefold())
+    )
+    return {token for token in tokens if token not in STOP_WORDS}
+
+
+def soundex(name):
+    """Returns the American Soundex code of a name, ex: Rahman -> R550
+    Returns an empty string for names without latin letters"""
+    letters = [c for c in str(name or '').casefold() if 'a' <= c <= 'z']
+    if not letters:
+        return ''
+    code, previous = letters[0].upper(), SOUNDEX_CODES.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+        if letter not in 'hw':  # h and w do not separate equal codes
+            previous = digit
+    return (code + '000')[:4]
+
+
+def nid_key(nid):
+    """Returns the comparable part of a national id, 17 digit ids are the
+    13 digit id prefixed by the birth year"""
+    nid = re.sub(r'\D', '', str(nid or ''))
+    return nid[4:] if len(nid) == 17 else nid
+
+
+def phone_key(phone):
+    """Returns the last 10 digits of a phone number, '' when too short"""
+    digits = re.sub(r'\D', '', str(phone or ''))
+    return digits[-10:] if len(digits) >= 10 else ''
+
+
+def name_key(first_name, last_name):
+    """Returns the phonetic key of a name, order insensitive"""
+    return ''.join(sorted(filter(None, (
+        soundex(first_name), soundex(last_name)
+    ))))
+
+
+def block_key(row):
+    """Returns the block key of a profile values row: region + name key
+    Returns '' for profiles without a name, which are never compared
+    Free text regions longer than REGION_LENGTH are hashed to fit the key
+    in Profile.block_key"""
+    key = name_key(row['user__first_name'], row['user__last_name'])
+    if not key:
+        return ''
+    region = str(row['district_code'] or normalize(row['district']))
+    if len(region) > REGION_LENGTH:
+        region = hashlib.sha1(region.encode()).hexdigest()[:REGION_LENGTH]
+    return f'{region}:{key}'
+
+
+def score(a, b):
+    """Returns (score, matched fields) of a pair of profile values rows"""
+    matched = []
+    if a['nid'] and nid_key(a['nid']) == nid_key(b['nid']):
+        matched.append('nid')
+    if phone_key(a['user__phone']) and \
+            phone_key(a['user__phone']) == phone_key(b['user__phone']):
+        matched.append('phone')
+    names = [
+        ' '.join(filter(None, (r['user__first_name'], r['user__last_name'])))
+        .casefold().split() for r in (a, b)
+    ]
+    if sorted(names[0]) == sorted(names[1]):
+        matched.append('name')
+    if a['birthday'] and a['birthday'] == b['birthday']:
+        matched.append('birthday')
+    total = sum(WEIGHTS[field] for field in matched)
+
+    tokens_a, tokens_b = address_tokens(a['address']), address_tokens(
+        b['address']
+    )
+    if tokens_a and tokens_b:
+        similarity = len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+        if similarity >= 0.5:
+            matched.append('address')
+            total += WEIGHTS['address'] * similarity
+    return round(min(total, 1.0), 3), matched
+
+
+def block_pairs(block):
+    """Yields the pairs of rows of a block to compare, within a sliding
+    window over the birthday ordered rows of oversized blocks"""
+    window = len(block) if len(block) <= MAX_BLOCK_SIZE else WINDOW_SIZE
+    for i, a in enumerate(block):
+        for b in block[i + 1:i + window]:
+            yield a, b
+
+
+def iter_blocks(queryset):
+    """Yields blocks of profile values rows with the same block_key"""
+    rows = queryset.exclude(block_key='').exclude(
+        block_key__isnull=True
+    ).values(*PROFILE_FIELDS).order_by('block_key', 'birthday', 'pk')
+    for key, block in groupby(
+        rows.iterator(chunk_size=CHUNK_SIZE), key=itemgetter('block_key')
+    ):
+        block = list(block)
+        if len(block) > 1:
+            yield key, block
+
+
+def find_candidates(queryset, threshold=THRESHOLD):
+    """Yields (block key, pk a, pk b, score, matched fields) of candidate
+    duplicate pairs, pk a < pk b"""
+    for key, block in iter_blocks(queryset):
+        if len(block) > MAX_BLOCK_SIZE:
+            logger.warning(  # prints function name
+                f"{_getframe().f_code.co_name} Block {key} has {len(block)} "
+                f"profiles, comparing within a window of {WINDOW_SIZE}"
+            )
+        for a, b in block_pairs(block):
+            value, matched = score(a, b)
+            if value >= threshold:
+                pks = sorted((a['pk'], b['pk']))
+                yield key, pks[0], pks[1], value, matched
+
+
+def update_block_keys(queryset):
+    """Updates the block keys of profiles in chunks of pk ranges
+    Returns the number of profiles whose key changed"""
+    rows = queryset.values(*PROFILE_FIELDS).order_by('pk')
+    changed, last_pk = 0, None
+    while True:
+        batch_qs = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        chunk = list(batch_qs[:CHUNK_SIZE])
+        if not chunk:
+            break
+        updates, now = [], timezone.now()
+        for row in chunk:
+            key = block_key(row)
+            if key != (row['block_key'] or ''):
+                updates.append(
+                    Profile(pk=row['pk'], block_key=key, last_updated=now)
+                )
+        Profile.objects.bulk_update(updates, ['block_key', 'last_updated'])
+        changed += len(updates)
+        last_pk = chunk[-1]['pk']
+    return changed
+
+
+def store_candidates(candidates):
+    """Creates the new pairs of a batch of DuplicateCandidate and refreshes
+    the score, matched fields and block key of the pairs stored already,
+    keeping their status. Returns the number of pairs created"""
+    existing = dict(
+        ((pk_a, pk_b), pk) for pk, pk_a, pk_b in
+        DuplicateCandidate.objects.filter(
+            profile_a_id__in={c.profile_a_id for c in candidates},
+            profile_b_id__in={c.profile_b_id for c in candidates},
+        ).values_list('pk', 'profile_a_id', 'profile_b_id')
+    )
+    updates, new = [], []
+    for candidate in candidates:
+        candidate.pk = existing.get(
+            (candidate.profile_a_id, candidate.profile_b_id)
+        )
+        (new if candidate.pk is None else updates).append(candidate)
+    DuplicateCandidate.objects.bulk_update(
+        updates, ['score', 'matched', 'block_key', 'updated_at']
+    )
+    # pairs stored meanwhile by a concurrent run are skipped
+    return len(DuplicateCandidate.objects.bulk_create(
+        new, ignore_conflicts=True
+    ))
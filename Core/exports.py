@@ -0,0 +1,156 @@
+"""Core > exports.py
+User and profile exports in constant memory. Rows are read as value tuples
+through a server-side cursor (QuerySet.iterator) and encoded as CSV or
+newline delimited JSON in chunks of about BUFFER_SIZE bytes, optionally
+gzipped on the fly, so a response can stream any number of users.
+Admin exports of import-export resources are written row by row to files,
+XLSX with openpyxl in write-only mode.
+"""
+# PYTHON IMPORTS
+import csv
+import io
+import logging
+import zlib
+from sys import _getframe
+# DJANGO IMPORTS
+from django.core.serializers.json import DjangoJSONEncoder
+# PLUGIN IMPORTS
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = (
+    'id', 'email', 'first_name', 'last_name', 'phone', 'is_active',
+    'is_staff', 'date_joined', 'profile__birthday', 'profile__gender',
+    'profile__nid', 'profile__passport', 'profile__address',
+    'profile__thana', 'profile__district', 'profile__division',
+    'profile__postal', 'profile__latitude', 'profile__longitude',
+)
+# file format: (extension, content type)
+EXPORT_FORMATS = {
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'ndjson': ('ndjson', 'application/x-ndjson'),
+}
+CHUNK_SIZE = 2000  # rows fetched per round trip of the server-side cursor
+BUFFER_SIZE = 64 * 1024  # bytes of output yielded at once
+
+
+class Echo:
+    """File-like object returning what is written, for csv.writer"""
+
+    def write(self, value):
+        """Returns the value instead of writing it"""
+        return value
+
+
+def export_columns(fields=EXPORT_FIELDS):
+    """Returns the column names of fields, ex: profile__birthday -> birthday"""
+    return [field.split('__')[-1] for field in fields]
+
+
+def export_rows(queryset, fields=EXPORT_FIELDS):
+    """Yields value tuples of a user queryset, chunk by chunk"""
+    return queryset.values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+def csv_lines(rows, columns):
+    """Yields the CSV lines of rows, starting with the header"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows, columns):
+    """Yields a JSON object line per row"""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + '\n'
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Yields utf-8 encoded chunks of at least size bytes of joined lines,
+    the last one shorter"""
+    parts, length = [], 0
+    for line in lines:
+        parts.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(parts).encode()
+            parts, length = [], 0
+    if parts:
+        yield ''.join(parts).encode()
+
+
+def gzipped(chunks, level=6):
+    """Yields the gzip stream of chunks of bytes"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(queryset, file_format='csv', compress=False,
+                  fields=EXPORT_FIELDS):
+    """Returns an iterator of the bytes of the queryset export"""
+    logger.debug(  # prints function name
+        f"{_getframe().f_code.co_name} Exporting users as {file_format}, "
+        f"compress={compress}"
+    )
+    lines = {'csv': csv_lines, 'ndjson': ndjson_lines}[file_format]
+    chunks = buffered(lines(
+        export_rows(queryset, fields), export_columns(fields)
+    ))
+    return gzipped(chunks) if compress else chunks
+
+
+def resource_rows(resource, queryset, chunk_size=CHUNK_SIZE):
+    """Yields the export rows of an import-export resource, reading the
+    queryset in pk ordered chunks with many to many fields prefetched"""
+    m2m = [
+        field.name for field in queryset.model._meta.get_fields()
+        if field.many_to_many and not field.auto_created
+    ]
+    queryset = queryset.order_by('pk').prefetch_related(*m2m)
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(
+            pk__gt=last_pk
+        )
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            break
+        for obj in chunk:
+            yield resource.export_resource(obj)
+        last_pk = chunk[-1].pk
+
+
+def write_csv(file, headers, rows):
+    """Writes headers and rows as utf-8 CSV to a binary file"""
+    text = io.TextIOWrapper(file, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(headers)
+    writer.writerows(rows)
+    text.flush()
+    text.detach()  # leaves the file open
+
+
+def write_xlsx(file, headers, rows):
+    """Writes headers and rows as XLSX to a binary file, in write-only mode
+    rows are written out as they are appended instead of kept in memory"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(headers)
+    for row in rows:
+        sheet.append([
+            ILLEGAL_CHARACTERS_RE.sub('', value) if isinstance(value, str)
+            else value for value in row
+        ])
+    workbook.save(file)
+
+
+WRITERS = {'csv': write_csv, 'xlsx': write_xlsx}
@@ -24,4 +24,7 @@ class ProfileUpdateForm(forms.ModelForm):
     class Meta:
         """Meta class"""
         model = Profile
-        exclude = ('user', 'is_active', 'created_at', 'last_updated')
+        exclude = (
+            'user', 'is_active', 'created_at', 'last_updated',
+            'latitude', 'longitude',
+        )
@@ -0,0 +1,161 @@
+"""Core > gazetteer.py
+Offline gazetteer of Bangladesh divisions, districts and thanas.
+The bundled Core/data/gazetteer.json is loaded once per process into flat
+id keyed tuples plus normalized name indexes, so lookups never touch the
+database or the network. Centroids are approximate headquarter coordinates.
+"""
+# PYTHON IMPORTS
+import json
+import logging
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+from sys import _getframe
+
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'gazetteer.json'
+)
+DIVISION, DISTRICT, THANA = 'division', 'district', 'thana'
+LEVELS = (DIVISION, DISTRICT, THANA)
+
+# words dropped while normalizing, ex: "Dhaka Division" -> "dhaka"
+NOISE_WORDS = re.compile(r'\b(division|district|zila|zilla|upazila|thana)\b')
+NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+Place = namedtuple(
+    'Place', ('id', 'level', 'name', 'parent', 'latitude', 'longitude',
+              'postal')
+)
+Region = namedtuple('Region', ('division', 'district', 'thana'))
+
+
+def normalize(name):
+    """Returns the lookup key of a place name, ex: "Cox's Bazar" -> coxsbazar
+    Returns an empty string for empty names"""
+    if not name:
+        return ''
+    name = NOISE_WORDS.sub(' ', str(name).casefold())
+    return NON_ALNUM.sub('', name)
+
+
+class Gazetteer:
+    """In-memory division > district > thana hierarchy with name and postal
+    code indexes. Places are immutable tuples keyed by integer ids"""
+
+    def __init__(self, data):
+        """Builds the places and indexes from the gazetteer data dict"""
+        self.places = {level: {} for level in LEVELS}
+        self.names = {level: {} for level in LEVELS}  # key -> (ids, )
+        self.postals = {}  # postal code -> (thana ids, )
+        self.children = {}  # (level, id) -> [child ids]
+
+        parents = {DIVISION: None, DISTRICT: DIVISION, THANA: DISTRICT}
+        for level in LEVELS:
+            for row in data.get(f'{level}s', []):
+                parent_level = parents[level]
+                place = Place(
+                    id=row['id'], level=level, name=row['name'],
+                    parent=row.get(parent_level) if parent_level else None,
+                    latitude=row.get('latitude'),
+                    longitude=row.get('longitude'),
+                    postal=row.get('postal'),
+                )
+                self.places[level][place.id] = place
+                for name in [place.name] + row.get('aliases', []):
+                    self._index(self.names[level], normalize(name), place.id)
+                if level == THANA and place.postal:
+                    self._index(self.postals, place.postal, place.id)
+                if parent_level:
+                    self.children.setdefault(
+                        (parent_level, place.parent), []
+                    ).append(place.id)
+
+    @staticmethod
+    def _index(index, key, place_id):
+        """Adds place_id to the tuple of ids under key"""
+        if key and place_id not in index.get(key, ()):
+            index[key] = index.get(key, ()) + (place_id, )
+
+    def _children_of(self, level, ids, parent):
+        """Returns the ids of places at level whose parent id is parent"""
+        return tuple(i for i in ids if self.places[level][i].parent == parent)
+
+    def get(self, level, place_id):
+        """Returns the place with the given level and id, else None"""
+        return self.places[level].get(place_id)
+
+    def parent(self, place):
+        """Returns the parent place, None for divisions"""
+        if place.level == THANA:
+            return self.get(DISTRICT, place.parent)
+        if place.level == DISTRICT:
+            return self.get(DIVISION, place.parent)
+        return None
+
+    def lookup(self, level, name, parent=None):
+        """Returns the place id matching name at level, else None
+        Ambiguous names (ex: Kotwali) are resolved with the parent id"""
+        ids = self.names[level].get(normalize(name), ())
+        if parent is not None:
+            ids = self._children_of(level, ids, parent)
+        if not ids and level == THANA and parent is not None:
+            # "Sadar" or the bare district name refers to the sadar thana
+            district = self.get(DISTRICT, parent)
+            if district and normalize(name) in ('sadar', normalize(
+                district.name
+            )):
+                ids = self.names[THANA].get(
+                    normalize(f'{district.name} Sadar'), ()
+                )
+        return ids[0] if len(ids) == 1 else None
+
+    def resolve(self, division=None, district=None, thana=None, postal=None):
+        """Returns a Region of (division, district, thana) ids resolved from
+        free text values, parents are inferred from resolved children"""
+        division_id = self.lookup(DIVISION, division)
+        district_id = self.lookup(DISTRICT, district, division_id)
+        if district_id is None and division_id is not None:
+            district_id = self.lookup(DISTRICT, district)
+        thana_id = self.lookup(THANA, thana, district_id)
+        if thana_id is None and postal:  # fall back to the postal code
+            ids = self.postals.get(str(postal).strip(), ())
+            if district_id is not None:
+                ids = self._children_of(THANA, ids, district_id)
+            thana_id = ids[0] if len(ids) == 1 else None
+        if thana_id is not None:
+            district_id = self.places[THANA][thana_id].parent
+        if district_id is not None:
+            division_id = self.places[DISTRICT][district_id].parent
+        return Region(division_id, district_id, thana_id)
+
+    def region_places(self, region):
+        """Returns a Region of places for a Region of ids"""
+        return Region(*(
+            self.get(level, place_id) if place_id is not None else None
+            for level, place_id in zip(LEVELS, region)
+        ))
+
+    def locate(self, region):
+        """Returns the centroid (latitude, longitude) of the most specific
+        place of a Region of ids, else None"""
+        for place in reversed(self.region_places(region)):
+            if place and place.latitude is not None:
+                return place.latitude, place.longitude
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_gazetteer(path=GAZETTEER_FILE):
+    """Returns the process wide gazetteer, loaded on first call"""
+    with open(path, encoding='utf-8') as file:
+        gazetteer = Gazetteer(json.load(file))
+    logger.debug(  # prints function name
+        f"{_getframe().f_code.co_name} Loaded gazetteer: " + ', '.join(
+            f"{len(gazetteer.places[level])} {level}s" for level in LEVELS
+        )
+    )
+    return gazetteer
@@ -0,0 +1,170 @@
+"""Core > geo.py
+Portable spatial helpers: geohash grid cells and great-circle distances.
+No spatial database extension is required, grid cells are plain strings and
+a cell's descendants share its prefix, so an indexed prefix (LIKE 'abc%')
+lookup prunes candidates before any exact distance filtering.
+https://en.wikipedia.org/wiki/Geohash
+"""
+# PYTHON IMPORTS
+import math
+
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+BASE32_INDEX = {c: i for i, c in enumerate(BASE32)}
+MAX_PRECISION = 12  # ~3.7cm x 1.9cm cells
+EARTH_RADIUS_KM = 6371.0088  # mean earth radius
+
+# (max zoom level, geohash precision) of map clustering grids, a country level
+# view (zoom 7) uses ~39km x 20km cells; above the last zoom level maps show
+# individual locations
+ZOOM_PRECISION = (
+    (2, 1), (4, 2), (6, 3), (8, 4), (11, 5), (13, 6), (15, 7),
+)
+GRID_PRECISIONS = tuple(precision for _, precision in ZOOM_PRECISION)
+
+
+def encode(latitude, longitude, precision=MAX_PRECISION):
+    """Returns the geohash of a coordinate with the given precision"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def decode_bbox(geohash):
+    """Returns (south, west, north, east) bounds of a geohash cell"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        bits = BASE32_INDEX[char]
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if bits >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def decode(geohash):
+    """Returns the (latitude, longitude) center of a geohash cell"""
+    south, west, north, east = decode_bbox(geohash)
+    return (south + north) / 2, (west + east) / 2
+
+
+def cell_size(precision):
+    """Returns (height, width) in degrees of cells with given precision"""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 - lng_bits
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def clamp_bbox(south, west, north, east):
+    """Returns the bounding box clamped to valid coordinates
+    Boxes crossing the antimeridian are not supported"""
+    return (
+        max(-90.0, min(south, north)), max(-180.0, min(west, east)),
+        min(90.0, max(south, north)), min(180.0, max(west, east)),
+    )
+
+
+def zoom_precision(zoom):
+    """Returns the grid precision of a map zoom level, None above the last
+    clustered zoom level"""
+    for max_zoom, precision in ZOOM_PRECISION:
+        if zoom <= max_zoom:
+            return precision
+    return None
+
+
+def tile_bbox(zoom, x, y):
+    """Returns (south, west, north, east) bounds of a web mercator XYZ tile"""
+    n = 1 << zoom
+
+    def tile_lat(row):
+        """latitude of the top edge of a tile row"""
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return tile_lat(y + 1), x / n * 360.0 - 180.0, tile_lat(y), \
+        (x + 1) / n * 360.0 - 180.0
+
+
+def cells_at(south, west, north, east, precision):
+    """Returns the sorted geohashes of a precision intersecting the bbox"""
+    south, west, north, east = clamp_bbox(south, west, north, east)
+    return sorted(set(_cells_at(south, west, north, east, precision)))
+
+
+def _cells_at(south, west, north, east, precision):
+    """Yields geohashes of all cells of a precision intersecting the bbox"""
+    height, width = cell_size(precision)
+    row = math.floor((south + 90.0) / height)
+    last_row = math.floor((north + 90.0) / height)
+    first_col = math.floor((west + 180.0) / width)
+    last_col = math.floor((east + 180.0) / width)
+    for r in range(row, last_row + 1):
+        lat = min(-90.0 + (r + 0.5) * height, 90.0)
+        for c in range(first_col, last_col + 1):
+            lng = min(-180.0 + (c + 0.5) * width, 180.0)
+            yield encode(lat, lng, precision)
+
+
+def _cell_count(south, west, north, east, precision):
+    """Returns the number of cells of a precision intersecting the bbox"""
+    height, width = cell_size(precision)
+    rows = math.floor((north + 90.0) / height) - \
+        math.floor((south + 90.0) / height) + 1
+    cols = math.floor((east + 180.0) / width) - \
+        math.floor((west + 180.0) / width) + 1
+    return rows * cols
+
+
+def covering_cells(south, west, north, east, max_cells=16):
+    """Returns (precision, cells) covering the bbox with the finest precision
+    that needs no more than max_cells cells"""
+    south, west, north, east = clamp_bbox(south, west, north, east)
+    precision = 1
+    while precision < MAX_PRECISION and _cell_count(
+        south, west, north, east, precision + 1
+    ) <= max_cells:
+        precision += 1
+    cells = sorted(set(_cells_at(south, west, north, east, precision)))
+    return precision, cells
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Returns the great-circle distance between two coordinates in km"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bbox(latitude, longitude, radius_km):
+    """Returns (south, west, north, east) bounds enclosing a circle"""
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    if cos_lat < 1e-12 or abs(latitude) + d_lat >= 90.0:  # touches a pole
+        return clamp_bbox(latitude - d_lat, -180.0, latitude + d_lat, 180.0)
+    d_lng = min(180.0, d_lat / cos_lat)
+    return clamp_bbox(
+        latitude - d_lat, longitude - d_lng,
+        latitude + d_lat, longitude + d_lng
+    )
@@ -0,0 +1,71 @@
+"""Core > geocoding.py
+Pluggable local geocoders for profiles. settings.GEOCODERS lists geocoder
+classes tried in order, the first returning coordinates wins, so a street
+level geocoder can be placed before the gazetteer centroid fallback.
+"""
+# PYTHON IMPORTS
+import logging
+from sys import _getframe
+# DJANGO IMPORTS
+from django.conf import settings
+from django.utils.module_loading import import_string
+# CORE IMPORTS
+from Core.gazetteer import get_gazetteer
+
+
+logger = logging.getLogger(__name__)
+
+
+class BaseGeocoder:
+    """Base geocoder, subclasses must implement geocode()"""
+
+    def geocode(self, profile):
+        """Returns (latitude, longitude) of the profile's address fields
+        (address, thana, district, division, postal), else None"""
+        raise NotImplementedError('subclasses must implement geocode()')
+
+
+class GazetteerGeocoder(BaseGeocoder):
+    """Locates profiles at the centroid of their most specific gazetteer
+    place: thana, else district, else division"""
+
+    def __init__(self, gazetteer=None):
+        """init"""
+        self.gazetteer = gazetteer or get_gazetteer()
+
+    def geocode(self, profile):
+        """Returns the centroid of the profile's resolved region"""
+        region = self.gazetteer.resolve(
+            profile.division, profile.district, profile.thana, profile.postal
+        )
+        return self.gazetteer.locate(region)
+
+
+class ChainGeocoder(BaseGeocoder):
+    """Tries each geocoder in order until one returns coordinates"""
+
+    def __init__(self, geocoders):
+        """init"""
+        self.geocoders = list(geocoders)
+
+    def geocode(self, profile):
+        """Returns the first coordinates found, else None"""
+        for geocoder in self.geocoders:
+            try:
+                location = geocoder.geocode(profile)
+            except Exception as e:  # a broken geocoder must not stop a batch
+                logger.error(  # prints class and function name
+                    f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+                    f"{geocoder.__class__.__name__} failed for {profile}: {e}"
+                )
+                continue
+            if location:
+                return location
+        return None
+
+
+def get_geocoder():
+    """Returns a ChainGeocoder of settings.GEOCODERS"""
+    return ChainGeocoder(
+        import_string(path)() for path in settings.GEOCODERS
+    )
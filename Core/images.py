@@ -0,0 +1,63 @@
+"""Core > images.py
+Image decoding for resized output. JPEGs are opened in draft mode, so the
+decoder scales by 1/2, 1/4 or 1/8 while decoding (DCT scaling) instead of
+decoding every pixel of a multi-megapixel photo first; the EXIF orientation
+is applied and metadata (EXIF, GPS) is dropped in the same pass.
+"""
+# PYTHON IMPORTS
+import logging
+from sys import _getframe
+# PLUGIN IMPORTS
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+ORIENTATION = 0x0112  # EXIF orientation tag
+TRANSPOSED = (5, 6, 7, 8)  # orientations rotating by 90 or 270 degrees
+KEEP_INFO = ('icc_profile', 'transparency')  # image info kept in outputs
+REDUCING_GAP = 3.0  # resize reduces by integer factors down to 3x the size
+
+
+def open_image(file, size=None):
+    """Returns an image decoded at the smallest scale covering size
+    (width, height) after orientation, upright and without metadata
+    Decodes at full scale when size is None or the format has no draft"""
+    image = Image.open(file)
+    orientation = image.getexif().get(ORIENTATION, 1)
+    full_size = image.size
+    if size and image.format == 'JPEG':
+        width, height = size
+        if orientation in TRANSPOSED:  # size of the image before rotation
+            width, height = height, width
+        image.draft(image.mode, (width, height))
+    image = ImageOps.exif_transpose(image)
+    image.info = {
+        key: value for key, value in image.info.items() if key in KEEP_INFO
+    }
+    logger.debug(  # prints function name
+        f"{_getframe().f_code.co_name} Decoded {full_size} image at "
+        f"{image.size} for {size}"
+    )
+    return image
+
+
+def fit_image(image, size):
+    """Returns the image center cropped to the aspect ratio of size and
+    resized to size, in a single resampling pass"""
+    width, height = image.size
+    ratio = size[0] / size[1]
+    if width / height > ratio:  # wider, crop the sides
+        crop = height * ratio
+        box = ((width - crop) / 2, 0, (width + crop) / 2, height)
+    else:  # taller, crop the top and bottom
+        crop = width / ratio
+        box = (0, (height - crop) / 2, width, (height + crop) / 2)
+    return image.resize(
+        size, Image.LANCZOS, box=box, reducing_gap=REDUCING_GAP
+    )
+
+
+def cover_size(sizes):
+    """Returns the (width, height) covering every size of a list"""
+    return max(w for w, h in sizes), max(h for w, h in sizes)
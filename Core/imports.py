@@ -0,0 +1,188 @@
+"""Core > imports.py
+Bulk user imports from CSV or XLSX files in the columns of the UserResource
+export. Files are read as a stream (csv reader, openpyxl read-only mode) and
+rows are validated and written in chunks: users matched by email are bulk
+updated, new ones bulk created with their profiles and API tokens created
+in batches instead of by the post_save signals of each User.save().
+"""
+# PYTHON IMPORTS
+import csv
+import io
+import logging
+from itertools import islice
+from sys import _getframe
+# DJANGO IMPORTS
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+# DRF IMPORTS
+from rest_framework.authtoken.models import Token
+# PLUGIN IMPORTS
+from openpyxl import load_workbook
+# CORE IMPORTS
+from Core.models import Profile
+from Core.models.daily import count_days
+from Core.models.density import apply_density_changes, density_changes
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+# columns imported, others (ex: id, groups, date_joined) are ignored
+IMPORT_FIELDS = (
+    'email', 'phone', 'first_name', 'last_name', 'is_active', 'is_staff',
+    'password',
+)
+BOOLEAN_FIELDS = ('is_active', 'is_staff')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+def csv_rows(file):
+    """Yields dicts of the rows of a binary CSV file"""
+    yield from csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig'))
+
+
+def xlsx_rows(file):
+    """Yields dicts of the rows of the first sheet of a XLSX file, read in
+    read-only mode which parses rows as they are iterated"""
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [str(header or '') for header in next(rows, ())]
+        for values in rows:
+            yield dict(zip(headers, values))
+    finally:
+        workbook.close()
+
+
+READERS = {'csv': csv_rows, 'xlsx': xlsx_rows}
+
+
+def count_rows(file, file_format):
+    """Returns the number of data rows of a file, estimated for CSV from
+    its line count, then rewinds the file"""
+    if file_format == 'xlsx':
+        workbook = load_workbook(file, read_only=True)
+        total = (workbook.active.max_row or 1) - 1
+        workbook.close()
+    else:
+        chunks = iter(lambda: file.read(1 << 20), b'')
+        total = sum(chunk.count(b'\n') for chunk in chunks) - 1
+    file.seek(0)
+    return max(total, 0)
+
+
+def clean_row(row):
+    """Returns the imported field values of a row, '' and None are unset"""
+    values = {}
+    for field in IMPORT_FIELDS:
+        value = row.get(field)
+        if value is None or str(value).strip() == '':
+            continue
+        value = str(value).strip()
+        if field in BOOLEAN_FIELDS:
+            value = value.lower() in TRUE_VALUES
+        values[field] = value
+    return values
+
+
+def row_errors(user, values):
+    """Returns the list of validation errors of a user built from a row"""
+    errors = []
+    if values.get('password'):
+        try:
+            identify_hasher(values['password'])
+        except ValueError:
+            errors.append('password: Must be a password hash, as exported')
+    try:
+        user.full_clean(
+            exclude=['password', 'last_login', 'date_joined', 'last_updated'],
+            validate_unique=False  # email matched per chunk instead
+        )
+    except ValidationError as e:
+        errors.extend(
+            f'{field}: {" ".join(messages)}'
+            for field, messages in e.message_dict.items()
+        )
+    return errors
+
+
+def import_chunk(rows, seen):
+    """Validates and writes a chunk of (row number, row) in a transaction
+    seen is the set of emails of previous chunks, duplicates are errors
+    Returns (created, updated, [{'row': number, 'errors': [...]}, ...])"""
+    user_model = get_user_model()
+    parsed = []
+    for number, row in rows:
+        values = clean_row(row)
+        email = user_model.objects.normalize_email(values.get('email', ''))
+        values['email'] = email
+        parsed.append((number, email, values))
+    existing = user_model.objects.in_bulk(
+        [email for number, email, values in parsed if email],
+        field_name='email'
+    )
+
+    creates, updates, errors, fields = [], [], [], set()
+    for number, email, values in parsed:
+        if not email:
+            errors.append({'row': number, 'errors': ['email: Required']})
+            continue
+        if email in seen:
+            errors.append({'row': number, 'errors': ['email: Duplicate row']})
+            continue
+        user = existing.get(email) or user_model(
+            password=make_password(None)  # unusable password
+        )
+        for field, value in values.items():
+            setattr(user, field, value)
+        failures = row_errors(user, values)
+        if failures:
+            errors.append({'row': number, 'errors': failures})
+            continue
+        seen.add(email)
+        if user.pk:
+            updates.append(user)
+            fields.update(values)
+        else:
+            creates.append(user)
+
+    with transaction.atomic():
+        now = timezone.now()
+        for user in updates:
+            user.last_updated = now
+        user_model.objects.bulk_update(
+            updates, sorted(fields - {'email'}) + ['last_updated']
+        )
+        user_model.objects.bulk_create(creates)
+        count_days(user_model, [user.date_joined for user in creates])
+        # primary keys are not set by bulk_create on every database
+        pks = user_model.objects.filter(
+            email__in=[user.email for user in creates]
+        ).values_list('pk', flat=True)
+        profiles = [Profile(user_id=pk) for pk in pks]
+        Profile.objects.bulk_create(profiles)
+        for profile in profiles:
+            profile._density_key = None  # counted as created
+        apply_density_changes(density_changes(profiles))
+        Token.objects.bulk_create([
+            Token(user_id=pk, key=Token.generate_key()) for pk in pks
+        ])
+    logger.debug(  # prints function name
+        f"{_getframe().f_code.co_name} Imported chunk: {len(creates)} "
+        f"created, {len(updates)} updated, {len(errors)} failed"
+    )
+    return len(creates), len(updates), errors
+
+
+def import_chunks(file, file_format, chunk_size=CHUNK_SIZE):
+    """Yields the (rows, created, updated, errors) of each chunk of a file"""
+    rows = enumerate(READERS[file_format](file), 2)  # row 1 is the header
+    seen = set()
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield (len(chunk), ) + import_chunk(chunk, seen)
@@ -0,0 +1,114 @@
+"""Core > management > commands > benchmark_images.py"""
+# PYTHON IMPORTS
+import os
+import statistics
+import time
+from io import BytesIO
+# DJANGO IMPORTS
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+# PLUGIN IMPORTS
+from PIL import Image, ImageDraw, ImageOps, UnidentifiedImageError
+# CORE IMPORTS
+from Core.images import cover_size, fit_image, open_image
+
+SAMPLE_SIZES = ((1280, 960), (3024, 4032), (4000, 3000), (6000, 4000))
+
+
+def sample_image(size):
+    """Returns the bytes of a synthetic photo-like JPEG with EXIF"""
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for i in range(0, size[0], 97):
+        draw.ellipse((i, i % size[1], i + 300, i % size[1] + 200),
+                     fill=(i % 256, 120, 200))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated, as phones store portrait photos
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=90, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def full_decode(data, size):
+    """Baseline: decodes every pixel, then orients and resizes"""
+    image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    return image, ImageOps.fit(image, size, Image.LANCZOS)
+
+
+def draft_decode(data, size):
+    """Draft mode decoding at the target scale"""
+    image = open_image(BytesIO(data), size)
+    return image, fit_image(image, size)
+
+
+class Command(BaseCommand):
+    """Command to compare full and draft mode decoding of avatar images"""
+    help = "Benchmarks draft mode image decoding against full decoding"
+
+    def add_arguments(self, parser):
+        """command arguments"""
+        parser.add_argument(
+            'paths', nargs='*',
+            help="Image files or folders, default: synthetic sample photos"
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=5, help="Runs per image and method"
+        )
+
+    def handle(self, *args, **options):
+        """handler function"""
+        size = cover_size(settings.IMAGE_RENDITIONS.values())
+        samples = list(self.samples(options['paths']))
+        if not samples:
+            raise CommandError("No images found")
+        self.stdout.write(
+            f"{'image':<28} {'method':<6} {'decoded':>11} {'memory':>9} "
+            f"{'time':>9}"
+        )
+        for name, data in samples:
+            try:  # files that are no images, or broken ones, are skipped
+                lines = [
+                    self.benchmark(name, method, decode, data, size,
+                                   options['repeat'])
+                    for method, decode in (('full', full_decode),
+                                           ('draft', draft_decode))
+                ]
+            except (UnidentifiedImageError, OSError,
+                    Image.DecompressionBombError) as e:
+                self.stderr.write(f"Skipped {name}: {e}")
+                continue
+            for line in lines:
+                self.stdout.write(line)
+
+    @staticmethod
+    def benchmark(name, method, decode, data, size, repeat):
+        """Returns the report line of the median of repeat decodes"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            decoded, output = decode(data, size)
+            timings.append(time.perf_counter() - start)
+        # decoded pixel buffer, the dominant allocation
+        memory = decoded.width * decoded.height * len(decoded.getbands())
+        return (
+            f"{name[-28:]:<28} {method:<6} "
+            f"{decoded.width:>5}x{decoded.height:<5} "
+            f"{memory / 2 ** 20:>6.1f}MiB "
+            f"{statistics.median(timings) * 1000:>7.1f}ms"
+        )
+
+    @staticmethod
+    def samples(paths):
+        """Yields (name, bytes) of the images under paths, or samples"""
+        if not paths:
+            for size in SAMPLE_SIZES:
+                yield f'sample {size[0]}x{size[1]}.jpg', sample_image(size)
+            return
+        for path in paths:
+            files = [path] if os.path.isfile(path) else [
+                os.path.join(root, name)
+                for root, dirs, names in os.walk(path) for name in names
+            ]
+            for file in sorted(files):
+                with open(file, 'rb') as f:
+                    yield os.path.basename(file), f.read()
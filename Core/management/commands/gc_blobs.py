@@ -0,0 +1,48 @@
+"""Core > management > commands > gc_blobs.py"""
+# PYTHON IMPORTS
+from datetime import timedelta
+# DJANGO IMPORTS
+from django.core.management.base import BaseCommand, CommandError
+# CORE IMPORTS
+from Core.storage import (
+    GC_GRACE, ContentAddressedStorage, collect_garbage, profile_image_storage,
+    recount_references
+)
+
+
+class Command(BaseCommand):
+    """Command to remove unreferenced content addressed profile images"""
+    help = "Removes blobs of the content addressed storage left unreferenced"
+
+    def add_arguments(self, parser):
+        """command arguments"""
+        parser.add_argument(
+            '--recount', action='store_true',
+            help="Recount references from the file fields first"
+        )
+        parser.add_argument(
+            '--grace', type=int, default=GC_GRACE.total_seconds(),
+            help="Seconds a blob stays unreferenced before it is removed"
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report what would be removed without removing it"
+        )
+
+    def handle(self, *args, **options):
+        """handler function"""
+        storage = profile_image_storage()
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError(
+                "settings.PROFILE_IMAGE_STORAGE is not content addressed"
+            )
+        if options['recount']:
+            changed = recount_references()
+            self.stdout.write(f"Recounted references of {changed} blobs")
+        blobs, files, freed = collect_garbage(
+            storage, timedelta(seconds=options['grace']), options['dry_run']
+        )
+        verb = "Would remove" if options['dry_run'] else "Removed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {blobs} blobs and {files} stray files, {freed} bytes"
+        ))
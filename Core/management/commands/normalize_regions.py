@@ -0,0 +1,75 @@
+"""Core > management > commands > normalize_regions.py"""
+# PYTHON IMPORTS
+from collections import Counter
+# DJANGO IMPORTS
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+# CORE IMPORTS
+from Core.gazetteer import get_gazetteer
+from Core.models import Profile
+from Core.models.density import (
+    DENSITY_FIELDS, apply_density_changes, density_changes
+)
+from Core.models.profile import REGION_CODE_FIELDS
+
+
+class Command(BaseCommand):
+    """Command to normalize profile divisions, districts and thanas to the
+    canonical gazetteer names and ids"""
+    help = "Normalizes profile region names to canonical gazetteer ids"
+
+    def add_arguments(self, parser):
+        """command arguments"""
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of profiles updated per query"
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report changes without saving them"
+        )
+
+    def handle(self, *args, **options):
+        """handler function"""
+        gazetteer = get_gazetteer()
+        batch_size = options['batch_size']
+        fields = ('division', 'district', 'thana') + REGION_CODE_FIELDS
+        queryset = Profile.objects.only(
+            'user_id', 'postal', *fields, *DENSITY_FIELDS
+        ).order_by('pk')
+
+        batch, stats, unresolved = [], Counter(), Counter()
+        for profile in queryset.iterator(chunk_size=batch_size):
+            stats['total'] += 1
+            before = tuple(getattr(profile, f) for f in fields)
+            region = profile.resolve_region()
+            for level, place in zip(
+                ('division', 'district', 'thana'),
+                gazetteer.region_places(region)
+            ):
+                if place:  # rewrite spelling variants to the canonical name
+                    setattr(profile, level, place.name)
+                elif getattr(profile, level):
+                    unresolved[(level, getattr(profile, level))] += 1
+            if tuple(getattr(profile, f) for f in fields) != before:
+                stats['changed'] += 1
+                profile.last_updated = timezone.now()  # for delta refreshes
+                batch.append(profile)
+            if len(batch) >= batch_size:
+                self._save(batch, fields, options['dry_run'])
+                batch = []
+        self._save(batch, fields, options['dry_run'])
+
+        for (level, value), count in unresolved.most_common(20):
+            self.stdout.write(f"Unresolved {level}: {value!r} ({count})")
+        self.stdout.write(self.style.SUCCESS(
+            f"Normalized {stats['changed']} of {stats['total']} profiles"
+            f"{' (dry run)' if options['dry_run'] else ''}"
+        ))
+
+    @staticmethod
+    def _save(batch, fields, dry_run):
+        """Saves a batch of profiles, skips signals"""
+        if batch and not dry_run:
+            Profile.objects.bulk_update(batch, fields + ('last_updated', ))
+            apply_density_changes(density_changes(batch))
@@ -0,0 +1,17 @@
+"""Core > management > commands > rebuild_region_stats.py"""
+# DJANGO IMPORTS
+from django.core.management.base import BaseCommand
+# CORE IMPORTS
+from Core.models.stats import rebuild_region_stats
+
+
+class Command(BaseCommand):
+    """Command to rebuild the materialized region statistics from scratch"""
+    help = "Rebuilds the region statistics from every profile"
+
+    def handle(self, *args, **options):
+        """handler function"""
+        total = rebuild_region_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt region statistics of {total} profiles"
+        ))
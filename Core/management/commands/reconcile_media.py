@@ -0,0 +1,55 @@
+"""Core > management > commands > reconcile_media.py"""
+# PYTHON IMPORTS
+import os
+from datetime import timedelta
+# DJANGO IMPORTS
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+# CORE IMPORTS
+from Core.models import Profile
+from Core.renditions import rendition_names
+from Core.storage import orphan_files
+
+MEDIA_FOLDER = 'Users'
+
+
+class Command(BaseCommand):
+    """Command to remove profile media files no profile references, ex: left
+    by deletions failing in the delete_media_files celery task"""
+    help = "Removes orphaned files under Users/ in a single directory scan"
+
+    def add_arguments(self, parser):
+        """command arguments"""
+        parser.add_argument(
+            '--grace', type=int, default=3600,
+            help="Seconds since modified before a file can be an orphan"
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Report orphaned files without removing them"
+        )
+
+    def handle(self, *args, **options):
+        """handler function"""
+        referenced = set()
+        for image, renditions in Profile.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', 'image_renditions').iterator():
+            referenced.add(image)
+            referenced.update(rendition_names(renditions))
+
+        storage = Profile._meta.get_field('image').storage
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        files, freed = 0, 0
+        for name, path, size in orphan_files(
+            storage, MEDIA_FOLDER, referenced, cutoff
+        ):
+            if options['verbosity'] > 1:
+                self.stdout.write(name)
+            if not options['dry_run']:
+                os.remove(path)
+            files, freed = files + 1, freed + size
+        verb = "Would remove" if options['dry_run'] else "Removed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {files} orphaned files, {freed} bytes"
+        ))
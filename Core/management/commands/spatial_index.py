@@ -0,0 +1,25 @@
+"""Core > management > commands > spatial_index.py"""
+# PYTHON IMPORTS
+import time
+# DJANGO IMPORTS
+from django.core.management.base import BaseCommand
+# CORE IMPORTS
+from Core.spatial_index import SpatialIndex, located_profiles
+
+
+class Command(BaseCommand):
+    """Command to build the profile spatial index and report its memory
+    usage. The index a serving process keeps up to date from the signals is
+    checked in that process by the api map/nearest/check/ endpoint"""
+    help = "Builds the profile spatial index and reports its memory usage"
+
+    def handle(self, *args, **options):
+        """handler function"""
+        start = time.perf_counter()
+        index = SpatialIndex(located_profiles())
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"Indexed {len(index.tree)} profiles in {elapsed:.2f}s, "
+            f"{index.memory_usage() / 1024:.1f} KiB, "
+            f"{len(index.tree.levels)} levels"
+        )
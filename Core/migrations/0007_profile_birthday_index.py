@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-19 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Core', '0006_alter_user_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='birthday',
+            field=models.DateField(blank=True, db_index=True, null=True, verbose_name='Date of Birth'),
+        ),
+    ]
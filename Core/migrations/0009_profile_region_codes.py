@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-19 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Core', '0008_profile_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='district_code',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, editable=False, null=True, verbose_name='District ID'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='division_code',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, editable=False, null=True, verbose_name='Division ID'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='thana_code',
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True, verbose_name='Thana ID'),
+        ),
+    ]
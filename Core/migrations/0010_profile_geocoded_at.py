@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-19 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Core', '0009_profile_region_codes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='geocoded_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Geocoded At'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2 on 2026-10-19 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Core', '0010_profile_geocoded_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionDensity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('division', 'division'), ('district', 'district'), ('thana', 'thana')], max_length=8, verbose_name='Level')),
+                ('code', models.PositiveIntegerField(verbose_name='Gazetteer ID')),
+                ('gender', models.CharField(blank=True, max_length=1, verbose_name='Gender')),
+                ('is_active', models.BooleanField(verbose_name='Active')),
+                ('count', models.IntegerField(default=0, verbose_name='Count')),
+            ],
+            options={
+                'verbose_name_plural': 'region densities',
+                'unique_together': {('level', 'code', 'gender', 'is_active')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CellDensity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precision', models.PositiveSmallIntegerField(verbose_name='Precision')),
+                ('cell', models.CharField(max_length=7, verbose_name='Grid Cell')),
+                ('gender', models.CharField(blank=True, max_length=1, verbose_name='Gender')),
+                ('is_active', models.BooleanField(verbose_name='Active')),
+                ('count', models.IntegerField(default=0, verbose_name='Count')),
+            ],
+            options={
+                'verbose_name_plural': 'cell densities',
+                'unique_together': {('precision', 'cell', 'gender', 'is_active')},
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2 on 2026-10-19 12:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Core', '0011_density'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileStat',
+            fields=[
+                ('profile_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('division_code', models.PositiveSmallIntegerField()),
+                ('district_code', models.PositiveSmallIntegerField()),
+                ('thana_code', models.PositiveIntegerField()),
+                ('gender', models.CharField(blank=True, max_length=1)),
+                ('age_band', models.CharField(blank=True, max_length=8)),
+                ('is_active', models.BooleanField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Watermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='Name')),
+                ('value', models.DateTimeField(blank=True, null=True, verbose_name='Value')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='last_updated',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True, verbose_name='Last Updated'),
+        ),
+        migrations.CreateModel(
+            name='RegionStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('division_code', models.PositiveSmallIntegerField(verbose_name='Division ID')),
+                ('district_code', models.PositiveSmallIntegerField(verbose_name='District ID')),
+                ('thana_code', models.PositiveIntegerField(verbose_name='Thana ID')),
+                ('gender', models.CharField(blank=True, max_length=1, verbose_name='Gender')),
+                ('age_band', models.CharField(blank=True, max_length=8, verbose_name='Age Band')),
+                ('is_active', models.BooleanField(verbose_name='Active')),
+                ('count', models.IntegerField(default=0, verbose_name='Count')),
+            ],
+            options={
+                'verbose_name': 'region statistic',
+                'unique_together': {('division_code', 'district_code', 'thana_code', 'gender', 'age_band', 'is_active')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2 on 2026-10-19 12:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Core', '0012_region_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='block_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True, verbose_name='Duplicate Block'),
+        ),
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(db_index=True, verbose_name='Score')),
+                ('matched', models.CharField(max_length=255, verbose_name='Matched Fields')),
+                ('block_key', models.CharField(max_length=64, verbose_name='Block Key')),
+                ('status', models.CharField(choices=[('new', 'New'), ('confirmed', 'Confirmed'), ('dismissed', 'Dismissed')], db_index=True, default='new', max_length=10, verbose_name='Status')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('profile_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Core.profile')),
+                ('profile_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Core.profile')),
+            ],
+            options={
+                'ordering': ('-score',),
+                'unique_together': {('profile_a', 'profile_b')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-19 13:05
+
+import Core.models.profile
+import Core.storage
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Core', '0014_profile_image_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Name')),
+                ('digest', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256')),
+                ('size', models.BigIntegerField(verbose_name='Size')),
+                ('refs', models.IntegerField(default=0, verbose_name='References')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('last_updated', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Last Updated')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=Core.storage.profile_image_storage, upload_to=Core.models.profile.media_upload_path, verbose_name='Profile Picture'),
+        ),
+    ]
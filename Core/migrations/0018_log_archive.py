@@ -0,0 +1,64 @@
+# Generated by Django 3.2 on 2026-10-19 13:23
+
+from django.db import migrations, models
+
+
+# django_admin_log indexes of the admin date hierarchy and list filters
+LOG_ENTRY_INDEXES = {
+    'core_logentry_time_idx': '(action_time)',
+    'core_logentry_flag_time_idx': '(action_flag, action_time)',
+    'core_logentry_type_time_idx': '(content_type_id, action_time)',
+}
+
+
+def create_log_entry_indexes(apps, schema_editor):
+    """Creates the indexes without locking django_admin_log writes on
+    PostgreSQL, plainly elsewhere"""
+    concurrently = 'CONCURRENTLY ' \
+        if schema_editor.connection.vendor == 'postgresql' else ''
+    for name, columns in LOG_ENTRY_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX {concurrently}{name} ON django_admin_log {columns}'
+        )
+
+
+def drop_log_entry_indexes(apps, schema_editor):
+    """Drops the indexes of create_log_entry_indexes"""
+    vendor = schema_editor.connection.vendor
+    for name in LOG_ENTRY_INDEXES:
+        if vendor == 'postgresql':
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY {name}')
+        elif vendor == 'mysql':
+            schema_editor.execute(f'DROP INDEX {name} ON django_admin_log')
+        else:
+            schema_editor.execute(f'DROP INDEX {name}')
+
+
+class Migration(migrations.Migration):
+    atomic = False  # CREATE INDEX CONCURRENTLY runs outside a transaction
+
+    dependencies = [
+        ('Core', '0017_import_jobs'),
+        ('admin', '0003_logentry_add_action_flag_choices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_action_time', models.DateTimeField(db_index=True, verbose_name='First Action Time')),
+                ('last_action_time', models.DateTimeField(verbose_name='Last Action Time')),
+                ('count', models.PositiveIntegerField(verbose_name='Entries')),
+                ('size', models.PositiveIntegerField(verbose_name='Compressed Size')),
+                ('data', models.BinaryField(verbose_name='Data')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+            options={
+                'ordering': ('-first_action_time',),
+            },
+        ),
+        migrations.RunPython(
+            create_log_entry_indexes, drop_log_entry_indexes
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.2 on 2026-10-19 13:26
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def count_days(apps, schema_editor):
+    """Counts the existing rows, as Core.models.daily.rebuild_daily_counts"""
+    DailyCount = apps.get_model('Core', 'DailyCount')
+    for app_label, model_name, field in (
+        ('admin', 'LogEntry', 'action_time'), ('Core', 'User', 'date_joined')
+    ):
+        rows = apps.get_model(app_label, model_name).objects.annotate(
+            d=TruncDate(field, tzinfo=timezone.get_current_timezone())
+        ).values('d').annotate(n=Count('pk')).order_by()
+        DailyCount.objects.bulk_create([
+            DailyCount(
+                key=f'{app_label.lower()}.{model_name.lower()}.{field}',
+                day=row['d'], count=row['n']
+            ) for row in rows.iterator() if row['d']
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Core', '0018_log_archive'),
+        ('admin', '0003_logentry_add_action_flag_choices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, verbose_name='Key')),
+                ('day', models.DateField(verbose_name='Day')),
+                ('count', models.IntegerField(default=0, verbose_name='Count')),
+            ],
+            options={
+                'unique_together': {('key', 'day')},
+            },
+        ),
+        migrations.RunPython(count_days, migrations.RunPython.noop),
+    ]
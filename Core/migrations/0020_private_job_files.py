@@ -0,0 +1,42 @@
+# Generated by Django 3.2 on 2026-10-19 13:49
+
+import Core.storage
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def move_job_files(apps, schema_editor):
+    """Moves the job files saved under MEDIA_ROOT to the job file storage"""
+    storage = Core.storage.job_file_storage()
+    for model_name in ('ExportJob', 'ImportJob'):
+        job_model = apps.get_model('Core', model_name)
+        for job in job_model.objects.exclude(file='').exclude(
+            file__isnull=True
+        ).iterator():
+            if not default_storage.exists(job.file.name):
+                continue
+            with default_storage.open(job.file.name, 'rb') as file:
+                name = storage.save(job.file.name, file)
+            job_model.objects.filter(pk=job.pk).update(file=name)
+            default_storage.delete(job.file.name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Core', '0019_daily_counts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=Core.storage.job_file_storage, upload_to='exports/', verbose_name='File'),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='file',
+            field=models.FileField(storage=Core.storage.job_file_storage, upload_to='imports/', verbose_name='File'),
+        ),
+        migrations.RunPython(move_job_files, migrations.RunPython.noop),
+    ]
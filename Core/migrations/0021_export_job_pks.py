@@ -0,0 +1,37 @@
+# Generated by Django 3.2 on 2026-10-19 13:53
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fail_unfinished_exports(apps, schema_editor):
+    """Fails the exports queued with a pickled query, started again by
+    their requester instead of exporting all users"""
+    apps.get_model('Core', 'ExportJob').objects.filter(
+        status__in=('pending', 'running')
+    ).update(
+        status='failed', error='Interrupted by an upgrade, export again',
+        finished_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Core', '0020_private_job_files'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            fail_unfinished_exports, migrations.RunPython.noop
+        ),
+        migrations.RemoveField(
+            model_name='exportjob',
+            name='query',
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='pks',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Primary Keys'),
+        ),
+    ]
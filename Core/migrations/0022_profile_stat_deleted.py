@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-19 14:01
+
+from django.db import migrations, models
+
+
+def mark_deleted(apps, schema_editor):
+    """Marks the counted keys of profiles deleted before the signal"""
+    Profile = apps.get_model('Core', 'Profile')
+    apps.get_model('Core', 'ProfileStat').objects.exclude(
+        profile_id__in=Profile.objects.values('pk')
+    ).update(deleted=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Core', '0021_export_job_pks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profilestat',
+            name='deleted',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.RunPython(mark_deleted, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-19 14:26
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Core', '0022_profile_stat_deleted'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='duplicatecandidate',
+            name='updated_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Updated At'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-19 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Core', '0023_duplicate_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='query',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Query'),
+        ),
+    ]
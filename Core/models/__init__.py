@@ -1,7 +1,18 @@
 """Core > models > __init__.py"""
 from .user import User
 from .profile import Profile
+from .density import CellDensity, RegionDensity
+from .stats import RegionStat, ProfileStat, Watermark
+from .duplicate import DuplicateCandidate
+from .blob import Blob
+from .job import ExportJob, ImportJob
+from .archive import LogArchive
+from .daily import DailyCount
 
 # update the following list to allow classes to be available for import
 # this is very useful especially when using from .file import *
-__all__ = [User, Profile, ]
+__all__ = [
+    User, Profile, CellDensity, RegionDensity, RegionStat, ProfileStat,
+    Watermark, DuplicateCandidate, Blob, ExportJob, ImportJob, LogArchive,
+    DailyCount,
+]
@@ -0,0 +1,27 @@
+"""Core > models > archive.py"""
+# DJANGO IMPORTS
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class LogArchive(models.Model):
+    """Batch of admin LogEntry rows moved out of django_admin_log by the
+    archive_log_entries celery task, stored as gzipped JSON lines
+    See Core.archive"""
+    first_action_time = models.DateTimeField(
+        _('First Action Time'), db_index=True
+    )
+    last_action_time = models.DateTimeField(_('Last Action Time'))
+    count = models.PositiveIntegerField(_('Entries'))
+    size = models.PositiveIntegerField(_('Compressed Size'))  # bytes
+    data = models.BinaryField(_('Data'), editable=False)
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+
+    class Meta:
+        """Meta class"""
+        ordering = ('-first_action_time', )
+
+    def __str__(self):
+        """String representation of LogArchive model"""
+        return f'{self.first_action_time:%Y-%m-%d %H:%M} - ' \
+            f'{self.last_action_time:%Y-%m-%d %H:%M} ({self.count})'
@@ -0,0 +1,69 @@
+"""Core > models > blob.py"""
+# DJANGO IMPORTS
+from django.db import models
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+# CORE IMPORTS
+from Core.storage import ContentAddressedStorage
+
+
+class Blob(models.Model):
+    """File stored once by content hash in Core.storage
+    ContentAddressedStorage, with the number of file fields referencing it.
+    Unreferenced blobs are removed by the gc_blobs management command"""
+    name = models.CharField(_('Name'), max_length=255, unique=True)
+    digest = models.CharField(_('SHA-256'), max_length=64, db_index=True)
+    size = models.BigIntegerField(_('Size'))
+    refs = models.IntegerField(_('References'), default=0)
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+    last_updated = models.DateTimeField(  # set when refs change
+        _('Last Updated'), default=timezone.now, db_index=True
+    )
+
+    def __str__(self):
+        """String representation of Blob model"""
+        return f'{self.name} ({self.refs})'
+
+
+def blob_fields(model, update_fields=None):
+    """Returns the file fields of a model stored in a content addressed
+    storage, among update_fields when given"""
+    return [
+        field for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+        if isinstance(field.storage, ContentAddressedStorage)
+        if update_fields is None or field.name in update_fields
+    ]
+
+
+@receiver(pre_save)
+def remember_blob_names(sender, instance, raw=False, using=None,
+                        update_fields=None, **kwargs):
+    """Remembers the stored names of the content addressed file fields of
+    an instance being saved, compared by reference_blobs"""
+    fields = [] if raw else blob_fields(sender, update_fields)
+    if not fields:
+        return
+    names = [field.attname for field in fields]
+    stored = None
+    if not instance._state.adding:
+        stored = sender._base_manager.using(using).filter(
+            pk=instance.pk
+        ).values(*names).first()
+    instance._blob_names = stored or dict.fromkeys(names)
+
+
+@receiver(post_save)
+def reference_blobs(sender, instance, update_fields=None, **kwargs):
+    """Adds a reference to the blobs the file fields of a saved instance
+    changed to, released by the storage delete of whoever removes the file,
+    ex: django_cleanup or Profile.remove_image_files"""
+    stored = instance.__dict__.pop('_blob_names', None)
+    if stored is None:
+        return
+    for field in blob_fields(sender, update_fields):
+        name = getattr(instance, field.attname).name
+        if name and name != stored.get(field.attname):
+            field.storage.add_reference(name)
@@ -0,0 +1,144 @@
+"""Core > models > daily.py
+Precomputed number of rows per local day of the admin date hierarchy fields,
+ex: LogEntry.action_time and User.date_joined, so the admin drilldown reads
+a row per day instead of scanning the table for its distinct dates. Counts
+are maintained incrementally on create and delete and fully rebuilt by the
+rebuild_daily_counts celery task, which also fixes bulk deletes.
+"""
+# PYTHON IMPORTS
+import logging
+from collections import Counter
+from sys import _getframe
+# DJANGO IMPORTS
+from django.contrib.admin.models import LogEntry
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncYear
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+# CORE IMPORTS
+from Core.models.user import User
+
+
+logger = logging.getLogger(__name__)
+
+# model: datetime field counted per day
+DAILY_COUNT_FIELDS = {
+    LogEntry: 'action_time',
+    User: 'date_joined',
+}
+
+
+class DailyCount(models.Model):
+    """Number of rows of a model per local day of one of its fields"""
+    key = models.CharField(_('Key'), max_length=100)  # see daily_key
+    day = models.DateField(_('Day'))
+    count = models.IntegerField(_('Count'), default=0)
+
+    class Meta:
+        """Meta class"""
+        unique_together = ('key', 'day')
+
+    def __str__(self):
+        """String representation of DailyCount model"""
+        return f'{self.key} {self.day}: {self.count}'
+
+
+def daily_key(model, field):
+    """Returns the DailyCount key of a model field
+    ex: LogEntry, action_time -> admin.logentry.action_time"""
+    return f'{model._meta.label_lower}.{field}'
+
+
+def local_day(value):
+    """Returns the day of a datetime in the current time zone"""
+    return timezone.localtime(value).date() if timezone.is_aware(value) \
+        else value.date()
+
+
+def count_days(model, values, delta=1):
+    """Adds delta to the counts of the days of datetimes of a model's
+    DAILY_COUNT_FIELDS field"""
+    key = daily_key(model, DAILY_COUNT_FIELDS[model])
+    days = Counter(local_day(value) for value in values if value)
+    for day, count in days.items():
+        rows = DailyCount.objects.filter(key=key, day=day)
+        if not rows.update(count=F('count') + count * delta):
+            try:
+                with transaction.atomic():
+                    DailyCount.objects.create(
+                        key=key, day=day, count=count * delta
+                    )
+            except IntegrityError:  # created concurrently
+                rows.update(count=F('count') + count * delta)
+
+
+def daily_range(model, field):
+    """Returns the (first, last) days with rows of a model field"""
+    days = DailyCount.objects.filter(
+        key=daily_key(model, field), count__gt=0
+    ).aggregate(first=Min('day'), last=Max('day'))
+    return days['first'], days['last']
+
+
+def period_counts(model, field, year=None, month=None):
+    """Returns [(date, count), ...] of the years with rows of a model field,
+    the months of a year or the days of a month"""
+    rows = DailyCount.objects.filter(
+        key=daily_key(model, field), count__gt=0
+    )
+    if year and month:
+        rows, period = rows.filter(day__year=year, day__month=month), F('day')
+    elif year:
+        rows, period = rows.filter(day__year=year), TruncMonth('day')
+    else:
+        period = TruncYear('day')
+    return list(rows.annotate(period=period).values_list('period').annotate(
+        total=Sum('count')
+    ).order_by('period'))
+
+
+def rebuild_daily_counts():
+    """Rebuilds the daily counts of DAILY_COUNT_FIELDS from their tables,
+    counted after deleting the old counts in one transaction: the counts of
+    rows created meanwhile wait for the deleted rows, then add up to the new
+    Returns the number of rows written"""
+    counts = []
+    with transaction.atomic():
+        DailyCount.objects.filter(key__in=[
+            daily_key(model, field)
+            for model, field in DAILY_COUNT_FIELDS.items()
+        ]).delete()
+        for model, field in DAILY_COUNT_FIELDS.items():
+            key = daily_key(model, field)
+            rows = model.objects.annotate(
+                d=TruncDate(field, tzinfo=timezone.get_current_timezone())
+            ).values('d').annotate(n=Count('pk')).order_by()
+            counts.extend(
+                DailyCount(key=key, day=row['d'], count=row['n'])
+                for row in rows.iterator() if row['d']
+            )
+        DailyCount.objects.bulk_create(counts, batch_size=1000)
+    logger.debug(  # prints function name
+        f"{_getframe().f_code.co_name} Rebuilt {len(counts)} daily counts"
+    )
+    return len(counts)
+
+
+@receiver(post_save, sender=LogEntry)
+@receiver(post_save, sender=User)
+def count_created_day(sender, instance, created, raw=False, **kwargs):
+    """Counts a created row on its day"""
+    if created and not raw:
+        count_days(sender, [getattr(instance, DAILY_COUNT_FIELDS[sender])])
+
+
+# LogEntry rows are deleted in bulk by Core.archive, which uncounts them,
+# and by cascade, fixed by the rebuild: a post_delete receiver would make
+# Django load and signal each deleted row
+@receiver(post_delete, sender=User)
+def uncount_deleted_day(sender, instance, **kwargs):
+    """Uncounts a deleted row from its day"""
+    count_days(sender, [getattr(instance, DAILY_COUNT_FIELDS[sender])], -1)
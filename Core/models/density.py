@@ -0,0 +1,226 @@
+"""Core > models > density.py
+Precomputed profile counts per map grid cell and per administrative region,
+split by gender and is_active. Counts are maintained incrementally from
+profile changes and fully rebuilt by the rebuild_density celery task.
+"""
+# PYTHON IMPORTS
+import logging
+from collections import Counter, deque
+from itertools import islice
+from sys import _getframe
+# DJANGO IMPORTS
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Coalesce, Substr
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+# CORE IMPORTS
+from Core.geo import GRID_PRECISIONS
+from Core.models.profile import Profile
+
+
+logger = logging.getLogger(__name__)
+
+REGION_LEVELS = (
+    ('division', 'division_code'),
+    ('district', 'district_code'),
+    ('thana', 'thana_code'),
+)
+DENSITY_FIELDS = (
+    'geo_cell', 'division_code', 'district_code', 'thana_code', 'gender',
+    'is_active',
+)
+UNCOUNTED = object()  # density key of profiles loaded with deferred fields
+BATCH_SIZE = 1000
+
+
+class CellDensity(models.Model):
+    """Number of profiles located in a grid cell"""
+    precision = models.PositiveSmallIntegerField(_('Precision'))
+    cell = models.CharField(_('Grid Cell'), max_length=max(GRID_PRECISIONS))
+    gender = models.CharField(_('Gender'), max_length=1, blank=True)
+    is_active = models.BooleanField(_('Active'))
+    count = models.IntegerField(_('Count'), default=0)
+
+    class Meta:
+        """Meta class"""
+        verbose_name_plural = 'cell densities'
+        unique_together = ('precision', 'cell', 'gender', 'is_active')
+
+    def __str__(self):
+        """String representation of CellDensity model"""
+        return f'{self.cell}: {self.count}'
+
+
+class RegionDensity(models.Model):
+    """Number of profiles in a gazetteer division, district or thana"""
+    level = models.CharField(
+        _('Level'), max_length=8,
+        choices=[(level, level) for level, field in REGION_LEVELS]
+    )
+    code = models.PositiveIntegerField(_('Gazetteer ID'))
+    gender = models.CharField(_('Gender'), max_length=1, blank=True)
+    is_active = models.BooleanField(_('Active'))
+    count = models.IntegerField(_('Count'), default=0)
+
+    class Meta:
+        """Meta class"""
+        verbose_name_plural = 'region densities'
+        unique_together = ('level', 'code', 'gender', 'is_active')
+
+    def __str__(self):
+        """String representation of RegionDensity model"""
+        return f'{self.level} {self.code}: {self.count}'
+
+
+def density_key(profile):
+    """Returns the density counters a profile contributes to"""
+    return (
+        profile.geo_cell, profile.division_code, profile.district_code,
+        profile.thana_code, profile.gender or '', bool(profile.is_active),
+    )
+
+
+def key_rows(key):
+    """Yields (model, lookup) of the rows a density key contributes to"""
+    if key is None:
+        return
+    geo_cell, gender, is_active = key[0], key[4], key[5]
+    split = {'gender': gender, 'is_active': is_active}
+    if geo_cell:
+        for precision in GRID_PRECISIONS:
+            yield CellDensity, (
+                ('precision', precision), ('cell', geo_cell[:precision]),
+                *split.items()
+            )
+    for (level, field), code in zip(REGION_LEVELS, key[1:4]):
+        if code is not None:
+            yield RegionDensity, (
+                ('level', level), ('code', code), *split.items()
+            )
+
+
+def density_changes(profiles, deleted=False):
+    """Returns the Counter of row deltas of changed profiles since they were
+    loaded or last counted, and marks them as counted"""
+    deltas = Counter()
+    for profile in profiles:
+        old = getattr(profile, '_density_key', UNCOUNTED)
+        if old is UNCOUNTED:  # not loaded with its density fields
+            logger.warning(  # prints function name
+                f"{_getframe().f_code.co_name} Skipped {profile.pk}, "
+                f"loaded with deferred density fields"
+            )
+            continue
+        new = None if deleted else density_key(profile)
+        if old != new:
+            deltas.subtract(key_rows(old))
+            deltas.update(key_rows(new))
+        profile._density_key = new
+    return deltas
+
+
+def apply_density_changes(deltas):
+    """Adds the Counter of row deltas to the density tables"""
+    for (model, lookup), delta in deltas.items():
+        if not delta:
+            continue
+        lookup = dict(lookup)
+        rows = model.objects.filter(**lookup)
+        if not rows.update(count=F('count') + delta):
+            try:
+                with transaction.atomic():
+                    model.objects.create(count=delta, **lookup)
+            except IntegrityError:  # created concurrently
+                rows.update(count=F('count') + delta)
+
+
+def lock_density():
+    """Locks the density tables until the end of the transaction, the
+    density changes of concurrent profile saves wait for it"""
+    if connection.vendor == 'postgresql':
+        tables = ', '.join(
+            connection.ops.quote_name(model._meta.db_table)
+            for model in (CellDensity, RegionDensity)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {tables} IN EXCLUSIVE MODE')
+    else:  # locking reads of every row, SQLite locks the whole database
+        for model in (CellDensity, RegionDensity):
+            deque(model.objects.select_for_update().values_list(
+                'pk'
+            ).iterator(), maxlen=0)
+
+
+def insert_rows(model, objs):
+    """Creates the objects of an iterable in batches
+    Returns the number of created rows"""
+    created = 0
+    while True:
+        batch = list(islice(objs, BATCH_SIZE))
+        if not batch:
+            return created
+        model.objects.bulk_create(batch)
+        created += len(batch)
+
+
+def rebuild_density():
+    """Rebuilds the density tables from the profiles table, counted and
+    swapped in one transaction holding the density tables locked, so the
+    changes of profiles saved meanwhile are counted once
+    Returns the number of rows written"""
+    profiles = Profile.objects.annotate(
+        g=Coalesce('gender', models.Value('')),
+        a=Coalesce('is_active', models.Value(False)),
+    )
+    cells = regions = 0
+    with transaction.atomic():
+        lock_density()
+        CellDensity.objects.all().delete()
+        RegionDensity.objects.all().delete()
+        for precision in GRID_PRECISIONS:
+            rows = profiles.filter(geo_cell__isnull=False).annotate(
+                c=Substr('geo_cell', 1, precision)
+            ).values('c', 'g', 'a').annotate(n=Count('pk')).order_by()
+            cells += insert_rows(CellDensity, (CellDensity(
+                precision=precision, cell=row['c'], gender=row['g'],
+                is_active=row['a'], count=row['n']
+            ) for row in rows.iterator(chunk_size=BATCH_SIZE)))
+        for level, field in REGION_LEVELS:
+            rows = profiles.filter(**{f'{field}__isnull': False}).values(
+                field, 'g', 'a'
+            ).annotate(n=Count('pk')).order_by()
+            regions += insert_rows(RegionDensity, (RegionDensity(
+                level=level, code=row[field], gender=row['g'],
+                is_active=row['a'], count=row['n']
+            ) for row in rows.iterator(chunk_size=BATCH_SIZE)))
+    logger.debug(  # prints function name
+        f"{_getframe().f_code.co_name} Rebuilt density: "
+        f"{cells} cells, {regions} regions"
+    )
+    return cells + regions
+
+
+def remember_density_key(profile, field_names):
+    """Remembers the counted density key of a profile loaded from the db
+    with field_names, see Profile.from_db"""
+    if set(DENSITY_FIELDS) <= set(field_names):
+        profile._density_key = density_key(profile)
+    else:
+        profile._density_key = UNCOUNTED  # never query while loading
+
+
+@receiver(post_save, sender=Profile)
+def update_density(sender, instance, created, raw=False, **kwargs):
+    """Counts the profile's density changes"""
+    if not raw:
+        if created:
+            instance._density_key = None
+        apply_density_changes(density_changes([instance]))
+
+
+@receiver(post_delete, sender=Profile)
+def remove_density(sender, instance, **kwargs):
+    """Uncounts a deleted profile"""
+    apply_density_changes(density_changes([instance], deleted=True))
@@ -0,0 +1,43 @@
+"""Core > models > duplicate.py"""
+# DJANGO IMPORTS
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+# CORE IMPORTS
+from Core.models.profile import Profile
+
+
+class DuplicateCandidate(models.Model):
+    """Pair of profiles likely describing the same person, found by the
+    find_duplicates celery task and reviewed in admin"""
+    NEW, CONFIRMED, DISMISSED = 'new', 'confirmed', 'dismissed'
+    STATUS_CHOICES = [
+        (NEW, 'New'), (CONFIRMED, 'Confirmed'), (DISMISSED, 'Dismissed'),
+    ]
+
+    profile_a = models.ForeignKey(  # the profile with the lower pk
+        Profile, on_delete=models.CASCADE, related_name='+'
+    )
+    profile_b = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name='+'
+    )
+    score = models.FloatField(_('Score'), db_index=True)
+    matched = models.CharField(_('Matched Fields'), max_length=255)
+    block_key = models.CharField(_('Block Key'), max_length=64)
+    status = models.CharField(
+        _('Status'), max_length=10, choices=STATUS_CHOICES, default=NEW,
+        db_index=True
+    )
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+    updated_at = models.DateTimeField(  # last found by find_duplicates
+        _('Updated At'), default=timezone.now, db_index=True
+    )
+
+    class Meta:
+        """Meta class"""
+        unique_together = ('profile_a', 'profile_b')
+        ordering = ('-score', )
+
+    def __str__(self):
+        """String representation of DuplicateCandidate model"""
+        return f'{self.profile_a_id} ~ {self.profile_b_id}: {self.score}'
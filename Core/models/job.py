@@ -0,0 +1,94 @@
+"""Core > models > job.py"""
+# DJANGO IMPORTS
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+# CORE IMPORTS
+from Core.models import User
+from Core.storage import job_file_storage
+
+
+class Job(models.Model):
+    """Admin import or export run by a celery task, with its progress"""
+    PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    FORMAT_CHOICES = [('csv', 'CSV'), ('xlsx', 'XLSX')]
+
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, blank=True, null=True,
+        related_name='+'
+    )
+    file_format = models.CharField(
+        _('Format'), max_length=8, choices=FORMAT_CHOICES
+    )
+    status = models.CharField(
+        _('Status'), max_length=10, choices=STATUS_CHOICES, default=PENDING,
+        db_index=True
+    )
+    total = models.PositiveIntegerField(_('Total'), default=0)
+    processed = models.PositiveIntegerField(_('Processed'), default=0)
+    error = models.TextField(_('Error'), blank=True)
+    notified = models.BooleanField(  # finished job shown to the requester
+        _('Notified'), default=False
+    )
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+    finished_at = models.DateTimeField(_('Finished At'), blank=True, null=True)
+
+    class Meta:
+        """Meta class"""
+        abstract = True
+        ordering = ('-created_at', )
+
+    @property
+    def progress(self):
+        """Returns the processed percentage"""
+        if self.status == self.DONE:
+            return 100
+        return min(int(100 * self.processed / self.total), 99) \
+            if self.total else 0
+
+
+class ExportJob(Job):
+    """Admin export written to storage by the export_users celery task"""
+    pks = models.JSONField(  # selected user ids, null exports the query
+        _('Primary Keys'), blank=True, null=True, editable=False
+    )
+    query = models.JSONField(  # changelist parameters, {param: [values]}
+        _('Query'), blank=True, null=True, editable=False
+    )
+    file = models.FileField(
+        _('File'), upload_to='exports/', blank=True, null=True,
+        storage=job_file_storage
+    )
+
+    class Meta(Job.Meta):
+        """Meta class"""
+
+    def __str__(self):
+        """String representation of ExportJob model"""
+        return f'Export #{self.pk} ({self.file_format}, {self.status})'
+
+
+class ImportJob(Job):
+    """Admin import of an uploaded file by the import_users celery task
+    Rows are counted as created, updated or failed with their errors"""
+    MAX_ERRORS = 1000  # row errors kept, the others are only counted
+
+    file = models.FileField(
+        _('File'), upload_to='imports/', storage=job_file_storage
+    )
+    created = models.PositiveIntegerField(_('Created'), default=0)
+    updated = models.PositiveIntegerField(_('Updated'), default=0)
+    failed = models.PositiveIntegerField(_('Failed'), default=0)
+    row_errors = models.JSONField(  # [{'row': 2, 'errors': [...]}, ...]
+        _('Row Errors'), default=list, blank=True
+    )
+
+    class Meta(Job.Meta):
+        """Meta class"""
+
+    def __str__(self):
+        """String representation of ImportJob model"""
+        return f'Import #{self.pk} ({self.file_format}, {self.status})'
@@ -1,22 +1,148 @@
 """Core > models > profile.py"""
 # PYTHON IMPORTS
 import logging
+import math
 from sys import _getframe
 # DJANGO IMPORTS
-from django.core.validators import RegexValidator
-from django.db import models
-from django.db.models.signals import post_save
+from django.core.validators import (
+    MaxValueValidator, MinValueValidator, RegexValidator
+)
+from django.db import models, transaction
+from django.db.models import Case, CharField, F, Q, Value, When
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, \
+    Sqrt
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 # CORE IMPORTS
+from Core import geo
+from Core.autocomplete import ADDRESS_FIELDS, address_values, \
+    update_address_index
+from Core.gazetteer import get_gazetteer
+from Core.renditions import rendition_names
+from Core.spatial_index import update_spatial_index
+from Core.storage import profile_image_storage
 from Core.models import User
+# PLUGIN IMPORTS
+from django_cleanup import cleanup
 # PROMETHEUS IMPORTS
 from django_prometheus.models import ExportModelOperationsMixin
 
 
 logger = logging.getLogger(__name__)
 
+REGION_FIELDS = ('division', 'district', 'thana', 'postal')
+REGION_CODE_FIELDS = ('division_code', 'district_code', 'thana_code')
+
+# (min_age, max_age) inclusive bounds of the demographic age bands, None for
+# an open upper bound; used for reports and the `age_band` annotation
+AGE_BANDS = (
+    (0, 17), (18, 24), (25, 34), (35, 44), (45, 54), (55, 64), (65, None),
+)
+
+
+def years_ago(years, today=None):
+    """Returns the date the given number of years before today
+    Feb 29 falls back to Feb 28 on non-leap years"""
+    today = today or timezone.now().date()
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:  # Feb 29 on a non-leap year
+        return today.replace(year=today.year - years, day=28)
+
+
+def age_q(min_age=None, max_age=None, field='birthday', today=None):
+    """Returns a Q object matching ages within [min_age, max_age] as a range
+    predicate on the birthday field, so the birthday index can be used"""
+    q = Q()
+    if min_age is not None:  # at least min_age years old
+        q &= Q(**{f'{field}__lte': years_ago(min_age, today)})
+    if max_age is not None:  # not yet max_age + 1 years old
+        q &= Q(**{f'{field}__gt': years_ago(max_age + 1, today)})
+    return q
+
+
+def age_band_label(min_age, max_age):
+    """Returns the label of an age band, ex: 18-24, 65+"""
+    return f'{min_age}+' if max_age is None else f'{min_age}-{max_age}'
+
+
+def age_band_expression(field='birthday', bands=AGE_BANDS, today=None):
+    """Returns a CASE expression evaluating to the age band label of the
+    birthday field, NULL when birthday is not set"""
+    whens = [
+        When(age_q(low, high, field, today), then=Value(age_band_label(
+            low, high
+        ))) for low, high in bands
+    ]
+    return Case(*whens, default=None, output_field=CharField())
+
+
+class ProfileQuerySet(models.QuerySet):
+    """Profile QuerySet with database side age filters"""
+
+    def age_between(self, min_age=None, max_age=None):
+        """Filters profiles by age, both bounds inclusive"""
+        logger.debug(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"Filtering ages between {min_age} and {max_age}"
+        )
+        return self.filter(age_q(min_age, max_age))
+
+    def with_age_band(self, bands=AGE_BANDS):
+        """Annotates each profile with its age band label as `age_band`"""
+        return self.annotate(age_band=age_band_expression(bands=bands))
+
+    def in_bbox(self, south, west, north, east, max_cells=16):
+        """Filters profiles located within the bounding box
+        Candidates are pruned by indexed geo_cell prefixes first"""
+        south, west, north, east = geo.clamp_bbox(south, west, north, east)
+        precision, cells = geo.covering_cells(
+            south, west, north, east, max_cells
+        )
+        logger.debug(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"Covering ({south}, {west}, {north}, {east}) with {len(cells)} "
+            f"cells of precision {precision}"
+        )
+        cell_q = Q()
+        for cell in cells:
+            cell_q |= Q(geo_cell__startswith=cell)
+        return self.filter(
+            cell_q,
+            latitude__range=(south, north),
+            longitude__range=(west, east),
+        )
+
+    def with_distance(self, latitude, longitude):
+        """Annotates each profile with its great-circle `distance` in km
+        from the given coordinate, computed in the database"""
+        lat, lng = math.radians(latitude), math.radians(longitude)
+        a = Power(Sin((Radians(F('latitude')) - lat) / 2), 2) + \
+            math.cos(lat) * Cos(Radians(F('latitude'))) * \
+            Power(Sin((Radians(F('longitude')) - lng) / 2), 2)
+        return self.annotate(
+            distance=2 * geo.EARTH_RADIUS_KM * ASin(Least(Sqrt(a), 1.0))
+        )
+
+    def needs_geocoding(self, full=False):
+        """Filters profiles to be geocoded: never located ones and geocoded
+        ones changed since. Manually located profiles are never included"""
+        geocoded = Q(geocoded_at__isnull=False)
+        if not full:  # only changed since they were last geocoded
+            geocoded &= Q(last_updated__gt=F('geocoded_at'))
+        return self.filter(
+            Q(geocoded_at__isnull=True, latitude__isnull=True) | geocoded
+        )
+
+    def within_radius(self, latitude, longitude, radius_km):
+        """Filters profiles within radius_km of the given coordinate,
+        annotated with their `distance` in km"""
+        return self.in_bbox(
+            *geo.radius_bbox(latitude, longitude, radius_km)
+        ).with_distance(latitude, longitude).filter(distance__lte=radius_km)
+
 
 def media_upload_path(instance, filename):
     """Returns formatted upload to path"""
@@ -27,6 +153,7 @@ def media_upload_path(instance, filename):
     return path
 
 
+@cleanup.ignore  # replaced image files are deleted in the background
 class Profile(ExportModelOperationsMixin('profile'), models.Model):
     """User Profile model"""
     user = models.OneToOneField(
@@ -34,7 +161,10 @@ class Profile(ExportModelOperationsMixin('profile'), models.Model):
     )
     image = models.ImageField(
         _('Profile Picture'), blank=True, null=True,
-        upload_to=media_upload_path
+        upload_to=media_upload_path, storage=profile_image_storage
+    )
+    image_renditions = models.JSONField(  # see Core.renditions
+        _('Image Renditions'), default=dict, blank=True, editable=False
     )
     bio = models.TextField(
         _('Bio'), blank=True, null=True
@@ -43,7 +173,7 @@ class Profile(ExportModelOperationsMixin('profile'), models.Model):
         _('Website'), blank=True, null=True
     )
     birthday = models.DateField(
-        _('Date of Birth'), blank=True, null=True
+        _('Date of Birth'), blank=True, null=True, db_index=True
     )
     gender = models.CharField(
         _('Gender'), max_length=1, blank=True, null=True,
@@ -87,6 +217,34 @@ class Profile(ExportModelOperationsMixin('profile'), models.Model):
     postal = models.CharField(
         _('Postal Code'), max_length=4, blank=True, null=True
     )
+    division_code = models.PositiveSmallIntegerField(  # gazetteer ids
+        _('Division ID'), blank=True, null=True, db_index=True, editable=False
+    )
+    district_code = models.PositiveSmallIntegerField(
+        _('District ID'), blank=True, null=True, db_index=True, editable=False
+    )
+    thana_code = models.PositiveIntegerField(
+        _('Thana ID'), blank=True, null=True, db_index=True, editable=False
+    )
+    latitude = models.FloatField(
+        _('Latitude'), blank=True, null=True,
+        validators=[MinValueValidator(-90.0), MaxValueValidator(90.0)]
+    )
+    longitude = models.FloatField(
+        _('Longitude'), blank=True, null=True,
+        validators=[MinValueValidator(-180.0), MaxValueValidator(180.0)]
+    )
+    geo_cell = models.CharField(  # geohash of latitude/longitude
+        _('Grid Cell'), max_length=geo.MAX_PRECISION, blank=True, null=True,
+        db_index=True, editable=False
+    )
+    geocoded_at = models.DateTimeField(  # null when located manually
+        _('Geocoded At'), blank=True, null=True, editable=False
+    )
+    block_key = models.CharField(  # region + phonetic name, see Core.dedupe
+        _('Duplicate Block'), max_length=64, blank=True, null=True,
+        db_index=True, editable=False
+    )
     is_active = models.BooleanField(
         _('Active'), default=True, null=True
     )
@@ -94,21 +252,90 @@ class Profile(ExportModelOperationsMixin('profile'), models.Model):
         _('Created At'), auto_now_add=True, null=True
     )
     last_updated = models.DateTimeField(
-        _('Last Updated'), auto_now=True, null=True
+        _('Last Updated'), auto_now=True, null=True, db_index=True
     )
 
+    objects = ProfileQuerySet.as_manager()
+
     @property
     def age(self):
-        """Returns user's age from given birthday, else returns 0"""
+        """Returns user's age from given birthday, else returns 0
+        Calendar age, consistent with the age_q birthday range predicates"""
         age = 0
         if self.birthday:
-            age = int((timezone.now().date() - self.birthday).days / 365.25)
+            today = timezone.now().date()
+            had_birthday = (today.month, today.day) >= (
+                self.birthday.month, self.birthday.day
+            )
+            age = today.year - self.birthday.year - (not had_birthday)
         logger.debug(  # prints class and function name
             f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
             f"Calculated {self.user}'s age: {age}"
         )
         return age
 
+    def set_location(self, latitude, longitude):
+        """Sets coordinates and their grid cell, does not save"""
+        self.latitude, self.longitude = latitude, longitude
+        self.geo_cell = None
+        if latitude is not None and longitude is not None:
+            self.geo_cell = geo.encode(latitude, longitude)
+
+    def resolve_region(self):
+        """Sets the gazetteer ids of division, district and thana from their
+        free text values, does not save. Returns the resolved Region"""
+        region = get_gazetteer().resolve(
+            self.division, self.district, self.thana, self.postal
+        )
+        self.division_code, self.district_code, self.thana_code = region
+        return region
+
+    def save(self, *args, **kwargs):
+        """Overriding to keep the grid cell in sync with the coordinates and
+        the gazetteer ids in sync with the region names. Coordinates changed
+        since loaded are manual, the geocoder no longer replaces them"""
+        self.set_location(self.latitude, self.longitude)
+        self.resolve_region()
+        location = (self.latitude, self.longitude)
+        if self.geocoded_at and location != getattr(
+            self, '_location', location
+        ):  # located manually, kept by the geocoder
+            self.geocoded_at = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if {'latitude', 'longitude'} & update_fields:
+                update_fields.update(('geo_cell', 'geocoded_at'))
+            if set(REGION_FIELDS) & update_fields:
+                update_fields.update(REGION_CODE_FIELDS)
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+        self._location = location
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Overriding to remember the loaded coordinates, see save, address,
+        see update_address_index, and density key, see density_changes"""
+        from Core.models.density import remember_density_key
+        instance = super().from_db(db, field_names, values)
+        remember_density_key(instance, field_names)
+        if {'latitude', 'longitude'} <= set(field_names):
+            instance._location = (instance.latitude, instance.longitude)
+        if set(ADDRESS_FIELDS) <= set(field_names):
+            instance._address = address_values(instance)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        """Overriding to remember the image name and coordinates when loaded
+        after init, ex: deferred, see remember_image"""
+        super().refresh_from_db(using, fields)
+        if fields is None or 'image' in fields:
+            self._image_name = self.image.name
+        if fields is None or {'latitude', 'longitude'} & set(fields):
+            self._location = (self.latitude, self.longitude)
+        if not set(ADDRESS_FIELDS) & self.get_deferred_fields():
+            self._address = address_values(self)
+
     def __str__(self):
         """String representation of Profile model"""
         return self.user.email
@@ -126,3 +353,99 @@ def create_or_update_profile(sender, instance, created, **kwargs):
         f"{_getframe().f_code.co_name} Saving {instance}'s profile"
     )
     instance.profile.save()
+
+
+@receiver(post_save, sender=Profile)
+def update_address_autocomplete(sender, instance, created, **kwargs):
+    """Applies address changes to the in-memory autocomplete index"""
+    update_address_index(instance, created)
+
+
+@receiver(post_delete, sender=Profile)
+def remove_address_autocomplete(sender, instance, **kwargs):
+    """Removes a deleted profile's values from the autocomplete index"""
+    update_address_index(instance, deleted=True)
+
+
+@receiver(post_save, sender=Profile)
+def update_nearest_index(sender, instance, raw=False, **kwargs):
+    """Updates the profile's location in the in-process spatial index"""
+    if not raw:
+        update_spatial_index(instance)
+
+
+@receiver(post_delete, sender=Profile)
+def remove_nearest_index(sender, instance, **kwargs):
+    """Removes a deleted profile from the in-process spatial index"""
+    update_spatial_index(instance, deleted=True)
+
+
+def queue_renditions(profile_id):
+    """Queues the generation of a profile's image renditions when the
+    transaction commits, in a single task for the profiles it changed
+    Every save registers a callback, the first one run on commit sends the
+    pending ids of the connection and the others find none left. Ids of
+    rolled back saves are sent with the next commit, the task finds their
+    renditions up to date"""
+    connection = transaction.get_connection()
+    if not hasattr(connection, 'pending_renditions'):
+        connection.pending_renditions = set()
+    connection.pending_renditions.add(profile_id)
+    transaction.on_commit(lambda: send_renditions(connection))
+
+
+def send_renditions(connection):
+    """Queues the generation of the renditions of the profiles pending on a
+    connection, see queue_renditions"""
+    from Core.tasks import generate_profile_renditions
+    profile_ids = sorted(connection.pending_renditions)
+    connection.pending_renditions.clear()
+    if not profile_ids:
+        return
+    try:
+        generate_profile_renditions.delay(profile_ids)
+    except Exception as e:  # broker down, renditions can be regenerated
+        logger.error(e)
+
+
+def queue_file_deletion(names):
+    """Queues the deletion of profile image files"""
+    from Core.tasks import delete_media_files
+    try:
+        delete_media_files.delay(names)
+    except Exception as e:  # broker down, orphans are found by reconcile_media
+        logger.error(e)
+
+
+@receiver(post_init, sender=Profile)
+def remember_image(sender, instance, **kwargs):
+    """Remembers the image name of profiles loaded from the db"""
+    if 'image' not in instance.get_deferred_fields():
+        instance._image_name = instance.image.name
+
+
+@receiver(post_save, sender=Profile)
+def update_image_renditions(sender, instance, raw=False, update_fields=None,
+                            **kwargs):
+    """Queues new renditions and the deletion of the replaced image file
+    when the profile image changed, see also reference_blobs"""
+    if raw or 'image' in instance.get_deferred_fields() or (
+        update_fields is not None and 'image' not in update_fields
+    ):
+        return
+    old_name = getattr(instance, '_image_name', None)
+    if (instance.image.name or '') != (old_name or ''):
+        instance._image_name = instance.image.name
+        queue_renditions(instance.pk)
+        if old_name:  # instead of django_cleanup, deleted by celery
+            transaction.on_commit(lambda: queue_file_deletion([old_name]))
+
+
+@receiver(post_delete, sender=Profile)
+def remove_image_files(sender, instance, **kwargs):
+    """Queues the deletion of a deleted profile's image and renditions"""
+    names = rendition_names(instance.image_renditions)
+    if instance.image:
+        names.insert(0, instance.image.name)
+    if names:
+        transaction.on_commit(lambda: queue_file_deletion(names))
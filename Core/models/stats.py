@@ -0,0 +1,250 @@
+"""Core > models > stats.py
+Materialized profile counts by division, district, thana, gender, age band
+and is_active. A refresh only revisits profiles updated since the previous
+refresh (plus those whose age band changed on a birthday), comparing each
+with the key it was last counted under in ProfileStat, so counts stay exact
+without grouping the whole profiles table per request.
+"""
+# PYTHON IMPORTS
+import logging
+from collections import Counter
+from datetime import timedelta
+from itertools import islice
+from sys import _getframe
+# DJANGO IMPORTS
+from django.db import models, transaction
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+# CORE IMPORTS
+from Core.models.density import REGION_LEVELS, apply_density_changes
+from Core.models.profile import (
+    AGE_BANDS, Profile, age_band_expression, years_ago
+)
+
+
+logger = logging.getLogger(__name__)
+
+STATS_FIELDS = (
+    'division_code', 'district_code', 'thana_code', 'gender', 'age_band',
+    'is_active',
+)
+GROUP_FIELDS = ('gender', 'age_band', 'is_active')
+STATS_WATERMARK = 'region_stats'
+OVERLAP = timedelta(minutes=5)  # rescans saves committed during a refresh
+BATCH_SIZE = 2000
+
+
+class RegionStat(models.Model):
+    """Number of profiles per region, gender, age band and is_active
+    Unknown regions are stored as 0, unknown gender and age band as ''"""
+    division_code = models.PositiveSmallIntegerField(_('Division ID'))
+    district_code = models.PositiveSmallIntegerField(_('District ID'))
+    thana_code = models.PositiveIntegerField(_('Thana ID'))
+    gender = models.CharField(_('Gender'), max_length=1, blank=True)
+    age_band = models.CharField(_('Age Band'), max_length=8, blank=True)
+    is_active = models.BooleanField(_('Active'))
+    count = models.IntegerField(_('Count'), default=0)
+
+    class Meta:
+        """Meta class"""
+        verbose_name = 'region statistic'
+        unique_together = STATS_FIELDS
+
+    def __str__(self):
+        """String representation of RegionStat model"""
+        return f'{self.thana_code} {self.gender} {self.age_band}: {self.count}'
+
+
+class ProfileStat(models.Model):
+    """Key a profile was last counted under in RegionStat
+    Not a foreign key, so deleted profiles can be uncounted on refresh:
+    their row is marked deleted by a signal"""
+    profile_id = models.IntegerField(primary_key=True)
+    division_code = models.PositiveSmallIntegerField()
+    district_code = models.PositiveSmallIntegerField()
+    thana_code = models.PositiveIntegerField()
+    gender = models.CharField(max_length=1, blank=True)
+    age_band = models.CharField(max_length=8, blank=True)
+    is_active = models.BooleanField()
+    deleted = models.BooleanField(default=False, db_index=True)
+
+    def key(self):
+        """Returns the counted stats key"""
+        return tuple(getattr(self, field) for field in STATS_FIELDS)
+
+
+class Watermark(models.Model):
+    """Time up to which a materialized summary is refreshed"""
+    name = models.CharField(_('Name'), max_length=64, unique=True)
+    value = models.DateTimeField(_('Value'), blank=True, null=True)
+
+    def __str__(self):
+        """String representation of Watermark model"""
+        return f'{self.name}: {self.value}'
+
+
+def stats_keys(queryset, today=None):
+    """Returns (pk, stats key) rows of profiles, computed in the database"""
+    return queryset.annotate(
+        s_division=Coalesce('division_code', Value(0)),
+        s_district=Coalesce('district_code', Value(0)),
+        s_thana=Coalesce('thana_code', Value(0)),
+        s_gender=Coalesce('gender', Value('')),
+        s_age_band=Coalesce(age_band_expression(today=today), Value('')),
+        s_active=Coalesce('is_active', Value(False)),
+    ).values_list(
+        'pk', 's_division', 's_district', 's_thana', 's_gender',
+        's_age_band', 's_active'
+    ).order_by()
+
+
+def stat_row(key):
+    """Returns the (model, lookup) RegionStat row of a stats key"""
+    return RegionStat, tuple(zip(STATS_FIELDS, key))
+
+
+def birthday_q(since, today):
+    """Returns a Q object matching profiles changing age band after since"""
+    q = Q()
+    for low in (band[0] for band in AGE_BANDS[1:]):
+        q |= Q(
+            birthday__gt=years_ago(low, since),
+            birthday__lte=years_ago(low, today),
+        )
+    return q
+
+
+def _refresh(queryset, today):
+    """Recounts the profiles of a queryset against their counted keys
+    Returns the number of profiles whose key changed"""
+    deltas, changed = Counter(), 0
+    rows = stats_keys(queryset, today).iterator(chunk_size=BATCH_SIZE)
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        counted = ProfileStat.objects.in_bulk([row[0] for row in batch])
+        creates, updates = [], []
+        for pk, *key in batch:
+            key, stat = tuple(key), counted.get(pk)
+            if stat is not None and stat.key() == key:
+                continue
+            if stat is None:
+                stat = ProfileStat(profile_id=pk)
+                creates.append(stat)
+            else:
+                deltas[stat_row(stat.key())] -= 1
+                updates.append(stat)
+            for field, value in zip(STATS_FIELDS, key):
+                setattr(stat, field, value)
+            deltas[stat_row(key)] += 1
+        ProfileStat.objects.bulk_create(creates)
+        ProfileStat.objects.bulk_update(updates, STATS_FIELDS)
+        changed += len(creates) + len(updates)
+    apply_density_changes(deltas)
+    return changed
+
+
+def _remove_deleted():
+    """Uncounts the profiles marked deleted, returns their number"""
+    deleted = list(ProfileStat.objects.filter(deleted=True))
+    deltas = Counter()
+    deltas.subtract(stat_row(stat.key()) for stat in deleted)
+    apply_density_changes(deltas)
+    ProfileStat.objects.filter(pk__in=[s.pk for s in deleted]).delete()
+    return len(deleted)
+
+
+@receiver(post_delete, sender=Profile)
+def mark_deleted_stat(sender, instance, **kwargs):
+    """Marks the counted key of a deleted profile, uncounted on refresh
+    Profiles deleted with raw SQL are only uncounted by a rebuild"""
+    ProfileStat.objects.filter(profile_id=instance.pk).update(deleted=True)
+
+
+def refresh_region_stats():
+    """Refreshes the region statistics with the profiles changed since the
+    previous refresh, the first refresh rebuilds them
+    Returns the number of profiles recounted"""
+    now = timezone.now()
+    with transaction.atomic():
+        mark = Watermark.objects.select_for_update().get_or_create(
+            name=STATS_WATERMARK
+        )[0]
+        if mark.value is None:
+            changed = _rebuild(now)
+        else:
+            today = now.date()
+            changed_q = Q(last_updated__gte=mark.value - OVERLAP)
+            changed_q |= birthday_q(mark.value.date(), today)
+            changed = _refresh(Profile.objects.filter(changed_q), today)
+            changed += _remove_deleted()
+        mark.value = now
+        mark.save(update_fields=['value'])
+    logger.debug(  # prints function name
+        f"{_getframe().f_code.co_name} Refreshed region stats: "
+        f"{changed} profiles recounted"
+    )
+    return changed
+
+
+def _rebuild(now):
+    """Recounts every profile, returns the number of profiles"""
+    keys = stats_keys(Profile.objects.all(), now.date())
+    RegionStat.objects.all().delete()
+    ProfileStat.objects.all().delete()
+    total, batch = 0, []
+    for pk, *key in keys.iterator(chunk_size=BATCH_SIZE):
+        batch.append(ProfileStat(profile_id=pk, **dict(zip(
+            STATS_FIELDS, key
+        ))))
+        if len(batch) >= BATCH_SIZE:
+            ProfileStat.objects.bulk_create(batch)
+            total, batch = total + len(batch), []
+    ProfileStat.objects.bulk_create(batch)
+    RegionStat.objects.bulk_create(
+        RegionStat(count=row.pop('n'), **row)
+        for row in ProfileStat.objects.values(*STATS_FIELDS).annotate(
+            n=Count('pk')
+        ).order_by().iterator()
+    )
+    return total + len(batch)
+
+
+def rebuild_region_stats():
+    """Rebuilds the region statistics from every profile
+    Returns the number of profiles counted"""
+    now = timezone.now()
+    with transaction.atomic():
+        mark = Watermark.objects.select_for_update().get_or_create(
+            name=STATS_WATERMARK
+        )[0]
+        total = _rebuild(now)
+        mark.value = now
+        mark.save(update_fields=['value'])
+    logger.debug(  # prints function name
+        f"{_getframe().f_code.co_name} Rebuilt region stats: "
+        f"{total} profiles counted"
+    )
+    return total
+
+
+def region_stat_counts(level='division', group_by=(), **filters):
+    """Returns rows of profile counts per region code of a level, further
+    split by the group_by fields, ex: ('gender', 'age_band')"""
+    field = dict(REGION_LEVELS)[level]
+    return RegionStat.objects.filter(**filters).values(
+        field, *group_by
+    ).annotate(total=Sum('count')).filter(total__gt=0).order_by(
+        field, *group_by
+    )
+
+
+def stats_refreshed_at():
+    """Returns the time the region statistics were last refreshed"""
+    mark = Watermark.objects.filter(name=STATS_WATERMARK).first()
+    return mark.value if mark else None
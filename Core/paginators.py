@@ -0,0 +1,60 @@
+"""Core > paginators.py
+Paginator of large admin changelists. Counting every row of a big table
+for each page is slow, so above settings.ADMIN_COUNT_ESTIMATE_THRESHOLD the
+row estimate of the query planner is used instead of an exact COUNT(*) and
+shown as approximate. Only whole tables are estimated: filtered or searched
+lists, whose estimates can be far off, and databases without an estimate
+(ex: SQLite) are always counted exactly.
+"""
+# PYTHON IMPORTS
+import json
+import logging
+from sys import _getframe
+# DJANGO IMPORTS
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+
+logger = logging.getLogger(__name__)
+
+
+def estimated_count(queryset):
+    """Returns the planner's row estimate of a queryset, None when the
+    database has none"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+    except DatabaseError as e:
+        logger.warning(e)
+        return None
+    if isinstance(plan, str):  # not decoded by the driver
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator counting exactly only below the estimate threshold"""
+    estimated = False  # count is an estimate, see admin/pagination.html
+
+    @cached_property
+    def count(self):
+        """Returns the estimated or exact number of objects"""
+        query = getattr(self.object_list, 'query', None)
+        estimate = estimated_count(self.object_list) \
+            if query is not None and not query.where else None
+        if estimate is None or \
+                estimate < settings.ADMIN_COUNT_ESTIMATE_THRESHOLD:
+            return super().count
+        self.estimated = True
+        logger.debug(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"Estimated {estimate} {self.object_list.model.__name__} rows"
+        )
+        return estimate
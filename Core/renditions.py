@@ -0,0 +1,119 @@
+"""Core > renditions.py
+Resized renditions of profile images, so avatars are not served from the
+full size original. Each size in settings.IMAGE_RENDITIONS is stored beside
+the original as JPEG and WebP, when Pillow can write them, ex:
+Users/1/renditions/photo_thumb.webp, and recorded in
+Profile.image_renditions with the name of the source image.
+The source is decoded once at the scale of the largest rendition.
+"""
+# PYTHON IMPORTS
+import logging
+import os
+from io import BytesIO
+from sys import _getframe
+# DJANGO IMPORTS
+from django.conf import settings
+from django.core.files.base import ContentFile
+# PLUGIN IMPORTS
+from PIL import features
+# CORE IMPORTS
+from Core.images import cover_size, fit_image, open_image
+
+
+logger = logging.getLogger(__name__)
+
+# format: (extension, Pillow save options, Pillow feature)
+FORMATS = {
+    'jpeg': (
+        'jpg', {'quality': 80, 'optimize': True, 'progressive': True}, 'jpg'
+    ),
+    'webp': ('webp', {'quality': 75, 'method': 4}, 'webp'),
+}
+
+
+def available_formats():
+    """Returns the rendition formats the installed Pillow can write, ex:
+    no WebP when built without libwebp"""
+    return [fmt for fmt, options in FORMATS.items() if features.check(
+        options[2]
+    )]
+
+
+def rendition_name(image_name, size_name, fmt):
+    """Returns the storage name of a rendition of an image
+    ex: Users/1/photo.png -> Users/1/renditions/photo_thumb.webp"""
+    folder, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+    return f'{folder}/renditions/{stem}_{size_name}.{FORMATS[fmt][0]}'
+
+
+def render(image, size, fmt):
+    """Returns the bytes of an image cropped and resized to size"""
+    rendition = fit_image(image, size)
+    if fmt == 'jpeg' and rendition.mode != 'RGB':
+        rendition = rendition.convert('RGB')
+    buffer = BytesIO()
+    rendition.save(buffer, fmt.upper(), **FORMATS[fmt][1])
+    return buffer.getvalue()
+
+
+def generate_renditions(image_field):
+    """Saves the renditions of an image field file beside it
+    Returns the renditions dict stored in Profile.image_renditions"""
+    storage, renditions = image_field.storage, {'source': image_field.name}
+    sizes = settings.IMAGE_RENDITIONS
+    with image_field.open('rb') as file:
+        image = open_image(file, cover_size(sizes.values()))
+        if image.mode not in ('RGB', 'RGBA'):  # resampled in full color
+            image = image.convert('RGBA' if 'transparency' in image.info or (
+                'A' in image.getbands()
+            ) else 'RGB')
+        formats = available_formats()
+        for size_name, size in sizes.items():
+            renditions[size_name] = {}
+            for fmt in formats:
+                name = rendition_name(image_field.name, size_name, fmt)
+                if storage.exists(name):  # regenerated
+                    storage.delete(name)
+                renditions[size_name][fmt] = storage.save(
+                    name, ContentFile(render(image, size, fmt))
+                )
+    logger.debug(  # prints function name
+        f"{_getframe().f_code.co_name} Generated renditions of "
+        f"{image_field.name}"
+    )
+    return renditions
+
+
+def rendition_names(renditions):
+    """Returns the list of rendition file names of a renditions dict"""
+    return [
+        name for size_name, files in (renditions or {}).items()
+        if size_name != 'source' for name in files.values()
+    ]
+
+
+def delete_renditions(storage, renditions):
+    """Deletes the rendition files of a renditions dict"""
+    for name in rendition_names(renditions):
+        storage.delete(name)
+
+
+def rendition_urls(profile, request=None):
+    """Returns {size: {format: url}} of the current renditions of a profile
+    image, empty until they are generated for the current image"""
+    renditions = profile.image_renditions or {}
+    if not profile.image or renditions.get('source') != profile.image.name:
+        return {}
+    storage, urls = profile.image.storage, {}
+    for size_name, files in renditions.items():
+        if size_name != 'source':
+            urls[size_name] = {
+                fmt: storage.url(name) for fmt, name in files.items()
+            }
+            if request is not None:
+                urls[size_name] = {
+                    fmt: request.build_absolute_uri(url)
+                    for fmt, url in urls[size_name].items()
+                }
+    return urls
@@ -0,0 +1,18 @@
+"""Core > resources.py
+django-import-export resources of the admin import and export
+https://django-import-export.readthedocs.io/en/stable/index.html
+"""
+# PLUGIN IMPORTS
+from import_export import resources
+# CORE IMPORTS
+from Core import models
+
+
+class UserResource(resources.ModelResource):
+    """
+    User model import_export resource
+    https://django-import-export.readthedocs.io/en/stable/index.html
+    """
+    class Meta:
+        """Meta class"""
+        model = models.User
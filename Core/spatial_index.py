@@ -0,0 +1,398 @@
+"""Core > spatial_index.py
+Optional in-process spatial index of profile coordinates for k-nearest and
+bounding box queries without database round-trips.
+Points are bulk loaded into a static packed R-tree (Sort-Tile-Recursive)
+stored in flat typed arrays; changes arriving through the Profile signals go
+to a small overlay that is merged by an in-memory repack once it grows.
+Enabled with settings.SPATIAL_INDEX_ENABLED, built on first use and rebuilt
+after settings.SPATIAL_INDEX_MAX_AGE seconds to pick up bulk updates made by
+other processes, which bypass the signals.
+"""
+# PYTHON IMPORTS
+import heapq
+import logging
+import math
+import sys
+import threading
+import time
+from array import array
+from sys import _getframe
+# DJANGO IMPORTS
+from django.conf import settings
+# CORE IMPORTS
+from Core.geo import EARTH_RADIUS_KM, haversine_km
+
+
+logger = logging.getLogger(__name__)
+
+NODE_SIZE = 16  # children per R-tree node
+OVERLAY_LIMIT = 1024  # pending changes merged by a repack
+CHECK_BATCH = 32  # leaf boxes compared per database query, see check_boxes
+
+
+def _clamp(value, low, high):
+    """Returns value clamped within [low, high]"""
+    return low if value < low else high if value > high else value
+
+
+def min_distance_km(latitude, longitude, south, west, north, east):
+    """Returns the great-circle distance from a point to the closest point
+    of a bounding box, 0 inside the box"""
+    lng = _clamp(longitude, west, east)
+    d_lambda = math.radians(longitude - lng)
+    if d_lambda == 0:
+        lat = _clamp(latitude, south, north)
+    elif math.cos(d_lambda) > 0:  # closest point of the meridian lng
+        lat = _clamp(math.degrees(math.atan(
+            math.tan(math.radians(latitude)) / math.cos(d_lambda)
+        )), south, north)
+    else:  # far side of the globe, latitude difference is a lower bound
+        return EARTH_RADIUS_KM * math.radians(
+            max(0.0, south - latitude, latitude - north)
+        )
+    return haversine_km(latitude, longitude, lat, lng)
+
+
+class PackedRTree:
+    """Static R-tree over points packed in typed arrays
+    levels[0] holds the bounding boxes of leaf nodes, each covering
+    NODE_SIZE consecutive points; levels[i + 1] groups NODE_SIZE nodes of
+    levels[i]. Boxes are stored as 4 doubles: south, west, north, east"""
+
+    def __init__(self, ids, latitudes, longitudes):
+        """Bulk loads (id, latitude, longitude) points with STR packing"""
+        order = self._str_order(latitudes, longitudes)
+        self.ids = array('q', (ids[i] for i in order))
+        self.latitudes = array('d', (latitudes[i] for i in order))
+        self.longitudes = array('d', (longitudes[i] for i in order))
+        self.levels = []
+
+        count = len(self.ids)
+        boxes = array('d')
+        for start in range(0, count, NODE_SIZE):
+            lats = self.latitudes[start:start + NODE_SIZE]
+            lngs = self.longitudes[start:start + NODE_SIZE]
+            boxes.extend((min(lats), min(lngs), max(lats), max(lngs)))
+        while boxes:
+            self.levels.append(boxes)
+            if len(boxes) == 4:  # root
+                break
+            parents = array('d')
+            for start in range(0, len(boxes), 4 * NODE_SIZE):
+                group = boxes[start:start + 4 * NODE_SIZE]
+                parents.extend((
+                    min(group[0::4]), min(group[1::4]),
+                    max(group[2::4]), max(group[3::4]),
+                ))
+            boxes = parents
+
+    @staticmethod
+    def _str_order(latitudes, longitudes):
+        """Returns point indexes in Sort-Tile-Recursive order: vertical
+        slices by longitude, each sorted by latitude"""
+        count = len(latitudes)
+        leaves = math.ceil(count / NODE_SIZE)
+        slice_size = NODE_SIZE * math.ceil(math.sqrt(leaves)) or 1
+        by_lng = sorted(range(count), key=longitudes.__getitem__)
+        order = []
+        for start in range(0, count, slice_size):
+            order.extend(sorted(
+                by_lng[start:start + slice_size],
+                key=latitudes.__getitem__
+            ))
+        return order
+
+    def __len__(self):
+        """Number of points"""
+        return len(self.ids)
+
+    def _box(self, level, node):
+        """Returns the bounding box of a node"""
+        boxes = self.levels[level]
+        return boxes[4 * node], boxes[4 * node + 1], boxes[4 * node + 2], \
+            boxes[4 * node + 3]
+
+    def _children(self, level, node):
+        """Returns the range of children of a node: nodes of level - 1, or
+        points for leaf nodes (level 0)"""
+        size = len(self.ids) if level == 0 else len(self.levels[level - 1]) \
+            // 4
+        return range(node * NODE_SIZE, min((node + 1) * NODE_SIZE, size))
+
+    def leaf_boxes(self):
+        """Yields the bounding boxes of the leaf nodes"""
+        for node in range(len(self.levels[0]) // 4 if self.levels else 0):
+            yield self._box(0, node)
+
+    def bbox(self, south, west, north, east):
+        """Yields indexes of points within the bounding box"""
+        if not self.levels:
+            return
+        stack = [(len(self.levels) - 1, 0)]
+        while stack:
+            level, node = stack.pop()
+            s, w, n, e = self._box(level, node)
+            if s > north or n < south or w > east or e < west:
+                continue
+            if level:
+                stack.extend((level - 1, c) for c in self._children(
+                    level, node
+                ))
+                continue
+            for i in self._children(level, node):
+                if south <= self.latitudes[i] <= north and \
+                        west <= self.longitudes[i] <= east:
+                    yield i
+
+    def nearest(self, latitude, longitude):
+        """Yields (distance km, index) of points, nearest first"""
+        if not self.levels:
+            return
+        root = len(self.levels) - 1
+        heap = [(0.0, 0, root, 0)]  # (distance, is point, level, node)
+        while heap:
+            distance, is_point, level, node = heapq.heappop(heap)
+            if is_point:
+                yield distance, node
+                continue
+            for child in self._children(level, node):
+                if level:
+                    d = min_distance_km(
+                        latitude, longitude, *self._box(level - 1, child)
+                    )
+                    heapq.heappush(heap, (d, 0, level - 1, child))
+                else:
+                    d = haversine_km(
+                        latitude, longitude,
+                        self.latitudes[child], self.longitudes[child]
+                    )
+                    heapq.heappush(heap, (d, 1, 0, child))
+
+    def memory_usage(self):
+        """Returns the bytes used by the packed arrays"""
+        arrays = [self.ids, self.latitudes, self.longitudes] + self.levels
+        return sum(a.buffer_info()[1] * a.itemsize for a in arrays)
+
+
+class SpatialIndex:
+    """Packed R-tree of profile coordinates with an overlay of changes"""
+
+    def __init__(self, points=()):
+        """init with (id, latitude, longitude) points"""
+        self.lock = threading.Lock()
+        self.overlay = {}  # id -> (latitude, longitude), None when removed
+        self.built_at = time.monotonic()
+        self._build(points)
+
+    def _build(self, points):
+        """Packs points into a new tree"""
+        ids, latitudes, longitudes = array('q'), array('d'), array('d')
+        for point_id, latitude, longitude in points:
+            ids.append(point_id)
+            latitudes.append(latitude)
+            longitudes.append(longitude)
+        self.tree = PackedRTree(ids, latitudes, longitudes)
+
+    def points(self):
+        """Yields current (id, latitude, longitude) points"""
+        tree = self.tree
+        for i, point_id in enumerate(tree.ids):
+            if point_id not in self.overlay:
+                yield point_id, tree.latitudes[i], tree.longitudes[i]
+        for point_id, location in list(self.overlay.items()):
+            if location is not None:
+                yield (point_id, ) + location
+
+    def __len__(self):
+        """Number of points"""
+        return sum(1 for _ in self.points())
+
+    def update(self, point_id, latitude=None, longitude=None):
+        """Sets or removes (no coordinates) the location of a point"""
+        location = None
+        if latitude is not None and longitude is not None:
+            location = (latitude, longitude)
+        with self.lock:
+            self.overlay[point_id] = location
+            if len(self.overlay) > OVERLAY_LIMIT:
+                self.repack()
+
+    def repack(self):
+        """Merges the overlay into a new packed tree, no database access"""
+        points = list(self.points())
+        self._build(points)
+        self.overlay = {}
+
+    def bbox(self, south, west, north, east):
+        """Returns (id, latitude, longitude) of points in the bounding box"""
+        tree, overlay = self.tree, dict(self.overlay)
+        results = [
+            (tree.ids[i], tree.latitudes[i], tree.longitudes[i])
+            for i in tree.bbox(south, west, north, east)
+            if tree.ids[i] not in overlay
+        ]
+        for point_id, location in overlay.items():
+            if location and south <= location[0] <= north \
+                    and west <= location[1] <= east:
+                results.append((point_id, ) + location)
+        return results
+
+    def nearest(self, latitude, longitude, k=10):
+        """Returns up to k (distance km, id, latitude, longitude), nearest
+        first"""
+        tree, overlay = self.tree, dict(self.overlay)
+        results = [
+            (haversine_km(latitude, longitude, *location), point_id, *location)
+            for point_id, location in overlay.items() if location
+        ]
+        results = heapq.nsmallest(k, results)
+        for distance, i in tree.nearest(latitude, longitude):
+            if len(results) >= k and distance > results[-1][0]:
+                break
+            if tree.ids[i] not in overlay:
+                results.append((
+                    distance, tree.ids[i], tree.latitudes[i],
+                    tree.longitudes[i]
+                ))
+                results = heapq.nsmallest(k, results)
+        return results
+
+    def check(self, points):
+        """Compares the index with (id, latitude, longitude) points, ex: from
+        the database. Returns ids missing, stale and extra in the index"""
+        indexed = {point_id: location for point_id, *location in self.points()}
+        missing, stale = [], []
+        for point_id, *location in points:
+            found = indexed.pop(point_id, None)
+            if found is None:
+                missing.append(point_id)
+            elif found != location:
+                stale.append(point_id)
+        return {'missing': missing, 'stale': stale, 'extra': list(indexed)}
+
+    def check_boxes(self, box_points, batch_size=CHECK_BATCH):
+        """Compares the bounding box searches of the index, over the box of
+        each leaf node and of each changed point, with box_points(boxes)
+        returning the (id, latitude, longitude) points in any of a batch of
+        boxes, ex: one database query per batch
+        Returns ids missing, at another location and extra in the index"""
+        tree, overlay = self.tree, dict(self.overlay)
+        boxes = list(tree.leaf_boxes()) + [
+            location * 2 for location in overlay.values() if location
+        ]
+        missing, stale, extra = set(), set(), set()
+        for start in range(0, len(boxes), batch_size):
+            batch = boxes[start:start + batch_size]
+            points = list(box_points(batch))
+            for south, west, north, east in batch:
+                found = {point_id: (lat, lng) for point_id, lat, lng in (
+                    self.bbox(south, west, north, east)
+                )}
+                expected = {
+                    point_id: (lat, lng) for point_id, lat, lng in points
+                    if south <= lat <= north and west <= lng <= east
+                }
+                missing |= expected.keys() - found.keys()
+                extra |= found.keys() - expected.keys()
+                stale |= {
+                    point_id for point_id in found.keys() & expected.keys()
+                    if found[point_id] != expected[point_id]
+                }
+        return {
+            'missing': sorted(missing), 'stale': sorted(stale),
+            'extra': sorted(extra),
+        }
+
+    def memory_usage(self):
+        """Returns the approximate bytes used by the index"""
+        overlay = sys.getsizeof(self.overlay) + sum(
+            sys.getsizeof(v) for v in self.overlay.values()
+        )
+        return self.tree.memory_usage() + overlay
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def located_profiles():
+    """Yields (id, latitude, longitude) of located profiles from the db"""
+    from Core.models import Profile
+    yield from Profile.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).values_list('pk', 'latitude', 'longitude').iterator(chunk_size=5000)
+
+
+def box_points(boxes):
+    """Returns (id, latitude, longitude) of the profiles within any of the
+    (south, west, north, east) bounding boxes from the db"""
+    from django.db.models import Q
+    from Core.models import Profile
+    box_q = Q()
+    for south, west, north, east in boxes:
+        box_q |= Q(
+            latitude__range=(south, north), longitude__range=(west, east)
+        )
+    return Profile.objects.filter(box_q).values_list(
+        'pk', 'latitude', 'longitude'
+    )
+
+
+def check_spatial_index():
+    """Compares the index of this process, with the changes it received
+    through the signals, with the database
+    Returns the report of SpatialIndex.check_boxes with a count entry when
+    the number of points differ, None unless the index is enabled"""
+    from Core.models import Profile
+    index = get_spatial_index()
+    if index is None:
+        return None
+    report = index.check_boxes(box_points)
+    located = Profile.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).count()
+    if len(index) != located:
+        report['count'] = [f"{len(index)} indexed, {located} located"]
+    return report
+
+
+def _expired(index):
+    """Tests if an index is missing or older than SPATIAL_INDEX_MAX_AGE"""
+    max_age = settings.SPATIAL_INDEX_MAX_AGE
+    return index is None or (
+        max_age is not None and time.monotonic() - index.built_at > max_age
+    )
+
+
+def get_spatial_index():
+    """Returns the process wide spatial index, built on first call
+    Returns None unless settings.SPATIAL_INDEX_ENABLED"""
+    global _index
+    if not settings.SPATIAL_INDEX_ENABLED:
+        return None
+    if _expired(_index):
+        with _index_lock:
+            if _expired(_index):
+                _index = SpatialIndex(located_profiles())
+                logger.debug(  # prints function name
+                    f"{_getframe().f_code.co_name} Built spatial index: "
+                    f"{len(_index.tree)} points, "
+                    f"{_index.memory_usage()} bytes"
+                )
+    return _index
+
+
+def reset_spatial_index():
+    """Drops the spatial index, it is rebuilt on next use"""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def update_spatial_index(profile, deleted=False):
+    """Applies a profile change to the index if it is built"""
+    if _index is not None:
+        if deleted:
+            _index.update(profile.pk)
+        else:
+            _index.update(profile.pk, profile.latitude, profile.longitude)
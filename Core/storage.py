@@ -0,0 +1,283 @@
+"""Core > storage.py
+Content addressed storage for profile images. Files are stored once by the
+SHA-256 of their content, ex: blobs/3f/a2/3fa2...9c.jpg, whatever their
+upload path, so re-uploads and identical images share a single file found
+by name without hardlinks or symlinks. Blob rows count the references of
+the file fields, added when a field changes to the blob: deleting a file
+only releases a reference and the gc_blobs management command removes the
+blobs left unreferenced past a grace period, skipping blobs being saved.
+Renditions saved beside a blob are derived from its content and share its
+lifetime.
+"""
+# PYTHON IMPORTS
+import hashlib
+import logging
+import os
+import tempfile
+from collections import Counter
+from datetime import timedelta
+from sys import _getframe
+# DJANGO IMPORTS
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, get_storage_class
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = 'blobs'
+TEMP_DIR = f'{BLOB_DIR}/tmp'
+DERIVED_DIR = 'renditions'  # see Core.renditions.rendition_name
+GC_GRACE = timedelta(days=1)  # unreferenced blobs are kept for uploads
+
+
+def profile_image_storage():
+    """Returns the storage of profile images, settings.PROFILE_IMAGE_STORAGE"""
+    return get_storage_class(settings.PROFILE_IMAGE_STORAGE)()
+
+
+def job_file_storage():
+    """Returns the storage of admin import and export job files,
+    settings.JOB_FILE_STORAGE"""
+    return get_storage_class(settings.JOB_FILE_STORAGE)()
+
+
+class PrivateStorage(FileSystemStorage):
+    """File system storage under settings.PRIVATE_ROOT, outside MEDIA_ROOT
+    Files have no URL, they are served by views checking permissions"""
+
+    @cached_property
+    def base_location(self):
+        """Returns the storage folder, default settings.PRIVATE_ROOT"""
+        return self._value_or_setting(self._location, settings.PRIVATE_ROOT)
+
+    @cached_property
+    def base_url(self):
+        """Returns None, url() raises ValueError"""
+        return None
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        """Resets the location when settings.PRIVATE_ROOT changes"""
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'PRIVATE_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
+
+
+def blob_name(digest, filename):
+    """Returns the name of a blob, keeping the extension of filename
+    ex: 3fa2...9c, photo.JPG -> blobs/3f/a2/3fa2...9c.jpg"""
+    extension = os.path.splitext(filename)[1].lower()[:10]
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def blob_digest(name):
+    """Returns the digest of a blob or derived file name"""
+    return os.path.splitext(os.path.basename(name))[0].split('_')[0]
+
+
+def is_derived(name):
+    """Tests if a name is a file derived from a blob, ex: a rendition"""
+    return name.startswith(f'{BLOB_DIR}/') and \
+        os.path.basename(os.path.dirname(name)) == DERIVED_DIR
+
+
+def is_blob(name):
+    """Tests if a name is a content addressed blob"""
+    return name.startswith(f'{BLOB_DIR}/') and not is_derived(name) and \
+        not name.startswith(f'{TEMP_DIR}/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage saving files once by content hash
+    Names outside BLOB_DIR, ex: files saved before switching to this
+    storage, are deleted as by FileSystemStorage"""
+
+    def get_available_name(self, name, max_length=None):
+        """Returns name, _save names blobs and existing ones are shared"""
+        return name
+
+    def _save(self, name, content):
+        """Saves content as a blob, its references are added by the file
+        fields, see add_reference
+        Returns the blob name, derived files are saved under their name"""
+        digest, size, temp = self.write_temp(content)
+        if not is_derived(name):
+            name = blob_name(digest, name)
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if is_derived(name):
+            os.replace(temp, path)
+        else:
+            with transaction.atomic():  # holds the Blob row against gc_blobs
+                self.touch_blob(name, digest, size)
+                os.replace(temp, path)  # identical content when it exists
+        logger.debug(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"Saved {size} bytes as {name}"
+        )
+        return name
+
+    def write_temp(self, content):
+        """Writes content to a temporary file while hashing it
+        Returns (hex digest, size, path of the temporary file)"""
+        folder = self.path(TEMP_DIR)
+        os.makedirs(folder, exist_ok=True)
+        digest, size = hashlib.sha256(), 0
+        with tempfile.NamedTemporaryFile(dir=folder, delete=False) as temp:
+            try:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    size += len(chunk)
+                    temp.write(chunk)
+            except Exception:
+                os.remove(temp.name)
+                raise
+        os.chmod(temp.name, self.file_permissions_mode or 0o644)
+        return digest.hexdigest(), size, temp.name
+
+    @staticmethod
+    def touch_blob(name, digest, size):
+        """Locks the Blob row of a blob being saved, creating it, and marks it
+        updated so that gc_blobs keeps it for the grace period"""
+        from Core.models import Blob
+        blob, created = Blob.objects.select_for_update().get_or_create(
+            name=name, defaults={'digest': digest, 'size': size}
+        )
+        if not created:
+            Blob.objects.filter(pk=blob.pk).update(last_updated=timezone.now())
+
+    @staticmethod
+    def add_reference(name):
+        """Adds a reference to a blob, called when a file field is set to it,
+        see Core.models.blob.reference_blobs, and released by delete"""
+        from Core.models import Blob
+        if is_blob(name):
+            Blob.objects.filter(name=name).update(
+                refs=F('refs') + 1, last_updated=timezone.now()
+            )
+
+    def delete(self, name):
+        """Releases a reference to a blob, the file is removed by gc_blobs
+        Derived files are removed with their blob"""
+        from Core.models import Blob
+        if is_blob(name):
+            Blob.objects.filter(name=name).update(
+                refs=Greatest(F('refs') - 1, 0), last_updated=timezone.now()
+            )
+        elif not is_derived(name):
+            super().delete(name)
+
+    def remove_blob(self, name):
+        """Removes the file of a blob and its derived files
+        Returns the number of bytes freed"""
+        freed, path = 0, self.path(name)
+        folder = os.path.join(os.path.dirname(path), DERIVED_DIR)
+        paths = [path] + [
+            entry.path for entry in (
+                os.scandir(folder) if os.path.isdir(folder) else ()
+            ) if entry.name.startswith(f'{blob_digest(name)}_')
+        ]
+        for path in paths:
+            try:
+                freed += os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return freed
+
+
+def orphan_files(storage, folder, referenced, cutoff):
+    """Yields (name, path, size) of files under folder, scanned once, which
+    are not in the referenced names and were modified before cutoff"""
+    for root, folders, filenames in os.walk(storage.path(folder)):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+            stat = os.stat(path)
+            if name not in referenced and \
+                    stat.st_mtime < cutoff.timestamp():
+                yield name, path, stat.st_size
+
+
+def recount_references():
+    """Recounts the references of blobs from the content addressed file
+    fields of every model, fixing counts of saves or deletes lost with
+    rolled back transactions
+    Blobs referenced or released meanwhile are skipped
+    Returns the number of blobs whose count changed"""
+    from django.apps import apps
+    from Core.models import Blob
+    from Core.models.blob import blob_fields
+    start, counts = timezone.now(), Counter()
+    for model in apps.get_models():
+        for field in blob_fields(model):
+            counts.update(
+                name for name in model._base_manager.exclude(
+                    **{field.attname: ''}
+                ).exclude(**{f'{field.attname}__isnull': True}).values_list(
+                    field.attname, flat=True
+                ).iterator() if is_blob(name)
+            )
+    changed, now = [], timezone.now()
+    for blob in Blob.objects.filter(last_updated__lt=start).only(
+        'pk', 'name', 'refs'
+    ).iterator():
+        if blob.refs != counts.get(blob.name, 0):
+            blob.refs, blob.last_updated = counts.get(blob.name, 0), now
+            changed.append(blob)
+    Blob.objects.bulk_update(
+        changed, ['refs', 'last_updated'], batch_size=1000
+    )
+    return len(changed)
+
+
+def collect_garbage(storage, grace=GC_GRACE, dry_run=False):
+    """Removes blobs unreferenced for longer than grace, then stray files
+    older than grace: temporary files, files without a Blob row (saves
+    rolled back) and derived files of removed blobs
+    Returns (blobs removed, stray files removed, bytes freed)"""
+    from Core.models import Blob
+    cutoff = timezone.now() - grace
+    blobs, files, freed = 0, 0, 0
+    for blob in Blob.objects.filter(
+        refs__lte=0, last_updated__lt=cutoff
+    ).only('pk', 'size').iterator():
+        if dry_run:
+            blobs, freed = blobs + 1, freed + blob.size
+            continue
+        with transaction.atomic():  # waits for saves holding the row
+            blob = Blob.objects.select_for_update().filter(
+                pk=blob.pk, refs__lte=0, last_updated__lt=cutoff
+            ).first()  # None when referenced or saved meanwhile
+            if blob is not None:
+                blob.delete()
+                blobs, freed = blobs + 1, freed + storage.remove_blob(
+                    blob.name
+                )
+
+    names = set(Blob.objects.values_list('name', flat=True).iterator())
+    digests = {blob_digest(name) for name in names}
+    for root, folders, filenames in os.walk(storage.path(BLOB_DIR)):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+            stat = os.stat(path)
+            if stat.st_mtime >= cutoff.timestamp() or name in names or (
+                is_derived(name) and blob_digest(name) in digests
+            ):
+                continue
+            if not dry_run:
+                os.remove(path)
+            files, freed = files + 1, freed + stat.st_size
+    logger.debug(  # prints function name
+        f"{_getframe().f_code.co_name} Removed {blobs} blobs and {files} "
+        f"stray files, {freed} bytes"
+    )
+    return blobs, files, freed
@@ -4,19 +4,70 @@ https://docs.celeryproject.org/en/stable/django/first-steps-with-django.html
 # PYTHON IMPORTS
 from __future__ import absolute_import, unicode_literals
 import logging
+import tempfile
+from collections import Counter
+from datetime import timedelta
+from itertools import chain
+from sys import _getframe
 # DJANGO IMPORTS
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
 from django.core.management import call_command
+from django.db import transaction
 from django.utils import timezone
 # CELERY IMPORTS
 from celery import shared_task
+# PLUGIN IMPORTS
+from dbbackup.storage import get_storage
+# CORE IMPORTS
+from Core import backups, renditions
+from Core.archive import BATCH_SIZE, archive_log_entries as archive_entries
+from Core.dedupe import (
+    find_candidates, store_candidates, update_block_keys
+)
+from Core.geocoding import get_geocoder
+from Core.exports import CHUNK_SIZE, WRITERS, resource_rows
+from Core.imports import count_rows, import_chunks
+from Core.models import DuplicateCandidate, ExportJob, ImportJob, Profile
+from Core.models.daily import rebuild_daily_counts as rebuild_daily
+from Core.models.density import (
+    apply_density_changes, density_changes, rebuild_density as rebuild
+)
+from Core.models.profile import REGION_CODE_FIELDS
+from Core.models.stats import refresh_region_stats as refresh
+from Core.resources import UserResource
+from Core.spatial_index import update_spatial_index
 
 
 logger = logging.getLogger(__name__)
 
 
 @shared_task
-def dbbackup(compress=1, clean=1, path=None, filename=None):
-    """Backup database by calling the management command"""
+def dbbackup(compress=1, clean=1, path=None, filename=None, parallel=0,
+             workers=None):
+    """Backup database by calling the management command
+    With parallel > 0 and compress > 0 the dump is gzipped on workers
+    threads (default settings.DBBACKUP_COMPRESS_WORKERS) while streamed to
+    the storage, see Core.backups"""
+    if parallel > 0 and compress > 0:
+        try:
+            metrics = backups.backup_database(
+                filename=filename, path=path, workers=workers
+            )
+            if clean > 0 and not path:
+                get_storage().clean_old_backups(
+                    compressed=True, content_type='db', database='default'
+                )
+        except Exception as e:
+            logger.error(e)
+            return f"{timezone.now()} Could not backup database."
+        return f"{timezone.now()}: Database backup successful, " \
+            f"{metrics['bytes_in']} bytes compressed to " \
+            f"{metrics['bytes_out']} in {metrics['seconds']}s " \
+            f"({metrics['mib_per_second']} MiB/s, {metrics['workers']} " \
+            f"workers)."
+
     args = ['--noinput', ]
     kwargs = {}
 
@@ -36,3 +87,371 @@ def dbbackup(compress=1, clean=1, path=None, filename=None):
     except Exception as e:
         logger.error(e)
         return f"{timezone.now()} Could not backup database."
+
+
+@shared_task
+def backup_tables(incremental=1, tables=None):
+    """Backs up the database tables, only their changes since the previous
+    run when incremental, tables: model labels, ex: ['Core.User'], for a
+    partial run not used as the base of later runs"""
+    try:
+        manifest = backups.backup_tables(incremental > 0, tables)
+    except Exception as e:
+        logger.error(e)
+        return f"{timezone.now()} Could not backup tables."
+    return f"{timezone.now()}: Table backup {manifest['run']} successful, " \
+        f"{len(manifest['tables'])} tables."
+
+
+@shared_task
+def verify_backup(run=None):
+    """Verifies the checksums and row counts of a table backup run, by
+    default the last one"""
+    problems = backups.verify_backup(run)
+    for problem in problems:
+        logger.error(problem)
+    if problems:
+        return f"{timezone.now()} Backup verification failed: " \
+            f"{len(problems)} problems."
+    return f"{timezone.now()}: Backup verified."
+
+
+@shared_task
+def clean_backups(keep=None, days=None):
+    """Deletes the table and media backup runs past the retention policy"""
+    deleted = backups.clean_backups(keep, days) + backups.clean_backups(
+        keep, days, settings.BACKUP_MEDIA_DIR
+    )
+    return f"{timezone.now()}: Deleted {len(deleted)} backups."
+
+
+@shared_task
+def mediabackup(incremental=1, workers=None):
+    """Backs up the media files, only those changed since the previous run
+    when incremental, gzipped on workers threads, see Core.backups"""
+    try:
+        manifest = backups.backup_media(incremental > 0, workers)
+    except Exception as e:
+        logger.error(e)
+        return f"{timezone.now()} Could not backup media."
+    archive = manifest['archive'] or {'files': 0}
+    return f"{timezone.now()}: Media backup {manifest['run']} successful, " \
+        f"{archive['files']} of {len(manifest['files'])} files archived."
+
+
+@shared_task
+def mediarestore(users=None, run=None):
+    """Restores the media files of a backup run, default the last one, only
+    those of the given user ids when users"""
+    try:
+        restored = backups.restore_media(users, run)
+    except Exception as e:
+        logger.error(e)
+        return f"{timezone.now()} Could not restore media."
+    return f"{timezone.now()}: Restored {len(restored)} media files."
+
+
+def report_progress(task, **meta):
+    """Reports PROGRESS state with meta of a bound task run by a worker"""
+    if task.request.id:  # not set when called directly, ex: task.run()
+        task.update_state(state='PROGRESS', meta=meta)
+
+
+@shared_task(bind=True)
+def geocode_profiles(self, batch_size=500, full=0):
+    """Geocodes profiles changed since they were last geocoded, in batches
+    Set full > 0 to geocode all profiles except manually located ones
+    Profiles changed while their batch was geocoded are left for next run"""
+    geocoder = get_geocoder()
+    queryset = Profile.objects.needs_geocoding(full=full > 0).order_by('pk')
+    total, processed, located, last_pk = queryset.count(), 0, 0, None
+    fields = ('latitude', 'longitude', 'geo_cell') + REGION_CODE_FIELDS
+
+    while True:
+        batch_qs = queryset if last_pk is None else queryset.filter(
+            pk__gt=last_pk
+        )
+        batch = list(batch_qs[:batch_size])
+        if not batch:
+            break
+        now, loaded = timezone.now(), {}
+        for profile in batch:
+            loaded[profile.pk] = profile.last_updated
+            old = tuple(getattr(profile, field) for field in fields)
+            location = geocoder.geocode(profile) or (None, None)
+            profile.set_location(*location)
+            profile.resolve_region()
+            profile.geocoded_at = now
+            if tuple(getattr(profile, field) for field in fields) != old:
+                profile.last_updated = now  # seen by the watermarks
+        with transaction.atomic():  # only rows unchanged since loaded
+            current = dict(Profile.objects.select_for_update().filter(
+                pk__in=loaded
+            ).values_list('pk', 'last_updated'))
+            batch, last_pk = [
+                profile for profile in batch
+                if current.get(profile.pk) == loaded[profile.pk]
+            ], batch[-1].pk
+            Profile.objects.bulk_update(
+                batch, fields + ('geocoded_at', 'last_updated')
+            )
+            apply_density_changes(density_changes(batch))
+        for profile in batch:  # bulk_update skips the post_save signal
+            update_spatial_index(profile)
+        processed += len(batch)
+        located += sum(profile.latitude is not None for profile in batch)
+        report_progress(self, processed=processed, total=total)
+        logger.debug(  # prints function name
+            f"{_getframe().f_code.co_name} Geocoded batch: "
+            f"{processed}/{total} profiles"
+        )
+
+    return f"{timezone.now()}: Geocoded {located} of {processed} profiles."
+
+
+@shared_task
+def rebuild_density():
+    """Rebuilds the precomputed map density tables"""
+    try:
+        rows = rebuild()
+        return f"{timezone.now()}: Rebuilt {rows} density rows."
+    except Exception as e:
+        logger.error(e)
+        return f"{timezone.now()} Could not rebuild density."
+
+
+@shared_task
+def refresh_region_stats():
+    """Refreshes the region statistics with profiles changed since the
+    previous refresh"""
+    try:
+        count = refresh()
+        return f"{timezone.now()}: Recounted {count} profiles."
+    except Exception as e:
+        logger.error(e)
+        return f"{timezone.now()} Could not refresh region statistics."
+
+
+@shared_task
+def rebuild_daily_counts():
+    """Rebuilds the daily counts of the admin date hierarchies"""
+    try:
+        rows = rebuild_daily()
+        return f"{timezone.now()}: Rebuilt {rows} daily counts."
+    except Exception as e:
+        logger.error(e)
+        return f"{timezone.now()} Could not rebuild daily counts."
+
+
+@shared_task
+def archive_log_entries(days=None, batch_size=BATCH_SIZE):
+    """Moves admin log entries past their retention into LogArchive"""
+    archives, entries = archive_entries(days, batch_size)
+    return f"{timezone.now()}: Archived {entries} log entries in " \
+        f"{archives} archives."
+
+
+@shared_task(bind=True)
+def find_duplicates(self, batch_size=1000):
+    """Stores candidate duplicate profile pairs for review in admin
+    Pairs found again are refreshed and keep their status, new pairs which
+    no longer match are removed"""
+    start = timezone.now()
+    updated = update_block_keys(Profile.objects.all())
+    found, created, batch = 0, 0, []
+    for key, pk_a, pk_b, score, matched in find_candidates(
+        Profile.objects.all()
+    ):
+        batch.append(DuplicateCandidate(
+            profile_a_id=pk_a, profile_b_id=pk_b, score=score,
+            matched=', '.join(matched), block_key=key, updated_at=start
+        ))
+        if len(batch) >= batch_size:
+            created += store_candidates(batch)
+            found, batch = found + len(batch), []
+            report_progress(self, found=found)
+    created += store_candidates(batch)
+    found += len(batch)
+    removed = DuplicateCandidate.objects.filter(
+        status=DuplicateCandidate.NEW, updated_at__lt=start
+    ).delete()[0]
+    logger.debug(  # prints function name
+        f"{_getframe().f_code.co_name} Found {found} duplicate candidates, "
+        f"{created} new, removed {removed}, updated {updated} block keys"
+    )
+    return f"{timezone.now()}: Found {found} duplicate candidates, " \
+        f"{created} new, removed {removed}."
+
+
+def render_profile(profile_id):
+    """Generates the resized renditions of a profile image, replacing the
+    renditions of the previous image. Returns the outcome"""
+    profile = Profile.objects.filter(pk=profile_id).first()
+    if profile is None:
+        return 'not found'
+    old, image = profile.image_renditions or {}, profile.image
+    if old.get('source') == image.name:
+        return 'up to date'
+
+    new = renditions.generate_renditions(image) if image else {}
+    if not Profile.objects.filter(pk=profile_id, image=image.name).update(
+        image_renditions=new, last_updated=timezone.now()
+    ):  # the image changed meanwhile, its own task renders it
+        renditions.delete_renditions(image.storage, new)
+        return 'changed'
+    kept = {name for size in new.values() if isinstance(size, dict)
+            for name in size.values()}
+    renditions.delete_renditions(image.storage, {
+        size: {fmt: name for fmt, name in files.items() if name not in kept}
+        for size, files in old.items() if size != 'source'
+    })
+    return 'generated'
+
+
+@shared_task(autoretry_for=(OSError, ), retry_backoff=True, max_retries=3)
+def generate_profile_renditions(profile_ids):
+    """Generates the renditions of the profiles whose image changed, queued
+    once per transaction on commit"""
+    outcomes = Counter(render_profile(pk) for pk in profile_ids)
+    return f"{timezone.now()}: Renditions of {len(profile_ids)} profiles, " \
+        f"{', '.join(f'{n} {o}' for o, n in sorted(outcomes.items()))}."
+
+
+@shared_task(bind=True, max_retries=5)
+def delete_media_files(self, names):
+    """Deletes replaced or deleted profile image files, queued on commit
+    Files failing to delete are retried with an exponential backoff"""
+    storage, failed = Profile._meta.get_field('image').storage, []
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError as e:
+            logger.warning(  # prints function name
+                f"{_getframe().f_code.co_name} Failed deleting {name}: {e}"
+            )
+            failed.append(name)
+    if failed:
+        raise self.retry(
+            args=(failed, ), countdown=10 * 2 ** self.request.retries
+        )
+    return f"{timezone.now()}: Deleted {len(names)} media files."
+
+
+@shared_task(bind=True)
+def export_users(self, job_id):
+    """Writes an admin export of users to storage, row by row, recording
+    the progress in its ExportJob"""
+    job = ExportJob.objects.get(pk=job_id)
+    ExportJob.objects.filter(pk=job_id).update(status=ExportJob.RUNNING)
+    try:
+        queryset = get_user_model().objects.all()
+        if job.query is not None:  # filtered and searched in the changelist
+            from Core.admin import changelist_queryset
+            queryset = changelist_queryset(
+                get_user_model(), job.requested_by, job.query
+            )
+        if job.pks is None:
+            total, querysets = queryset.count(), [queryset]
+        else:  # selected by the admin, read CHUNK_SIZE ids at a time
+            total = len(job.pks)
+            querysets = (
+                queryset.filter(pk__in=job.pks[start:start + CHUNK_SIZE])
+                for start in range(0, total, CHUNK_SIZE)
+            )
+        ExportJob.objects.filter(pk=job_id).update(total=total)
+        resource, processed = UserResource(), 0
+
+        def rows():
+            """Yields the rows, updating the progress of each chunk"""
+            nonlocal processed
+            for row in chain.from_iterable(
+                resource_rows(resource, chunk, CHUNK_SIZE)
+                for chunk in querysets
+            ):
+                yield row
+                processed += 1
+                if processed % CHUNK_SIZE == 0:
+                    ExportJob.objects.filter(pk=job_id).update(
+                        processed=processed
+                    )
+                    report_progress(self, processed=processed, total=total)
+
+        with tempfile.TemporaryFile() as file:
+            WRITERS[job.file_format](
+                file, resource.get_export_headers(), rows()
+            )
+            file.seek(0)
+            job.file.save(
+                f'users-{job_id}.{job.file_format}', File(file), save=False
+            )
+    except Exception as e:
+        logger.exception(e)
+        ExportJob.objects.filter(pk=job_id).update(
+            status=ExportJob.FAILED, error=str(e), finished_at=timezone.now()
+        )
+        return f"{timezone.now()}: Export {job_id} failed."
+    ExportJob.objects.filter(pk=job_id).update(
+        status=ExportJob.DONE, file=job.file.name, processed=processed,
+        total=processed, finished_at=timezone.now()  # without deleted users
+    )
+    return f"{timezone.now()}: Exported {processed} users."
+
+
+@shared_task(bind=True)
+def import_users(self, job_id):
+    """Imports the uploaded file of an ImportJob chunk by chunk, recording
+    the progress and the errors of rejected rows in the job"""
+    job = ImportJob.objects.get(pk=job_id)
+    ImportJob.objects.filter(pk=job_id).update(status=ImportJob.RUNNING)
+    try:
+        with job.file.open('rb') as file:
+            job.total = count_rows(file, job.file_format)
+            ImportJob.objects.filter(pk=job_id).update(total=job.total)
+            for rows, created, updated, errors in import_chunks(
+                file, job.file_format
+            ):
+                job.processed += rows
+                job.created += created
+                job.updated += updated
+                job.failed += len(errors)
+                job.row_errors += errors[:job.MAX_ERRORS - len(job.row_errors)]
+                job.save(update_fields=[
+                    'processed', 'created', 'updated', 'failed', 'row_errors'
+                ])
+                report_progress(
+                    self, processed=job.processed, total=job.total
+                )
+    except Exception as e:
+        logger.exception(e)
+        ImportJob.objects.filter(pk=job_id).update(
+            status=ImportJob.FAILED, error=str(e), finished_at=timezone.now()
+        )
+        return f"{timezone.now()}: Import {job_id} failed."
+    ImportJob.objects.filter(pk=job_id).update(
+        status=ImportJob.DONE, total=job.processed, finished_at=timezone.now()
+    )
+    return f"{timezone.now()}: Imported {job.created} and updated " \
+        f"{job.updated} users, {job.failed} rows failed."
+
+
+@shared_task
+def clean_job_files(days=None):
+    """Deletes the files of import and export jobs created more than days
+    ago, default settings.JOB_FILE_RETENTION_DAYS"""
+    days = settings.JOB_FILE_RETENTION_DAYS if days is None else days
+    cutoff, deleted = timezone.now() - timedelta(days=days), 0
+    for job_model in (ExportJob, ImportJob):
+        for job in job_model.objects.filter(created_at__lt=cutoff).exclude(
+            file=''
+        ).exclude(file__isnull=True).iterator():
+            try:
+                job.file.delete(save=False)
+            except OSError as e:
+                logger.warning(  # prints function name
+                    f"{_getframe().f_code.co_name} Failed deleting "
+                    f"{job.file.name}: {e}"
+                )
+                continue
+            job_model.objects.filter(pk=job.pk).update(file='')
+            deleted += 1
+    return f"{timezone.now()}: Deleted {deleted} job files."
@@ -0,0 +1 @@
+"""Core > templatetags > __init__.py"""
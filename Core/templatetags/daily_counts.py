@@ -0,0 +1,105 @@
+"""Core > templatetags > daily_counts.py
+Admin date hierarchy read from the precomputed DailyCount rows instead of
+distinct date queries over the changelist table. Changelists with other
+filters or a search fall back to Django's date_hierarchy.
+"""
+# DJANGO IMPORTS
+from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.contrib.admin.templatetags.base import InclusionAdminNode
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+# CORE IMPORTS
+from Core.models.daily import DAILY_COUNT_FIELDS, daily_range, period_counts
+
+
+register = template.Library()
+
+
+def is_counted(cl):
+    """Tests if the date hierarchy of a changelist can be read from the
+    daily counts: a counted field without other filters or search"""
+    if DAILY_COUNT_FIELDS.get(cl.model) != cl.date_hierarchy or cl.query:
+        return False
+    field_generic = f'{cl.date_hierarchy}__'
+    return all(
+        param.startswith(field_generic) for param in cl.get_filters_params()
+    )
+
+
+def cached_date_hierarchy(cl):
+    """Returns the context of the date_hierarchy.html admin template, as
+    Django's date_hierarchy, with the number of rows of each choice"""
+    if not cl.date_hierarchy or not is_counted(cl):
+        return date_hierarchy(cl)
+    field_name = cl.date_hierarchy
+    year_field = f'{field_name}__year'
+    month_field = f'{field_name}__month'
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    if cl.params.get(f'{field_name}__day'):  # shown without any query
+        return date_hierarchy(cl)
+
+    def link(filters):
+        return cl.get_query_string(filters, [f'{field_name}__'])
+
+    def title(date, date_format, count):
+        return f'{capfirst(formats.date_format(date, date_format))} ({count})'
+
+    if not (year_lookup or month_lookup):  # select appropriate start level
+        first, last = daily_range(cl.model, field_name)
+        if first and last and first.year == last.year:
+            year_lookup = first.year
+            if first.month == last.month:
+                month_lookup = first.month
+
+    if year_lookup and month_lookup:
+        days = period_counts(
+            cl.model, field_name, int(year_lookup), int(month_lookup)
+        )
+        return {
+            'show': True,
+            'back': {
+                'link': link({year_field: year_lookup}),
+                'title': str(year_lookup)
+            },
+            'choices': [{
+                'link': link({
+                    year_field: year_lookup, month_field: month_lookup,
+                    f'{field_name}__day': day.day
+                }),
+                'title': title(day, 'MONTH_DAY_FORMAT', count)
+            } for day, count in days]
+        }
+    elif year_lookup:
+        months = period_counts(cl.model, field_name, int(year_lookup))
+        return {
+            'show': True,
+            'back': {'link': link({}), 'title': _('All dates')},
+            'choices': [{
+                'link': link({year_field: year_lookup,
+                              month_field: month.month}),
+                'title': title(month, 'YEAR_MONTH_FORMAT', count)
+            } for month, count in months]
+        }
+    years = period_counts(cl.model, field_name)
+    return {
+        'show': True,
+        'back': None,
+        'choices': [{
+            'link': link({year_field: str(year.year)}),
+            'title': f'{year.year} ({count})',
+        } for year, count in years]
+    }
+
+
+@register.tag(name='cached_date_hierarchy')
+def cached_date_hierarchy_tag(parser, token):
+    """Renders the admin date hierarchy from the daily counts"""
+    return InclusionAdminNode(
+        parser, token,
+        func=cached_date_hierarchy,
+        template_name='date_hierarchy.html',
+        takes_context=False,
+    )
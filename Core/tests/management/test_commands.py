@@ -1,10 +1,17 @@
 """Core > tests > management > test_commands.py"""
 # PYTHON IMPORTS
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 # DJANGO IMPORTS
 from django.core.management import call_command
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import TestCase, override_settings
+# CORE IMPORTS
+from Core.management.commands.benchmark_images import sample_image
+from Core.models import Profile, RegionStat
+from Core.tests.samples import sample_user
 
 
 class CmdsTestCase(TestCase):
@@ -24,3 +31,88 @@ class CmdsTestCase(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+    def test_normalize_regions(self):
+        """Test normalizing profile regions to gazetteer names and ids"""
+        user = sample_user()
+        Profile.objects.filter(user=user).update(  # skips resolving on save
+            division='chattogram division', district='cumilla', thana='sadar'
+        )
+        call_command('normalize_regions', stdout=StringIO())
+
+        profile = Profile.objects.get(user=user)
+        self.assertEqual(profile.division, 'Chittagong')
+        self.assertEqual(profile.district, 'Comilla')
+        self.assertEqual(profile.thana, 'Comilla Sadar')
+        self.assertIsNotNone(profile.division_code)
+        self.assertIsNotNone(profile.district_code)
+        self.assertIsNotNone(profile.thana_code)
+
+    def test_spatial_index(self):
+        """Test building the spatial index"""
+        user = sample_user()
+        user.profile.set_location(23.8103, 90.4125)
+        user.profile.save()
+        out = StringIO()
+        call_command('spatial_index', stdout=out)
+        self.assertIn('Indexed 1 profiles', out.getvalue())
+
+    def test_rebuild_region_stats(self):
+        """Test rebuilding the region statistics"""
+        sample_user()
+        out = StringIO()
+        call_command('rebuild_region_stats', stdout=out)
+        self.assertIn('statistics of 1 profiles', out.getvalue())
+        self.assertEqual(RegionStat.objects.get().count, 1)
+
+    def test_benchmark_images(self):
+        """Test the draft mode decoding benchmark on sample images"""
+        out = StringIO()
+        with patch('Core.management.commands.benchmark_images.SAMPLE_SIZES',
+                   ((800, 600),)):
+            call_command('benchmark_images', '--repeat', '1', stdout=out)
+        self.assertIn('full     600x800', out.getvalue())
+        self.assertIn('draft ', out.getvalue())
+
+    def test_benchmark_images_skipped(self):
+        """Test files that are no images or are broken are skipped"""
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        data = sample_image((400, 300))
+        for name, content in (('notes.txt', b'text'), ('photo.jpg', data),
+                              ('broken.jpg', data[:len(data) // 3])):
+            with open(os.path.join(folder.name, name), 'wb') as file:
+                file.write(content)
+        out, err = StringIO(), StringIO()
+        call_command('benchmark_images', folder.name, '--repeat', '1',
+                     stdout=out, stderr=err)
+        self.assertIn('photo.jpg', out.getvalue())
+        self.assertNotIn('notes.txt', out.getvalue())
+        self.assertIn('Skipped notes.txt', err.getvalue())
+        self.assertIn('Skipped broken.jpg', err.getvalue())
+
+    def test_reconcile_media(self):
+        """Test removing files under Users/ no profile references"""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        profile = sample_user().profile
+        profile.image_renditions = {'thumb': {'webp': 'Users/1/r/a.webp'}}
+        Profile.objects.filter(pk=profile.pk).update(
+            image='Users/1/a.png', image_renditions=profile.image_renditions
+        )
+        for name in ('a.png', 'r/a.webp', 'old.png', 'r/old.webp'):
+            path = os.path.join(media.name, 'Users', '1', name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(b'file')
+
+        out = StringIO()
+        with override_settings(MEDIA_ROOT=media.name):
+            call_command('reconcile_media', '--dry-run', stdout=out)
+            self.assertIn('Would remove 0 orphaned files', out.getvalue())
+            call_command('reconcile_media', '--grace', '-1', stdout=out)
+        self.assertIn('Removed 2 orphaned files, 8 bytes', out.getvalue())
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(media.name, 'Users', '1', 'r'))),
+            ['a.webp']
+        )
@@ -0,0 +1,74 @@
+"""Core > tests > models > test_daily.py"""
+# PYTHON IMPORTS
+from datetime import date, datetime
+# DJANGO IMPORTS
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+# CORE IMPORTS
+from Core.models import DailyCount
+from Core.models.daily import period_counts, rebuild_daily_counts
+from Core.tests.samples import sample_user
+
+
+USER_MODEL = get_user_model()
+
+
+def daily_snapshot():
+    """Returns the non-zero daily counts as a comparable set"""
+    return set(DailyCount.objects.exclude(count=0).values_list(
+        'key', 'day', 'count'
+    ))
+
+
+class DailyCountTests(TestCase):
+    """Test class for the precomputed daily counts"""
+
+    def setUp(self):
+        """setup users joined on different days"""
+        for i, joined in enumerate([
+            (2020, 1, 5), (2020, 1, 5), (2020, 3, 1), (2021, 6, 30),
+        ]):
+            sample_user(f'user{i}@email.com')  # counted today
+            USER_MODEL.objects.filter(email=f'user{i}@email.com').update(
+                date_joined=timezone.make_aware(  # next day in UTC
+                    datetime(*joined, 23, 30)
+                )
+            )
+        rebuild_daily_counts()
+
+    def test_period_counts(self):
+        """Tests counts of users per year, month and day"""
+        self.assertEqual(period_counts(USER_MODEL, 'date_joined'), [
+            (date(2020, 1, 1), 3), (date(2021, 1, 1), 1)
+        ])
+        self.assertEqual(period_counts(USER_MODEL, 'date_joined', 2020), [
+            (date(2020, 1, 1), 2), (date(2020, 3, 1), 1)
+        ])
+        self.assertEqual(period_counts(USER_MODEL, 'date_joined', 2020, 1), [
+            (date(2020, 1, 5), 2)
+        ])
+
+    def test_incremental_matches_rebuild(self):
+        """Tests incremental counts match a full rebuild"""
+        USER_MODEL.objects.get(email='user2@email.com').delete()
+        sample_user('today@email.com')
+        incremental = daily_snapshot()
+        self.assertEqual(
+            period_counts(USER_MODEL, 'date_joined', 2020, 3), []
+        )
+        rebuild_daily_counts()
+        self.assertEqual(daily_snapshot(), incremental)
+
+    def test_rebuild_in_transaction(self):
+        """Tests the counts are aggregated after the deletion of the old
+        ones, in the same transaction"""
+        with CaptureQueriesContext(connection) as queries:
+            rebuild_daily_counts()
+        sql = [query['sql'].split()[0] for query in queries]
+        self.assertEqual(sql[0], 'SAVEPOINT')
+        self.assertEqual(sql[1], 'DELETE')
+        self.assertEqual(sql[-1], 'RELEASE')
+        self.assertIn('SELECT', sql[2:-1])
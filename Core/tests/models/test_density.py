@@ -0,0 +1,98 @@
+"""Core > tests > models > test_density.py"""
+# PYTHON IMPORTS
+from unittest.mock import patch
+# DJANGO IMPORTS
+from django.db import connection
+from django.test import TestCase
+# CORE IMPORTS
+from Core.models import CellDensity, Profile, RegionDensity
+from Core.models.density import (
+    UNCOUNTED, density_key, lock_density, rebuild_density
+)
+from Core.tests.samples import sample_user
+
+
+def density_snapshot():
+    """Returns the non-zero density rows as comparable sets"""
+    cells = set(CellDensity.objects.exclude(count=0).values_list(
+        'precision', 'cell', 'gender', 'is_active', 'count'
+    ))
+    regions = set(RegionDensity.objects.exclude(count=0).values_list(
+        'level', 'code', 'gender', 'is_active', 'count'
+    ))
+    return cells, regions
+
+
+class DensityTests(TestCase):
+    """Test class for the precomputed density tables"""
+
+    def setUp(self):
+        """setup located profiles"""
+        for i, (lat, lng, gender) in enumerate([
+            (23.7461, 90.3742, 'M'), (23.7925, 90.4078, 'F'),
+            (22.3569, 91.7832, 'M'),
+        ]):
+            user = sample_user(f'user{i}@email.com')
+            user.profile.set_location(lat, lng)
+            user.profile.district = 'Dhaka' if i < 2 else 'Chittagong'
+            user.profile.gender = gender
+            user.profile.save()
+
+    def test_incremental_counts(self):
+        """Tests incremental counts of created profiles"""
+        self.assertEqual(CellDensity.objects.get(
+            precision=1, cell='w', gender='M', is_active=True
+        ).count, 2)
+        self.assertEqual(sum(RegionDensity.objects.filter(
+            level='division'
+        ).values_list('count', flat=True)), 3)
+
+    def test_incremental_matches_rebuild(self):
+        """Tests incremental updates match a full rebuild"""
+        profile = Profile.objects.get(user__email='user0@email.com')
+        profile.set_location(24.90, 91.87)
+        profile.district = 'Sylhet'
+        profile.save()
+        profile = Profile.objects.get(user__email='user1@email.com')
+        profile.gender, profile.is_active = 'M', False
+        profile.save()
+        Profile.objects.get(user__email='user2@email.com').user.delete()
+        sample_user('unlocated@email.com')
+
+        incremental = density_snapshot()
+        self.assertTrue(rebuild_density())
+        self.assertEqual(incremental, density_snapshot())
+
+    def test_unchanged_save(self):
+        """Tests saving an unchanged profile does not touch the counts"""
+        before = density_snapshot()
+        profile = Profile.objects.get(user__email='user0@email.com')
+        profile.bio = 'Bio'
+        profile.save()
+        self.assertEqual(before, density_snapshot())
+
+    def test_rebuild_locked(self):
+        """Tests the counts are computed and swapped in the transaction
+        locking the density tables"""
+        depth = len(connection.savepoint_ids)
+        savepoints = []
+
+        def lock():
+            savepoints.append(connection.savepoint_ids[depth:])
+            lock_density()
+
+        before = density_snapshot()
+        with patch('Core.models.density.lock_density', side_effect=lock):
+            rebuild_density()
+        self.assertEqual(len(savepoints), 1)
+        self.assertEqual(len(savepoints[0]), 1)
+        self.assertEqual(before, density_snapshot())
+
+    def test_loaded_density_key(self):
+        """Tests the density key is remembered by profiles loaded from the
+        db only"""
+        profile = Profile.objects.get(user__email='user0@email.com')
+        self.assertEqual(profile._density_key, density_key(profile))
+        profile = Profile.objects.only('pk').get(pk=profile.pk)
+        self.assertIs(profile._density_key, UNCOUNTED)
+        self.assertFalse(hasattr(Profile(), '_density_key'))
@@ -8,7 +8,9 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, override_settings
 from django.utils import timezone
 # CORE IMPORTS
+from Core import geo
 from Core.models import Profile
+from Core.models.profile import years_ago
 from Core.tests.samples import sample_user
 
 
@@ -60,10 +62,85 @@ class ProfileTests(TestCase):
 
         profile = Profile.objects.get(user=user)
         self.assertIsNotNone(profile.birthday)
+        today = timezone.now().date()
         self.assertEqual(
-            int((timezone.now().date() - profile.birthday).days / 365.25),
+            today.year - 1988 - ((today.month, today.day) < (5, 19)),
             profile.age
         )
+        self.assertLess(years_ago(profile.age + 1), profile.birthday)
+        self.assertLessEqual(profile.birthday, years_ago(profile.age))
+
+    def test_profile_age_between(self):
+        """Tests filtering profiles by age in the database"""
+        for i, age in enumerate((17, 18, 24, 25)):
+            user = sample_user(f'user{i}@email.com')
+            user.profile.birthday = years_ago(age)
+            user.profile.save()
+        sample_user('nobirthday@email.com')
+
+        ages = Profile.objects.age_between(18, 24)
+        self.assertEqual(
+            sorted(p.age for p in ages), [18, 24]
+        )
+        self.assertEqual(Profile.objects.age_between(min_age=25).count(), 1)
+        self.assertEqual(Profile.objects.age_between(max_age=17).count(), 1)
+
+    def test_profile_age_band(self):
+        """Tests the age band annotation of profiles"""
+        user = sample_user()
+        user.profile.birthday = years_ago(30)
+        user.profile.save()
+        sample_user('nobirthday@email.com')
+
+        bands = dict(Profile.objects.with_age_band().values_list(
+            'user__email', 'age_band'
+        ))
+        self.assertEqual(bands[user.email], '25-34')
+        self.assertIsNone(bands['nobirthday@email.com'])
+
+    def test_profile_location(self):
+        """Tests the grid cell follows the profile coordinates"""
+        user = sample_user()
+        self.assertIsNone(user.profile.geo_cell)
+
+        user.profile.latitude, user.profile.longitude = 23.8103, 90.4125
+        user.profile.save()
+        profile = Profile.objects.get(user=user)
+        self.assertEqual(profile.geo_cell, geo.encode(23.8103, 90.4125))
+
+        profile.latitude = None
+        profile.save(update_fields=['latitude'])
+        profile.refresh_from_db()
+        self.assertIsNone(profile.geo_cell)
+
+    def test_profile_bbox_and_radius(self):
+        """Tests bounding box and radius queries on profiles"""
+        places = {
+            'dhanmondi': (23.7461, 90.3742),
+            'gulshan': (23.7925, 90.4078),
+            'chittagong': (22.3569, 91.7832),
+        }
+        for name, (lat, lng) in places.items():
+            user = sample_user(f'{name}@email.com')
+            user.profile.set_location(lat, lng)
+            user.profile.save()
+        sample_user('nowhere@email.com')
+
+        dhaka = Profile.objects.in_bbox(23.6, 90.2, 23.9, 90.5)
+        self.assertEqual(dhaka.count(), 2)
+
+        near = Profile.objects.within_radius(23.7925, 90.4078, 7)
+        self.assertEqual(
+            [p.user.email for p in near.order_by('distance')],
+            ['gulshan@email.com', 'dhanmondi@email.com']
+        )
+        self.assertAlmostEqual(
+            near.get(user__email='dhanmondi@email.com').distance,
+            geo.haversine_km(23.7925, 90.4078, 23.7461, 90.3742), places=3
+        )
+        self.assertEqual(
+            Profile.objects.within_radius(23.7925, 90.4078, 1).count(), 1
+        )
 
     @override_settings(MEDIA_ROOT=os.path.join(settings.BASE_DIR, 'tmp'))
     def test_profile_picture(self):
@@ -0,0 +1,89 @@
+"""Core > tests > models > test_stats.py"""
+# PYTHON IMPORTS
+from datetime import timedelta
+from unittest.mock import patch
+# DJANGO IMPORTS
+from django.test import TestCase
+from django.utils import timezone
+# CORE IMPORTS
+from Core.models import Profile, ProfileStat, RegionStat, Watermark
+from Core.models.profile import years_ago
+from Core.models.stats import (
+    STATS_WATERMARK, rebuild_region_stats, refresh_region_stats
+)
+from Core.tests.samples import sample_user
+
+
+def stats_snapshot():
+    """Returns the non-zero region statistics as a comparable set"""
+    return set(RegionStat.objects.exclude(count=0).values_list(
+        'division_code', 'district_code', 'thana_code', 'gender',
+        'age_band', 'is_active', 'count'
+    ))
+
+
+class RegionStatTests(TestCase):
+    """Test class for the materialized region statistics"""
+
+    def setUp(self):
+        """setup profiles in two districts"""
+        for i, (district, gender, age) in enumerate([
+            ('Dhaka', 'M', 30), ('Dhaka', 'F', 30), ('Chittagong', 'M', 70),
+        ]):
+            user = sample_user(f'user{i}@email.com')
+            user.profile.district = district
+            user.profile.gender = gender
+            user.profile.birthday = years_ago(age) - timedelta(days=10)
+            user.profile.save()
+
+    def count(self, **lookups):
+        """Returns the total count of statistics matching lookups"""
+        return sum(RegionStat.objects.filter(**lookups).values_list(
+            'count', flat=True
+        ))
+
+    def test_first_refresh_rebuilds(self):
+        """Tests the first refresh counts every profile"""
+        self.assertEqual(refresh_region_stats(), Profile.objects.count())
+        dhaka = Profile.objects.filter(district='Dhaka').first().district_code
+        self.assertEqual(self.count(district_code=dhaka), 2)
+        self.assertEqual(self.count(age_band='25-34', gender='F'), 1)
+        self.assertEqual(self.count(age_band='65+'), 1)
+        self.assertTrue(Watermark.objects.get(name=STATS_WATERMARK).value)
+
+    def test_incremental_refresh(self):
+        """Tests refreshes recount changed, created and deleted profiles"""
+        refresh_region_stats()
+        self.assertEqual(refresh_region_stats(), 0)  # nothing changed
+
+        profile = Profile.objects.get(user__email='user0@email.com')
+        profile.is_active = False
+        profile.save()
+        sample_user('user3@email.com')
+        Profile.objects.get(user__email='user2@email.com').user.delete()
+        self.assertEqual(ProfileStat.objects.filter(deleted=True).count(), 1)
+        self.assertEqual(refresh_region_stats(), 3)
+
+        self.assertEqual(self.count(is_active=False), 1)
+        self.assertEqual(self.count(age_band='65+'), 0)
+        self.assertEqual(self.count(), Profile.objects.count())
+        self.assertEqual(ProfileStat.objects.count(), Profile.objects.count())
+        incremental = stats_snapshot()
+        rebuild_region_stats()
+        self.assertEqual(stats_snapshot(), incremental)
+
+    def test_birthday_refresh(self):
+        """Tests profiles changing age band on a birthday are recounted"""
+        Profile.objects.filter(user__email='user0@email.com').update(
+            birthday=years_ago(35) + timedelta(days=1)  # 35 tomorrow
+        )
+        refresh_region_stats()
+        self.assertEqual(self.count(age_band='35-44'), 0)
+
+        tomorrow = timezone.now() + timedelta(days=1)
+        Watermark.objects.filter(name=STATS_WATERMARK).update(
+            value=timezone.now() - timedelta(hours=1)
+        )
+        with patch('django.utils.timezone.now', return_value=tomorrow):
+            self.assertEqual(refresh_region_stats(), 1)
+            self.assertEqual(self.count(age_band='35-44'), 1)
@@ -0,0 +1,130 @@
+"""Core > tests > test_autocomplete.py"""
+# DJANGO IMPORTS
+from django.test import SimpleTestCase, TestCase
+# CORE IMPORTS
+from Core.autocomplete import (
+    PrefixTrie, get_address_index, reset_address_index
+)
+from Core.tests.samples import sample_user
+
+
+class PrefixTrieTests(SimpleTestCase):
+    """Test class for the autocomplete prefix trie"""
+
+    def test_complete(self):
+        """Tests completions are ranked by weight"""
+        trie = PrefixTrie(size=2)
+        trie.insert('Mirpur', 5)
+        trie.insert('Mohammadpur', 10)
+        trie.insert('Motijheel', 1)
+        self.assertEqual(
+            [v for v, _ in trie.complete('m')], ['Mohammadpur', 'Mirpur']
+        )
+        self.assertEqual([v for v, _ in trie.complete('MOT')], ['Motijheel'])
+        self.assertEqual(trie.complete('x'), [])
+
+    def test_insert_existing(self):
+        """Tests an existing key keeps a single, heaviest entry"""
+        trie = PrefixTrie()
+        trie.insert('Savar', 1)
+        trie.insert('savar', 3, place_id=7)
+        trie.insert('SAVAR', 2)
+        self.assertEqual(len(trie), 1)
+        self.assertEqual(trie.complete('sa'), [('savar', 7)])
+
+    def test_insert_replaces_lists(self):
+        """Tests inserts replace the completion lists read without lock"""
+        trie = PrefixTrie(size=2)
+        trie.insert('Mirpur', 5)
+        top = trie.root.children['m'].top
+        trie.insert('Mohammadpur', 10)
+        trie.insert('Mirpur', 20)
+        self.assertEqual([e[1] for e in top], ['Mirpur'])  # unchanged
+        self.assertEqual(
+            [v for v, _ in trie.complete('m')], ['Mirpur', 'Mohammadpur']
+        )
+        self.assertEqual([v for v, _ in trie.complete('mir')], ['Mirpur'])
+
+    def test_remove(self):
+        """Tests removed and lighter keys give their place in full lists to
+        the best entries left out"""
+        trie = PrefixTrie(size=2)
+        trie.insert('Mirpur', 5)
+        trie.insert('Mohammadpur', 10)
+        trie.insert('Motijheel', 1)
+        trie.remove('MIRPUR')
+        self.assertEqual(
+            [v for v, _ in trie.complete('m')], ['Mohammadpur', 'Motijheel']
+        )
+        self.assertEqual(trie.complete('mir'), [])
+        trie.set('Mohammadpur', 0)
+        self.assertEqual(
+            [v for v, _ in trie.complete('m')], ['Motijheel', 'Mohammadpur']
+        )
+        self.assertEqual(len(trie), 2)
+
+
+class AddressIndexTests(TestCase):
+    """Test class for the address autocomplete index"""
+
+    def setUp(self):
+        """setup"""
+        reset_address_index()
+
+    def test_index(self):
+        """Tests the index contains gazetteer and profile values"""
+        user = sample_user()
+        user.profile.thana = 'Shyamoli'
+        user.profile.save()
+
+        index = get_address_index()
+        values = [v for v, _ in index.complete('thana', 'sh')]
+        self.assertIn('Shyamoli', values)
+        values = [v for v, _ in index.complete('thana', 'dhan')]
+        self.assertIn('Dhanmondi', values)
+        self.assertIn('1209', [v for v, _ in index.complete('postal', '12')])
+
+        # changes are added by the post_save signal
+        user.profile.thana = 'Shewrapara'
+        user.profile.save()
+        with self.assertNumQueries(0):
+            values = [v for v, _ in index.complete('thana', 'shew')]
+        self.assertEqual(values, ['Shewrapara'])
+        # values no profile holds are removed, canonical names are kept
+        self.assertEqual(index.complete('thana', 'shy'), [])
+        user.profile.thana = 'Dhanmondi'
+        user.profile.save()
+        self.assertEqual(index.complete('thana', 'shew'), [])
+        self.assertIn('Dhanmondi', [
+            v for v, _ in index.complete('thana', 'dhan')
+        ])
+
+    def test_index_counts(self):
+        """Tests stored values are ranked by their number of profiles and
+        removed with the last deleted profile"""
+        users = [sample_user(f'user{i}@email.com') for i in range(3)]
+        thanas = ['Xeno Bazar', 'Xylo Bazar', 'Xylo Bazar']
+        for user, thana in zip(users, thanas):
+            user.profile.thana = thana
+            user.profile.save()
+        index = get_address_index()
+        self.assertEqual(
+            [v for v, _ in index.complete('thana', 'x')],
+            ['Xylo Bazar', 'Xeno Bazar']
+        )
+        users[1].profile.thana = 'Xeno Bazar'
+        users[1].profile.save()
+        users[0].profile.thana = 'xeno bazar '
+        users[0].profile.save()  # same value
+        self.assertEqual(
+            [v for v, _ in index.complete('thana', 'x')],
+            ['Xeno Bazar', 'Xylo Bazar']
+        )
+        users[2].delete()
+        self.assertEqual(
+            [v for v, _ in index.complete('thana', 'x')], ['Xeno Bazar']
+        )
+
+    def tearDown(self):
+        """cleanup"""
+        reset_address_index()
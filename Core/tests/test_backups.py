@@ -0,0 +1,295 @@
+"""Core > tests > test_backups.py"""
+# PYTHON IMPORTS
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest.mock import patch
+# DJANGO IMPORTS
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+# PLUGIN IMPORTS
+from dbbackup import settings as dbbackup_settings
+from dbbackup.db.base import BaseCommandDBConnector
+from dbbackup.db.exceptions import CommandConnectorError
+# CORE IMPORTS
+from Core.backups import (
+    FULL, INCREMENTAL, ParallelGzipWriter, backup_database, backup_media,
+    backup_tables, clean_backups, dump_table, restore_media, verify_backup,
+    write_dump
+)
+from Core.models import Profile, Watermark
+from Core.tests.samples import sample_user
+
+
+class CommandConnector(BaseCommandDBConnector):
+    """Connector dumping the output of a command"""
+    command = 'echo dumped'
+
+    def _create_dump(self):
+        """Runs the command"""
+        return self.run_command(self.command)[0]
+
+
+class BackupsTest(TestCase):
+    """Test class for the parallel compressed database backups"""
+
+    def setUp(self):
+        """setup a temporary backup folder"""
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        storage_options = patch.dict(
+            dbbackup_settings.STORAGE_OPTIONS, {'location': self.folder}
+        )
+        storage_options.start()
+        self.addCleanup(storage_options.stop)
+
+    def test_parallel_gzip(self):
+        """Tests blocks are compressed in parallel and written in order"""
+        data = b''.join(f'{i:06d}\n'.encode() for i in range(20000))
+        output = BytesIO()
+        writer = ParallelGzipWriter(output, workers=3, block_size=1000)
+        for start in range(0, len(data), 777):
+            writer.write(data[start:start + 777])
+        writer.close()
+        self.assertEqual(gzip.decompress(output.getvalue()), data)
+        self.assertEqual(writer.bytes_in, len(data))
+        self.assertEqual(writer.bytes_out, len(output.getvalue()))
+        self.assertFalse(writer.pending)
+
+    def test_streaming_command(self):
+        """Tests dump commands are copied to the output as they run"""
+        output = BytesIO()
+        write_dump(CommandConnector(), output)
+        self.assertEqual(output.getvalue(), b'dumped\n')
+        with patch.object(CommandConnector, 'command', 'false'), \
+                self.assertRaises(CommandConnectorError):
+            write_dump(CommandConnector(), BytesIO())
+
+    def test_backup_database(self):
+        """Tests the database is dumped compressed to the storage"""
+        with self.assertLogs('Core.backups', 'INFO'):
+            metrics = backup_database(workers=2)
+        self.assertTrue(metrics['name'].endswith('.gz'))
+        self.assertGreater(metrics['bytes_in'], metrics['bytes_out'])
+        with open(os.path.join(self.folder, metrics['name']), 'rb') as file:
+            dump = gzip.decompress(file.read())
+        self.assertEqual(len(dump), metrics['bytes_in'])
+        self.assertIn(b'CREATE TABLE IF NOT EXISTS "Core_user"', dump)
+
+    def test_backup_failed(self):
+        """Tests incomplete backups are removed from the storage"""
+        with patch('Core.backups.write_dump', side_effect=OSError), \
+                self.assertRaises(OSError):
+            backup_database()
+        self.assertEqual(os.listdir(self.folder), [])
+
+
+class TableBackupsTest(TestCase):
+    """Test class for the incremental table backups"""
+
+    def setUp(self):
+        """setup a temporary backup folder and users"""
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        storage_options = patch.dict(
+            dbbackup_settings.STORAGE_OPTIONS, {'location': self.folder}
+        )
+        storage_options.start()
+        self.addCleanup(storage_options.stop)
+        self.user = sample_user()
+        sample_user('other@email.com')
+
+    def rows(self, entry):
+        """Returns the rows of a backup file"""
+        with open(os.path.join(self.folder, entry['file']), 'rb') as file:
+            return [json.loads(line) for line in gzip.decompress(
+                file.read()
+            ).splitlines()]
+
+    def test_incremental_backup(self):
+        """Tests incremental runs dump the changed rows of tables with a
+        watermark and the whole of the others"""
+        group = Group.objects.create(name='Editors')
+        with self.assertLogs('Core.backups', 'INFO'):
+            full = backup_tables()
+        self.assertEqual(full['mode'], FULL)
+        self.assertEqual(full['tables']['Core.User']['rows'], 2)
+        self.assertEqual(
+            len(self.rows(full['tables']['Core.Profile'])), 2
+        )
+        self.assertNotIn('Core.DailyCount', full['tables'])
+        self.assertNotIn('authtoken.TokenProxy', full['tables'])
+        self.assertEqual(verify_backup(), [])
+
+        hour_ago = timezone.now() - timedelta(hours=1)
+        get_user_model().objects.update(last_updated=hour_ago)
+        Profile.objects.update(last_updated=hour_ago)
+        Watermark.objects.filter(name__startswith='backup:').update(
+            value=hour_ago + timedelta(minutes=30)
+        )
+        self.user.first_name = 'Changed'
+        self.user.save()
+        Group.objects.filter(pk=group.pk).update(name='Reviewers')
+        with self.assertLogs('Core.backups', 'INFO'):
+            incremental = backup_tables(incremental=True)
+        self.assertEqual(incremental['mode'], INCREMENTAL)
+        self.assertEqual(incremental['base'], full['run'])
+        users = self.rows(incremental['tables']['Core.User'])
+        self.assertEqual([row['fields']['email'] for row in users],
+                         [self.user.email])
+        self.assertEqual(
+            [row['fields']['name'] for row in self.rows(
+                incremental['tables']['auth.Group']
+            )], ['Reviewers']
+        )
+        self.assertEqual(incremental['tables']['Core.Profile']['rows'], 1)
+        self.assertEqual(incremental['tables']['auth.Permission']['rows'],
+                         full['tables']['auth.Permission']['rows'])
+        self.assertNotIn('admin.LogEntry', incremental['tables'])
+        self.assertEqual(verify_backup(), [])
+
+        with open(os.path.join(
+            self.folder, incremental['tables']['auth.Group']['file']
+        ), 'ab') as file:
+            file.write(b'corrupted')
+        self.assertEqual(verify_backup(), ['auth.Group: Checksum mismatch'])
+
+    def test_backup_snapshot(self):
+        """Tests the tables of a run are dumped in one transaction"""
+        savepoints, depth = [], len(connection.savepoint_ids)
+
+        def dump(*args):
+            savepoints.append(connection.savepoint_ids[depth:])
+            return dump_table(*args)
+
+        with patch('Core.backups.dump_table', side_effect=dump), \
+                self.assertLogs('Core.backups', 'INFO'):
+            manifest = backup_tables()
+        self.assertEqual(len(savepoints), len(manifest['tables']))
+        self.assertEqual(len(set(map(tuple, savepoints))), 1)
+        self.assertEqual(len(savepoints[0]), 1)
+
+    def test_clean_backups(self):
+        """Tests old runs are deleted except the bases of kept runs"""
+        with self.assertLogs('Core.backups', 'INFO'):
+            first = backup_tables()['run']
+            second = backup_tables(incremental=True)['run']
+            self.assertEqual(clean_backups(keep=1, days=0), [])
+            third = backup_tables(incremental=False)['run']
+            self.assertEqual(clean_backups(keep=1, days=0), [first, second])
+        self.assertEqual(
+            os.listdir(os.path.join(self.folder, 'tables')), [third]
+        )
+
+
+class MediaBackupsTest(TestCase):
+    """Test class for the incremental media backups"""
+
+    def setUp(self):
+        """setup temporary backup and media folders with user files"""
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+        storage_options = patch.dict(
+            dbbackup_settings.STORAGE_OPTIONS, {'location': self.folder}
+        )
+        storage_options.start()
+        self.addCleanup(storage_options.stop)
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        media_root = override_settings(MEDIA_ROOT=self.media)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+        self.user = sample_user()
+        self.other = sample_user('other@email.com')
+        self.blob = 'blobs/3f/a2/3fa2.jpg'
+        Profile.objects.filter(user=self.user).update(image=self.blob)
+        self.write(self.blob, b'image')
+        self.write(f'Users/{self.user.pk}/cv.pdf', b'cv')
+        self.write(f'Users/{self.other.pk}/photo.jpg', b'photo')
+        self.write('blobs/tmp/upload', b'partial')
+
+    def write(self, name, content):
+        """Writes a media file"""
+        path = os.path.join(self.media, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+
+    def read(self, name):
+        """Returns the content of a media file"""
+        with open(os.path.join(self.media, name), 'rb') as file:
+            return file.read()
+
+    def test_incremental_backup(self):
+        """Tests incremental runs only archive files whose content changed"""
+        with self.assertLogs('Core.backups', 'INFO'):
+            full = backup_media(workers=2)
+        self.assertEqual(full['mode'], FULL)
+        self.assertEqual(full['archive']['files'], 3)
+        self.assertNotIn('blobs/tmp/upload', full['files'])
+
+        os.utime(os.path.join(self.media, self.blob))  # same content
+        self.write(f'Users/{self.other.pk}/photo.jpg', b'new photo')
+        with self.assertLogs('Core.backups', 'INFO'):
+            incremental = backup_media(workers=2)
+        self.assertEqual(incremental['mode'], INCREMENTAL)
+        self.assertEqual(incremental['base'], full['run'])
+        self.assertEqual(incremental['archive']['files'], 1)
+        self.assertEqual(
+            incremental['files'][self.blob][3], full['run']
+        )
+        with self.assertLogs('Core.backups', 'INFO'):
+            self.assertIsNone(backup_media()['archive'])
+
+    def test_restore_user(self):
+        """Tests the files of a user are restored from their archives"""
+        with self.assertLogs('Core.backups', 'INFO'):
+            full = backup_media(workers=2)
+            self.write(f'Users/{self.user.pk}/cv.pdf', b'new cv')
+            backup_media(workers=2)
+        os.remove(os.path.join(self.media, self.blob))
+        self.write(f'Users/{self.user.pk}/cv.pdf', b'lost')
+        self.write(f'Users/{self.other.pk}/photo.jpg', b'kept')
+        os.makedirs(os.path.join(  # interrupted run without manifest
+            self.folder, 'media', '99991231-000000-000000-full'
+        ))
+        with self.assertLogs('Core.backups', 'INFO'):
+            restored = restore_media([self.user.pk])
+        self.assertEqual(
+            sorted(restored), [f'Users/{self.user.pk}/cv.pdf', self.blob]
+        )
+        self.assertEqual(self.read(self.blob), b'image')
+        self.assertEqual(self.read(f'Users/{self.user.pk}/cv.pdf'), b'new cv')
+        self.assertEqual(
+            self.read(f'Users/{self.other.pk}/photo.jpg'), b'kept'
+        )
+        self.assertEqual(
+            os.stat(os.path.join(self.media, self.blob)).st_mtime_ns,
+            full['files'][self.blob][1]
+        )
+
+    def test_partial_backup(self):
+        """Tests runs of some tables are not the base of later runs"""
+        with self.assertLogs('Core.backups', 'INFO'):
+            full = backup_tables()
+            marks = dict(Watermark.objects.values_list('name', 'value'))
+            partial = backup_tables(incremental=False, labels=['Core.User'])
+            self.assertTrue(partial['partial'])
+            self.assertEqual(list(partial['tables']), ['Core.User'])
+            self.assertEqual(
+                dict(Watermark.objects.values_list('name', 'value')), marks
+            )
+            incremental = backup_tables(incremental=True)
+            self.assertEqual(incremental['base'], full['run'])
+            self.assertEqual(clean_backups(keep=2, days=0), [partial['run']])
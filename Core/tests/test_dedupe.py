@@ -0,0 +1,81 @@
+"""Core > tests > test_dedupe.py"""
+# PYTHON IMPORTS
+from datetime import date
+from unittest.mock import patch
+# DJANGO IMPORTS
+from django.test import SimpleTestCase
+# CORE IMPORTS
+from Core import dedupe
+
+
+def row(pk, first, last, **fields):
+    """Returns a profile values row"""
+    values = dict.fromkeys(dedupe.PROFILE_FIELDS)
+    values.update(pk=pk, user__first_name=first, user__last_name=last)
+    values.update(fields)
+    return values
+
+
+class DedupeTests(SimpleTestCase):
+    """Test class for the duplicate profile detection helpers"""
+
+    def test_soundex(self):
+        """Tests Soundex codes of spelling variants"""
+        self.assertEqual(dedupe.soundex('Robert'), 'R163')
+        self.assertEqual(dedupe.soundex('Rupert'), 'R163')
+        self.assertEqual(dedupe.soundex('Ashcraft'), 'A261')
+        self.assertEqual(dedupe.soundex('Rahman'), dedupe.soundex('Rehman'))
+        self.assertEqual(dedupe.soundex('Mohammad'),
+                         dedupe.soundex('Muhammed'))
+        self.assertEqual(dedupe.soundex(None), '')
+
+    def test_address_tokens(self):
+        """Tests address normalization into tokens"""
+        self.assertEqual(
+            dedupe.address_tokens('H# 12, Rd No. 5, Dhanmondi'),
+            dedupe.address_tokens('house 12 road 5 dhanmondi')
+        )
+        self.assertEqual(dedupe.address_tokens(None), set())
+
+    def test_identifier_keys(self):
+        """Tests national id and phone normalization"""
+        self.assertEqual(dedupe.nid_key('19901234567890123'),
+                         dedupe.nid_key('1234567890123'))
+        self.assertEqual(dedupe.phone_key('+8801712345678'),
+                         dedupe.phone_key('01712345678'))
+        self.assertEqual(dedupe.phone_key('123'), '')
+
+    def test_block_key(self):
+        """Tests block keys group phonetic name variants by region"""
+        a = row(1, 'Mohammad', 'Rahman', district_code=13)
+        b = row(2, 'Rehman', 'Muhammed', district_code=13)
+        self.assertEqual(dedupe.block_key(a), dedupe.block_key(b))
+        b['district_code'] = 14
+        self.assertNotEqual(dedupe.block_key(a), dedupe.block_key(b))
+        self.assertEqual(dedupe.block_key(row(3, None, '')), '')
+        b.update(district_code=None, district='Dhaka ' * 50)
+        self.assertLessEqual(len(dedupe.block_key(b)), 64)  # field length
+
+    def test_score(self):
+        """Tests pair scores on matching fields"""
+        a = row(1, 'Karim', 'Uddin', user__phone='01712345678',
+                birthday=date(1990, 1, 1), address='H 12, Rd 5, Mirpur')
+        b = row(2, 'karim', 'uddin', user__phone='8801712345678',
+                birthday=date(1990, 1, 1), address='House 12 Road 5 Mirpur')
+        value, matched = dedupe.score(a, b)
+        self.assertEqual(value, 1.0)
+        self.assertEqual(matched, ['phone', 'name', 'birthday', 'address'])
+
+        c = row(3, 'Karim', 'Uddin', birthday=date(1985, 5, 5))
+        value, matched = dedupe.score(a, c)
+        self.assertLess(value, dedupe.THRESHOLD)
+
+    def test_block_pairs(self):
+        """Tests oversized blocks are compared within a window"""
+        block = list(range(10))
+        self.assertEqual(len(list(dedupe.block_pairs(block))), 45)
+        with patch.object(dedupe, 'MAX_BLOCK_SIZE', 5), \
+                patch.object(dedupe, 'WINDOW_SIZE', 3):
+            pairs = list(dedupe.block_pairs(block))
+        self.assertEqual(len(pairs), 17)  # 8 * 2 + 1
+        self.assertTrue(all(b - a < 3 for a, b in pairs))
@@ -0,0 +1,32 @@
+"""Core > tests > test_exports.py"""
+# PYTHON IMPORTS
+import gzip
+# DJANGO IMPORTS
+from django.test import SimpleTestCase
+# CORE IMPORTS
+from Core.exports import buffered, csv_lines, gzipped, ndjson_lines
+
+
+class ExportsTests(SimpleTestCase):
+    """Test class for the streaming export encoders"""
+
+    def test_lines(self):
+        """Test CSV and NDJSON lines of rows"""
+        rows = [(1, 'a,b', None)]
+        self.assertEqual(
+            list(csv_lines(rows, ['id', 'name', 'x'])),
+            ['id,name,x\r\n', '1,"a,b",\r\n']
+        )
+        self.assertEqual(
+            list(ndjson_lines(rows, ['id', 'name', 'x'])),
+            ['{"id": 1, "name": "a,b", "x": null}\n']
+        )
+
+    def test_buffered(self):
+        """Test lines are joined into chunks of at least the buffer size"""
+        chunks = list(buffered(['ab', 'cd', 'e'], size=3))
+        self.assertEqual(chunks, [b'abcd', b'e'])
+        self.assertEqual(list(buffered([])), [])
+        self.assertEqual(
+            gzip.decompress(b''.join(gzipped(chunks))), b'abcde'
+        )
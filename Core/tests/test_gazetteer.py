@@ -0,0 +1,62 @@
+"""Core > tests > test_gazetteer.py"""
+# DJANGO IMPORTS
+from django.test import SimpleTestCase
+# CORE IMPORTS
+from Core.gazetteer import (
+    DISTRICT, DIVISION, THANA, get_gazetteer, normalize
+)
+
+
+class GazetteerTests(SimpleTestCase):
+    """Test class for the offline gazetteer"""
+
+    def setUp(self):
+        """setup"""
+        self.gazetteer = get_gazetteer()
+
+    def test_normalize(self):
+        """Tests normalization of place name spelling variants"""
+        self.assertEqual(normalize("Cox's Bazar"), normalize('coxs bazar'))
+        self.assertEqual(normalize('Dhaka Division'), 'dhaka')
+        self.assertEqual(normalize(None), '')
+
+    def test_hierarchy(self):
+        """Tests the bundled hierarchy is complete and consistent"""
+        self.assertEqual(len(self.gazetteer.places[DIVISION]), 8)
+        self.assertEqual(len(self.gazetteer.places[DISTRICT]), 64)
+        for thana in self.gazetteer.places[THANA].values():
+            district = self.gazetteer.parent(thana)
+            self.assertIsNotNone(district)
+            self.assertIsNotNone(self.gazetteer.parent(district))
+
+    def test_lookup_aliases(self):
+        """Tests lookups by official and alternative spellings"""
+        chittagong = self.gazetteer.lookup(DISTRICT, 'Chittagong')
+        self.assertIsNotNone(chittagong)
+        self.assertEqual(
+            self.gazetteer.lookup(DISTRICT, 'chattogram'), chittagong
+        )
+        self.assertIsNone(self.gazetteer.lookup(DISTRICT, 'Atlantis'))
+
+    def test_resolve(self):
+        """Tests resolving free text regions to gazetteer ids"""
+        gz = self.gazetteer
+        region = gz.resolve(thana='dhanmondi')  # parents are inferred
+        self.assertEqual(gz.get(THANA, region.thana).name, 'Dhanmondi')
+        self.assertEqual(gz.get(DISTRICT, region.district).name, 'Dhaka')
+        self.assertEqual(gz.get(DIVISION, region.division).name, 'Dhaka')
+
+        # ambiguous thana names need a district
+        self.assertIsNone(gz.resolve(thana='Kotwali').thana)
+        region = gz.resolve(district='Sylhet', thana='Kotwali')
+        self.assertEqual(gz.get(DISTRICT, region.district).name, 'Sylhet')
+        self.assertIsNotNone(region.thana)
+
+        # postal code fallback and sadar thana
+        region = gz.resolve(postal='1212', district='Dhaka')
+        self.assertIsNone(region.thana)  # Gulshan and Badda share 1212
+        region = gz.resolve(postal='4700')
+        self.assertEqual(gz.get(THANA, region.thana).name, "Cox's Bazar Sadar")
+        region = gz.resolve(district='Comilla', thana='Sadar')
+        self.assertEqual(gz.get(THANA, region.thana).name, 'Comilla Sadar')
+        self.assertIsNotNone(gz.locate(region))
@@ -0,0 +1,47 @@
+"""Core > tests > test_geo.py"""
+# DJANGO IMPORTS
+from django.test import SimpleTestCase
+# CORE IMPORTS
+from Core import geo
+
+
+class GeoTests(SimpleTestCase):
+    """Test class for the geohash grid and distance helpers"""
+
+    def test_encode(self):
+        """Tests geohash encoding of a known coordinate"""
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geo.encode(23.8103, 90.4125, 5), 'wh0r3')
+
+    def test_decode(self):
+        """Tests the geohash cell contains its encoded coordinate"""
+        south, west, north, east = geo.decode_bbox(geo.encode(23.81, 90.41))
+        self.assertTrue(south <= 23.81 <= north)
+        self.assertTrue(west <= 90.41 <= east)
+        lat, lng = geo.decode('wh0r3')
+        self.assertAlmostEqual(lat, 23.8, places=1)
+        self.assertAlmostEqual(lng, 90.4, places=1)
+
+    def test_covering_cells(self):
+        """Tests covering cells include every point inside the bbox"""
+        bbox = (23.70, 90.35, 23.90, 90.50)
+        precision, cells = geo.covering_cells(*bbox, max_cells=16)
+        self.assertLessEqual(len(cells), 16)
+        for lat in (23.70, 23.80, 23.90):
+            for lng in (90.35, 90.42, 90.50):
+                self.assertIn(geo.encode(lat, lng, precision), cells)
+
+    def test_haversine(self):
+        """Tests great-circle distance between Dhaka and Chittagong"""
+        distance = geo.haversine_km(23.8103, 90.4125, 22.3569, 91.7832)
+        self.assertAlmostEqual(distance, 213, delta=3)
+        self.assertEqual(geo.haversine_km(23.8, 90.4, 23.8, 90.4), 0)
+
+    def test_radius_bbox(self):
+        """Tests the radius bbox encloses the circle"""
+        south, west, north, east = geo.radius_bbox(23.8, 90.4, 10)
+        self.assertAlmostEqual(geo.haversine_km(south, 90.4, 23.8, 90.4), 10)
+        self.assertAlmostEqual(geo.haversine_km(23.8, west, 23.8, 90.4),
+                               10, delta=0.1)
+        self.assertGreater(north, 23.8)
+        self.assertGreater(east, 90.4)
@@ -0,0 +1,56 @@
+"""Core > tests > test_images.py"""
+# PYTHON IMPORTS
+from io import BytesIO
+# DJANGO IMPORTS
+from django.test import SimpleTestCase
+# PLUGIN IMPORTS
+from PIL import Image
+# CORE IMPORTS
+from Core.images import ORIENTATION, cover_size, fit_image, open_image
+
+
+def jpeg_bytes(size, orientation=None):
+    """Returns the bytes of a JPEG with optional EXIF orientation"""
+    image = Image.new('RGB', size, (200, 10, 10))
+    image.paste((10, 10, 200), (0, 0, size[0] // 2, size[1]))  # blue left
+    exif = Image.Exif()
+    exif[0x010f] = 'Camera'  # make
+    if orientation:
+        exif[ORIENTATION] = orientation
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+class ImagesTests(SimpleTestCase):
+    """Test class for draft mode image decoding"""
+
+    def test_draft_decoding(self):
+        """Test that large JPEGs are decoded at a reduced scale"""
+        image = open_image(BytesIO(jpeg_bytes((2000, 1600))), (200, 200))
+        self.assertEqual(image.size, (250, 200))  # 1/8 scale covers 200x200
+
+        image = open_image(BytesIO(jpeg_bytes((2000, 1600))))
+        self.assertEqual(image.size, (2000, 1600))
+
+    def test_orientation(self):
+        """Test that EXIF orientation is applied to the draft"""
+        data = jpeg_bytes((1600, 800), orientation=6)  # rotate 90 clockwise
+        image = open_image(BytesIO(data), (100, 200))
+        self.assertEqual(image.size, (100, 200))  # upright at 1/8 scale
+        self.assertGreater(image.getpixel((50, 10))[2], 150)  # left on top
+
+    def test_metadata_stripped(self):
+        """Test that EXIF metadata is not kept in decoded images"""
+        image = open_image(BytesIO(jpeg_bytes((400, 400), 6)), (100, 100))
+        self.assertNotIn('exif', image.info)
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG')
+        self.assertEqual(dict(Image.open(buffer).getexif()), {})
+
+    def test_fit_image(self):
+        """Test cropping and resizing to a size in one pass"""
+        image = Image.new('RGB', (300, 100))
+        self.assertEqual(fit_image(image, (64, 64)).size, (64, 64))
+        self.assertEqual(fit_image(image, (40, 80)).size, (40, 80))
+        self.assertEqual(cover_size([(64, 64), (400, 100)]), (400, 100))
@@ -0,0 +1,61 @@
+"""Core > tests > test_paginators.py"""
+# PYTHON IMPORTS
+from unittest.mock import patch
+# DJANGO IMPORTS
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+# CORE IMPORTS
+from Core.paginators import EstimatedCountPaginator, estimated_count
+from Core.tests.samples import sample_superuser, sample_user
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    """Test class for the estimated count paginator"""
+
+    def setUp(self):
+        """setup"""
+        for i in range(3):
+            sample_user(f'user{i}@email.com')
+        self.users = get_user_model().objects.order_by('pk')
+
+    def test_no_estimate(self):
+        """Tests databases without estimates are counted exactly"""
+        self.assertIsNone(estimated_count(self.users))  # SQLite
+        self.assertEqual(EstimatedCountPaginator(self.users, 2).count, 3)
+
+    @override_settings(ADMIN_COUNT_ESTIMATE_THRESHOLD=100)
+    def test_estimate_threshold(self):
+        """Tests estimates are used only above the threshold"""
+        with patch('Core.paginators.estimated_count', return_value=5000):
+            paginator = EstimatedCountPaginator(self.users, 2)
+            self.assertEqual(paginator.count, 5000)
+            self.assertEqual(paginator.num_pages, 2500)
+            self.assertTrue(paginator.estimated)
+        with patch('Core.paginators.estimated_count', return_value=50):
+            paginator = EstimatedCountPaginator(self.users, 2)
+            self.assertEqual(paginator.count, 3)
+            self.assertFalse(paginator.estimated)
+
+    @override_settings(ADMIN_COUNT_ESTIMATE_THRESHOLD=100)
+    def test_filtered_exact(self):
+        """Tests filtered querysets are counted exactly"""
+        with patch('Core.paginators.estimated_count',
+                   return_value=5000) as estimate:
+            paginator = EstimatedCountPaginator(
+                self.users.filter(email__startswith='user'), 2
+            )
+            self.assertEqual(paginator.count, 3)
+        estimate.assert_not_called()
+
+    @override_settings(ADMIN_COUNT_ESTIMATE_THRESHOLD=100)
+    def test_changelist_approximate(self):
+        """Tests the admin shows estimated counts as approximate"""
+        sample_superuser()
+        self.client.login(email='super@email.com', password='superpass')
+        url = f'/{settings.ADMIN_URL}/Core/user/'
+        with patch('Core.paginators.estimated_count', return_value=5000):
+            self.assertContains(self.client.get(url), 'About 5000 users')
+            self.assertContains(
+                self.client.get(f'{url}?q=user'), '3 users'
+            )
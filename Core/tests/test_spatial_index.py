@@ -0,0 +1,120 @@
+"""Core > tests > test_spatial_index.py"""
+# PYTHON IMPORTS
+import random
+# DJANGO IMPORTS
+from django.test import SimpleTestCase
+# CORE IMPORTS
+from Core.geo import haversine_km
+from Core.spatial_index import SpatialIndex, min_distance_km
+
+
+class SpatialIndexTests(SimpleTestCase):
+    """Test class for the packed R-tree spatial index"""
+
+    def setUp(self):
+        """setup random points around Bangladesh"""
+        rng = random.Random(7)
+        self.points = [
+            (i, rng.uniform(20.5, 26.7), rng.uniform(88.0, 92.7))
+            for i in range(1, 2001)
+        ]
+        self.index = SpatialIndex(self.points)
+
+    def brute_nearest(self, lat, lng, k, points=None):
+        """Returns the ids of the k nearest points by linear scan"""
+        return [point[0] for point in sorted(
+            points or self.points,
+            key=lambda p: haversine_km(lat, lng, p[1], p[2])
+        )[:k]]
+
+    def test_nearest(self):
+        """Tests k-nearest matches a linear scan"""
+        for lat, lng in ((23.81, 90.41), (22.35, 91.78), (30.0, 80.0)):
+            results = self.index.nearest(lat, lng, 10)
+            self.assertEqual([r[1] for r in results],
+                             self.brute_nearest(lat, lng, 10))
+            distances = [r[0] for r in results]
+            self.assertEqual(distances, sorted(distances))
+
+    def test_bbox(self):
+        """Tests bounding box search matches a linear scan"""
+        south, west, north, east = 23.0, 89.5, 24.0, 90.5
+        expected = sorted(
+            p[0] for p in self.points
+            if south <= p[1] <= north and west <= p[2] <= east
+        )
+        results = self.index.bbox(south, west, north, east)
+        self.assertEqual(sorted(r[0] for r in results), expected)
+
+    def test_update(self):
+        """Tests moved and removed points are reflected before a repack"""
+        self.index.update(1, 23.81, 90.41)
+        self.index.update(2)
+        self.assertEqual(self.index.nearest(23.81, 90.41, 1)[0][1], 1)
+        everything = self.index.bbox(-90, -180, 90, 180)
+        self.assertNotIn(2, [r[0] for r in everything])
+        self.assertEqual(len(self.index), 1999)
+
+        self.index.repack()
+        self.assertEqual(self.index.overlay, {})
+        self.assertEqual(len(self.index.tree), 1999)
+        self.assertEqual(self.index.nearest(23.81, 90.41, 1)[0][1], 1)
+
+    def test_check(self):
+        """Tests the consistency check reports missing, stale and extra"""
+        self.assertFalse(any(self.index.check(self.points).values()))
+        self.index.update(1, 0.0, 0.0)
+        self.index.update(2)
+        self.index.update(9999, 23.8, 90.4)
+        report = self.index.check(self.points)
+        self.assertEqual(
+            report, {'missing': [2], 'stale': [1], 'extra': [9999]}
+        )
+
+    def test_check_boxes(self):
+        """Tests the leaf box check reports points the searches miss or
+        return against another source"""
+        points = list(self.points)
+
+        def box_points(boxes):
+            """Returns the points in any of the boxes by linear scan"""
+            return [
+                (point_id, lat, lng) for point_id, lat, lng in points
+                if any(s <= lat <= n and w <= lng <= e for s, w, n, e in boxes)
+            ]
+
+        self.assertFalse(any(self.index.check_boxes(box_points).values()))
+        self.index.update(9999, 23.8, 90.4)
+        points[0] = (1, 0.0, 0.0)  # moved without updating the index
+        report = self.index.check_boxes(box_points, batch_size=3)
+        self.assertEqual(
+            report, {'missing': [], 'stale': [], 'extra': [1, 9999]}
+        )
+        lat, lng = self.points[0][1:]
+        points[0] = (1, lat, lng + 1e-9)  # moved within its leaf box
+        report = self.index.check_boxes(box_points)
+        self.assertEqual(report['stale'], [1])
+
+    def test_min_distance(self):
+        """Tests the box distance is a lower bound of its points distance"""
+        box = (23.0, 89.0, 24.0, 90.0)
+        self.assertEqual(min_distance_km(23.5, 89.5, *box), 0)
+        for lat, lng in ((60.0, 89.5), (26.0, 95.0), (-10.0, 70.0)):
+            bound = min_distance_km(lat, lng, *box)
+            for p_lat in (23.0, 23.5, 24.0):
+                for p_lng in (89.0, 89.5, 90.0):
+                    self.assertLessEqual(
+                        bound, haversine_km(lat, lng, p_lat, p_lng) + 1e-9
+                    )
+
+    def test_empty(self):
+        """Tests an empty index"""
+        index = SpatialIndex()
+        self.assertEqual(index.nearest(23.8, 90.4), [])
+        self.assertEqual(index.bbox(-90, -180, 90, 180), [])
+        index.update(1, 23.8, 90.4)
+        self.assertEqual(index.nearest(23.8, 90.4)[0][1], 1)
+
+    def test_memory_usage(self):
+        """Tests memory usage covers the packed arrays"""
+        self.assertGreaterEqual(self.index.memory_usage(), 2000 * (8 + 8 + 8))
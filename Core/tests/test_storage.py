@@ -0,0 +1,150 @@
+"""Core > tests > test_storage.py"""
+# PYTHON IMPORTS
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+# DJANGO IMPORTS
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+# CORE IMPORTS
+from Core.models import Blob, ImportJob, Profile
+from Core.storage import (
+    ContentAddressedStorage, blob_name, collect_garbage, recount_references
+)
+from Core.tests.samples import sample_user
+
+
+CAS = 'Core.storage.ContentAddressedStorage'
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Test class for the content addressed profile image storage"""
+
+    def setUp(self):
+        """setup a temporary media folder"""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=media.name, PROFILE_IMAGE_STORAGE=CAS
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = ContentAddressedStorage()
+
+    def age(self, name):
+        """Makes a blob and its file older than the garbage grace period"""
+        old = timezone.now() - timedelta(days=2)
+        Blob.objects.filter(name=name).update(last_updated=old)
+        os.utime(self.storage.path(name), (old.timestamp(), ) * 2)
+
+    def test_deduplicated_save(self):
+        """Test identical files are stored once and referenced twice"""
+        first = self.storage.save('Users/1/a.JPG', ContentFile(b'same'))
+        second = self.storage.save('Users/2/b.jpg', ContentFile(b'same'))
+        other = self.storage.save('Users/2/c.jpg', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(first.startswith('blobs/') and first.endswith('.jpg'))
+        self.assertEqual(Blob.objects.get(name=first).refs, 0)
+        self.storage.add_reference(first)
+        self.storage.add_reference(second)
+        self.assertEqual(Blob.objects.get(name=first).refs, 2)
+        with self.storage.open(first) as file:
+            self.assertEqual(file.read(), b'same')
+
+        self.storage.delete(first)
+        self.assertEqual(Blob.objects.get(name=first).refs, 1)
+        self.assertTrue(self.storage.exists(first))  # removed by gc only
+
+    def test_profile_images_shared(self):
+        """Test profiles uploading the same image share its blob"""
+        field = Profile._meta.get_field('image')
+        with patch.object(field, 'storage', self.storage):
+            profiles = [sample_user().profile, sample_user(
+                email='other@sample.com'
+            ).profile]
+            for profile in profiles:
+                profile.image.save('avatar.png', ContentFile(b'png'))
+            profiles[0].image.save('again.png', ContentFile(b'png'))
+            self.assertEqual(profiles[0].image.name, profiles[1].image.name)
+            self.assertEqual(Blob.objects.get().refs, 2)  # not counted again
+
+            Blob.objects.update(refs=5)  # deletes of rolled back saves
+            self.assertEqual(recount_references(), 1)
+            self.assertEqual(Blob.objects.get().refs, 2)
+
+    def test_file_fields_referenced(self):
+        """Test every file field stored in the storage references the blobs
+        it is set to, by upload or by name"""
+        field = ImportJob._meta.get_field('file')
+        with patch.object(field, 'storage', self.storage):
+            job = ImportJob(file_format='csv')
+            job.file.save('a.csv', ContentFile(b'csv'))
+            self.assertEqual(Blob.objects.get().refs, 1)
+            copy = ImportJob.objects.create(
+                file_format='csv', file=job.file.name
+            )
+            job.save()
+            job.save(update_fields=['status'])
+            self.assertEqual(Blob.objects.get().refs, 2)
+            copy.file.delete()
+            self.assertEqual(Blob.objects.get().refs, 1)
+            self.assertEqual(recount_references(), 0)
+
+    def test_collect_garbage(self):
+        """Test unreferenced blobs and stray files are removed"""
+        kept = self.storage.save('a.png', ContentFile(b'kept'))
+        self.storage.add_reference(kept)
+        removed = self.storage.save('b.png', ContentFile(b'removed'))
+        derived = f"{os.path.dirname(removed)}/renditions/" \
+            f"{os.path.basename(removed)[:-4]}_thumb.webp"
+        self.assertEqual(self.storage.save(derived, ContentFile(b'x')),
+                         derived)
+        stray = blob_name('0' * 64, 'stray.png')  # save rolled back
+        os.makedirs(os.path.dirname(self.storage.path(stray)))
+        with open(self.storage.path(stray), 'wb') as file:
+            file.write(b'stray')
+        self.storage.delete(removed)
+        self.storage.delete(derived)  # removed with its blob
+        self.assertTrue(self.storage.exists(derived))
+
+        self.assertEqual(collect_garbage(self.storage), (0, 0, 0))  # recent
+        for name in (kept, removed, stray):
+            self.age(name)
+        self.assertEqual(
+            collect_garbage(self.storage, dry_run=True), (1, 1, 12)
+        )
+        self.assertEqual(collect_garbage(self.storage), (1, 1, 13))
+        self.assertEqual(list(Blob.objects.values_list('name', flat=True)),
+                         [kept])
+        self.assertTrue(self.storage.exists(kept))
+        for name in (removed, derived, stray):
+            self.assertFalse(self.storage.exists(name))
+
+    def test_collect_garbage_saved_again(self):
+        """Test unreferenced blobs saved again within the grace period are
+        kept until they are referenced"""
+        name = self.storage.save('a.png', ContentFile(b'blob'))
+        self.age(name)
+        self.assertEqual(self.storage.save('b.png', ContentFile(b'blob')),
+                         name)
+        self.assertEqual(collect_garbage(self.storage), (0, 0, 0))
+        self.assertTrue(self.storage.exists(name))
+
+    def test_gc_blobs_command(self):
+        """Test the garbage collection management command"""
+        name = self.storage.save('a.png', ContentFile(b'blob'))
+        out = StringIO()
+        call_command('gc_blobs', '--recount', '--grace', '0', stdout=out)
+        self.assertIn('Removed 1 blobs', out.getvalue())
+        self.assertFalse(self.storage.exists(name))
+
+        with override_settings(PROFILE_IMAGE_STORAGE=(
+            'django.core.files.storage.FileSystemStorage'
+        )), self.assertRaises(CommandError):
+            call_command('gc_blobs', stdout=StringIO())
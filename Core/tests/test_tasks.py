@@ -1,13 +1,43 @@
 """Core > tests > test_tasks.py"""
 # PYTHON IMPORTS
+import csv
+import io
 import logging
 import os
 import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest.mock import patch
+# PLUGIN IMPORTS
+from celery.exceptions import Retry
+from dbbackup import settings as dbbackup_settings
+from openpyxl import Workbook, load_workbook
+from PIL import Image
 # DJANGO IMPORTS
 from django.conf import settings
-from django.test import TestCase
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+# DRF IMPORTS
+from rest_framework.authtoken.models import Token
 # CORE IMPORTS
-from Core.tasks import dbbackup
+from Core.archive import archived_entries
+from Core.geocoding import get_geocoder
+from Core.renditions import available_formats
+from Core.models import (
+    DuplicateCandidate, ExportJob, ImportJob, LogArchive, Profile
+)
+from Core.tasks import (
+    archive_log_entries, clean_job_files, dbbackup, delete_media_files,
+    export_users, find_duplicates, generate_profile_renditions,
+    geocode_profiles, import_users, mediabackup, mediarestore
+)
+from Core.tests.samples import sample_user
 from Core.tests.utils import suppress_warnings
 
 
@@ -35,6 +65,36 @@ class TasksTest(TestCase):
         # ))
         self.assertTrue(dbbackup.run(filename=self.tmp_file))
 
+    def test_parallel_dbbackup(self):
+        """Tests database backup compressed in parallel with celery"""
+        with tempfile.TemporaryDirectory() as folder:
+            result = dbbackup.run(
+                parallel=1, workers=2, path=os.path.join(folder, 'db.psql.gz')
+            )
+            self.assertIn('successful', result)
+            self.assertIn('2 workers', result)
+
+    def test_mediabackup(self):
+        """Tests media backup and restore by user with celery"""
+        user = sample_user()
+        storage_options = dbbackup_settings.STORAGE_OPTIONS
+        with tempfile.TemporaryDirectory() as folder, \
+                tempfile.TemporaryDirectory() as media, \
+                override_settings(MEDIA_ROOT=media), \
+                patch.dict(storage_options, {'location': folder}):
+            os.makedirs(os.path.join(media, f'Users/{user.pk}'))
+            with open(os.path.join(media, f'Users/{user.pk}/a.jpg'), 'wb') \
+                    as file:
+                file.write(b'image')
+            result = mediabackup.run(incremental=0, workers=2)
+            self.assertIn('1 of 1 files archived', result)
+            os.remove(os.path.join(media, f'Users/{user.pk}/a.jpg'))
+            result = mediarestore.run(users=[user.pk])
+            self.assertIn('Restored 1 media files', result)
+            self.assertTrue(
+                os.path.exists(os.path.join(media, f'Users/{user.pk}/a.jpg'))
+            )
+
     def tearDown(self):
         """clean up the temporary folder"""
         # if os.path.exists(self.tmp_dir):
@@ -50,3 +110,445 @@ class TasksTest(TestCase):
             shutil.rmtree(fol)
 
         logging.disable(logging.NOTSET)  # reset logging level
+
+
+class GeocodeTasksTest(TestCase):
+    """Test class for the profile geocoding celery task"""
+
+    def setUp(self):
+        """setup"""
+        self.user = sample_user()
+        self.user.profile.district = 'Sylhet'
+        self.user.profile.save()
+        self.manual = sample_user('manual@email.com')
+        self.manual.profile.district = 'Sylhet'
+        self.manual.profile.set_location(24.0, 90.0)
+        self.manual.profile.save()
+        sample_user('nowhere@email.com')
+
+    def test_geocode_profiles(self):
+        """Tests geocoding profiles in batches and incrementally"""
+        self.assertTrue(geocode_profiles.run(batch_size=2))
+
+        profile = Profile.objects.get(user=self.user)
+        self.assertAlmostEqual(profile.latitude, 24.90)
+        self.assertAlmostEqual(profile.longitude, 91.87)
+        self.assertIsNotNone(profile.geo_cell)
+        self.assertIsNotNone(profile.geocoded_at)
+        manual = Profile.objects.get(user=self.manual)
+        self.assertEqual((manual.latitude, manual.longitude), (24.0, 90.0))
+        self.assertIsNone(manual.geocoded_at)
+
+        # nothing changed since
+        self.assertFalse(Profile.objects.needs_geocoding().exists())
+
+        profile.thana = 'Dhanmondi'
+        profile.district = None
+        profile.save()
+        self.assertEqual(Profile.objects.needs_geocoding().count(), 1)
+        geocode_profiles.run()
+        profile.refresh_from_db()
+        self.assertAlmostEqual(profile.latitude, 23.746)
+        self.assertFalse(Profile.objects.needs_geocoding().exists())
+
+    def test_geocode_keeps_manual_changes(self):
+        """Tests manual coordinates and concurrent edits are not replaced"""
+        geocode_profiles.run()
+        profile = Profile.objects.get(user=self.user)
+        profile.set_location(25.0, 92.0)
+        profile.save()
+        self.assertIsNone(profile.geocoded_at)  # located manually
+        geocode_profiles.run(full=1)
+        profile.refresh_from_db()
+        self.assertEqual((profile.latitude, profile.longitude), (25.0, 92.0))
+
+        other = Profile.objects.get(user__email='nowhere@email.com')
+        other.district = 'Sylhet'
+        other.save()
+        geocoder = get_geocoder()
+        locate = geocoder.geocode
+
+        def geocode(profile):
+            """geocodes while the profile is edited"""
+            Profile.objects.filter(pk=profile.pk).update(
+                last_updated=timezone.now()
+            )
+            return locate(profile)
+
+        with patch.object(geocoder, 'geocode', side_effect=geocode), \
+                patch('Core.tasks.get_geocoder', return_value=geocoder):
+            geocode_profiles.run()
+        other.refresh_from_db()
+        self.assertIsNone(other.latitude)  # left for the next run
+        self.assertTrue(Profile.objects.needs_geocoding().filter(
+            pk=other.pk
+        ).exists())
+
+    def test_geocode_region_codes(self):
+        """Tests region code changes mark the profile updated"""
+        geocode_profiles.run()
+        profile = Profile.objects.get(user=self.user)
+        Profile.objects.filter(pk=profile.pk).update(district_code=None)
+        geocode_profiles.run(full=1)
+        updated = Profile.objects.get(pk=profile.pk)
+        self.assertIsNotNone(updated.district_code)
+        self.assertGreater(updated.last_updated, profile.last_updated)
+
+
+class DedupeTasksTest(TestCase):
+    """Test class for the duplicate profile detection celery task"""
+
+    def setUp(self):
+        """setup two spellings of the same person and a namesake"""
+        people = [
+            ('one@email.com', 'Mohammad', 'Rahman', '01712345678'),
+            ('two@email.com', 'Muhammed', 'Rehman', '+8801712345678'),
+            ('three@email.com', 'Mohammad', 'Rahman', '01812345678'),
+        ]
+        for email, first, last, phone in people:
+            user = sample_user(email, first_name=first, last_name=last)
+            user.phone = phone[-11:]
+            user.save()
+            user.profile.district = 'Dhaka'
+            user.profile.address = 'House 12, Road 5, Mirpur'
+            user.profile.save()
+
+    def test_find_duplicates(self):
+        """Tests candidate pairs are stored once and keep their status"""
+        self.assertTrue(find_duplicates.run(batch_size=1))
+        candidate = DuplicateCandidate.objects.get()
+        emails = {candidate.profile_a.user.email,
+                  candidate.profile_b.user.email}
+        self.assertEqual(emails, {'one@email.com', 'two@email.com'})
+        self.assertIn('phone', candidate.matched)
+        self.assertLess(candidate.profile_a_id, candidate.profile_b_id)
+
+        candidate.status = DuplicateCandidate.DISMISSED
+        candidate.score = 0
+        candidate.save()
+        self.assertIn('0 new', find_duplicates.run())
+        candidate.refresh_from_db()
+        self.assertEqual(candidate.status, DuplicateCandidate.DISMISSED)
+        self.assertGreater(candidate.score, 0)  # refreshed
+
+    def test_find_duplicates_removed(self):
+        """Tests new pairs which no longer match are removed"""
+        self.assertIn('1 new', find_duplicates.run())
+        user = get_user_model().objects.get(email='two@email.com')
+        user.phone = '01911111111'
+        user.save()
+        self.assertIn('removed 1', find_duplicates.run())
+        self.assertFalse(DuplicateCandidate.objects.exists())
+
+
+def image_content(size=(300, 200), fmt='PNG'):
+    """Returns an image file content"""
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 100, 50)).save(buffer, fmt)
+    return ContentFile(buffer.getvalue())
+
+
+class RenditionTasksTest(TestCase):
+    """Test class for the profile image renditions celery task"""
+
+    def setUp(self):
+        """setup a temporary media folder"""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.profile = sample_user().profile
+
+    def save_image(self, name):
+        """Saves a profile image, queuing its renditions on commit and
+        running the deletion of the replaced image"""
+        with patch('Core.tasks.generate_profile_renditions.delay') as delay, \
+                patch('Core.tasks.delete_media_files.delay',
+                      side_effect=delete_media_files), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.profile.image.save(name, image_content())
+        delay.assert_called_once()  # with ids of rolled back tests
+        self.assertIn(self.profile.pk, delay.call_args[0][0])
+
+    def test_generate_renditions(self):
+        """Tests renditions are generated, replaced and removed"""
+        self.save_image('first.png')
+        generate_profile_renditions.run([self.profile.pk])
+        self.profile.refresh_from_db()
+        renditions = self.profile.image_renditions
+        self.assertEqual(renditions['source'], self.profile.image.name)
+        storage = self.profile.image.storage
+        for size_name, size in settings.IMAGE_RENDITIONS.items():
+            self.assertEqual(
+                list(renditions[size_name]), available_formats()
+            )
+            for name in renditions[size_name].values():
+                with storage.open(name) as file:
+                    self.assertEqual(Image.open(file).size, size)
+        self.assertIn('1 up to date', generate_profile_renditions.run(
+            [self.profile.pk]
+        ))
+
+        first = self.profile.image.name
+        self.save_image('second.png')
+        self.assertFalse(storage.exists(first))
+        generate_profile_renditions.run([self.profile.pk])
+        self.profile.refresh_from_db()
+        self.assertIn('second', self.profile.image_renditions['thumb']['jpeg'])
+        self.assertFalse(storage.exists(renditions['thumb']['jpeg']))
+
+        renditions, image = self.profile.image_renditions, self.profile.image
+        with patch('Core.tasks.delete_media_files.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.profile.user.delete()
+        names = delay.call_args[0][0]
+        self.assertEqual(names[0], image.name)
+        self.assertIn(renditions['thumb']['jpeg'], names)
+        self.assertTrue(storage.exists(image.name))  # deleted by the task
+        delete_media_files.run(names)
+        self.assertFalse(storage.exists(image.name))
+        self.assertFalse(storage.exists(renditions['thumb']['jpeg']))
+
+    def test_renditions_without_webp(self):
+        """Tests formats Pillow cannot write are skipped"""
+        self.save_image('first.png')
+        with patch('Core.renditions.features.check',
+                   side_effect=lambda feature: feature != 'webp'):
+            generate_profile_renditions.run([self.profile.pk])
+        self.profile.refresh_from_db()
+        self.assertEqual(
+            list(self.profile.image_renditions['thumb']), ['jpeg']
+        )
+
+    def test_renditions_batched(self):
+        """Tests renditions are queued once per transaction, only for the
+        profiles whose image changed"""
+        other = sample_user('other@email.com').profile
+        with patch('Core.tasks.generate_profile_renditions.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.profile.image.save('first.png', image_content())
+                other.image.save('other.png', image_content())
+                self.profile.save()
+        delay.assert_called_once()
+        self.assertLessEqual(
+            {self.profile.pk, other.pk}, set(delay.call_args[0][0])
+        )
+
+        with patch('Core.tasks.generate_profile_renditions.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.profile.save()
+            deferred = Profile.objects.defer('image').get(pk=other.pk)
+            self.assertEqual(deferred.image.name, other.image.name)
+            deferred.save()
+        delay.assert_not_called()
+
+    def test_delete_media_files_retry(self):
+        """Tests files failing to delete are retried"""
+        storage = Profile._meta.get_field('image').storage
+        name = storage.save('Users/1/kept.png', image_content())
+        with patch.object(storage, 'delete', side_effect=[None, OSError]), \
+                patch.object(delete_media_files, 'retry',
+                             side_effect=Retry) as retry, \
+                self.assertLogs('Core.tasks', 'WARNING'), \
+                self.assertRaises(Retry):
+            delete_media_files.run(['Users/1/gone.png', name])
+        self.assertEqual(retry.call_args[1]['args'], ([name], ))
+
+
+class ExportTasksTest(TestCase):
+    """Test class for the admin export celery task"""
+
+    def setUp(self):
+        """setup a temporary job file folder and users"""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(PRIVATE_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for i in range(3):
+            sample_user(f'user{i}@email.com', first_name=f'User{i}\x07')
+
+    def export(self, file_format, pks=None, query=None):
+        """Runs an export job of users, returns the finished job"""
+        job = ExportJob.objects.create(
+            file_format=file_format, pks=pks, query=query
+        )
+        with patch('Core.tasks.CHUNK_SIZE', 2):
+            self.assertIn('Exported', export_users.run(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.DONE)
+        return job
+
+    def test_export_csv(self):
+        """Tests users are exported as CSV in chunks"""
+        users = get_user_model().objects.exclude(email='user1@email.com')
+        job = self.export(  # deleted users are skipped
+            'csv', list(users.values_list('pk', flat=True)) + [0]
+        )
+        self.assertEqual((job.processed, job.total, job.progress), (2, 2, 100))
+        with job.file.open('rb') as file:
+            rows = list(csv.DictReader(io.TextIOWrapper(file, 'utf-8')))
+        self.assertEqual([row['email'] for row in rows],
+                         ['user0@email.com', 'user2@email.com'])
+
+    def test_export_query(self):
+        """Tests changelist exports are filtered and searched in the task"""
+        get_user_model().objects.filter(email='user1@email.com').update(
+            is_active=False
+        )
+        sample_user('other@sample.com')
+        job = self.export(
+            'csv', query={'q': ['email.com'], 'is_active__exact': ['1']}
+        )
+        with job.file.open('rb') as file:
+            rows = list(csv.DictReader(io.TextIOWrapper(file, 'utf-8')))
+        self.assertEqual([row['email'] for row in rows],
+                         ['user0@email.com', 'user2@email.com'])
+
+    def test_export_xlsx(self):
+        """Tests users are exported as XLSX without illegal characters"""
+        job = self.export('xlsx')
+        with job.file.open('rb') as file:
+            sheet = load_workbook(file, read_only=True).active
+            rows = list(sheet.values)
+        self.assertEqual(len(rows), 4)
+        self.assertIn('email', rows[0])
+        self.assertIn('User2', rows[3])
+
+    def test_export_failed(self):
+        """Tests failed exports are recorded in the job"""
+        job = ExportJob.objects.create(file_format='invalid')
+        with self.assertLogs('Core.tasks', 'ERROR'):
+            self.assertIn('failed', export_users.run(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.FAILED)
+        self.assertTrue(job.error)
+
+    def test_clean_job_files(self):
+        """Tests job files are deleted after the retention period"""
+        old, new = self.export('csv'), self.export('csv')
+        path = old.file.path
+        ExportJob.objects.filter(pk=old.pk).update(
+            created_at=timezone.now() - timedelta(days=8)
+        )
+        self.assertIn('Deleted 1 job files', clean_job_files.run(days=7))
+        old.refresh_from_db()
+        self.assertFalse(old.file)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(new.file.path))
+
+
+class ImportTasksTest(TestCase):
+    """Test class for the admin import celery task"""
+
+    def setUp(self):
+        """setup a temporary job file folder and an existing user"""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(PRIVATE_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = sample_user('old@email.com', first_name='Old')
+        self.rows = [
+            ['email', 'first_name', 'phone', 'is_active', 'password'],
+            ['new1@email.com', 'New1', '01712345678', '1', ''],
+            ['old@EMAIL.com', 'Renamed', '', 'true', self.user.password],
+            ['new2@email.com', 'New2', '12', '1', ''],  # invalid phone
+            ['', 'Nobody', '', '1', ''],
+            ['new1@email.com', 'Again', '', '1', ''],
+            ['new3@email.com', 'New3', '', '0', 'plain'],
+            ['new4@email.com', 'New4', '', '0', ''],
+        ]
+
+    def run_import(self, file_format, content):
+        """Runs an import job of a file, returns the finished job"""
+        job = ImportJob(file_format=file_format)
+        job.file.save(f'users.{file_format}', ContentFile(content))
+        with patch('Core.imports.CHUNK_SIZE', 3):
+            self.assertIn('Imported', import_users.run(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.DONE)
+        return job
+
+    def assert_imported(self, job):
+        """Tests the import of self.rows"""
+        self.assertEqual((job.created, job.updated, job.failed), (2, 1, 4))
+        self.assertEqual((job.processed, job.total, job.progress), (7, 7, 100))
+        self.assertEqual([error['row'] for error in job.row_errors],
+                         [4, 5, 6, 7])
+        self.assertIn('phone', job.row_errors[0]['errors'][0])
+
+        users = get_user_model().objects
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Renamed')
+        self.assertTrue(self.user.check_password('samplepwd'))
+        new = users.get(email='new1@email.com')
+        self.assertEqual((new.first_name, new.phone), ('New1', '01712345678'))
+        self.assertFalse(new.has_usable_password())
+        self.assertFalse(users.get(email='new4@email.com').is_active)
+        self.assertFalse(users.filter(email='new3@email.com').exists())
+        self.assertTrue(Profile.objects.filter(user=new).exists())
+        self.assertTrue(Token.objects.filter(user=new).exists())
+
+    def test_import_csv(self):
+        """Tests users are created and updated from a CSV file in chunks"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(self.rows)
+        self.assert_imported(self.run_import(
+            'csv', buffer.getvalue().encode()
+        ))
+
+    def test_import_xlsx(self):
+        """Tests users are created and updated from a XLSX file"""
+        workbook, buffer = Workbook(), BytesIO()
+        for row in self.rows:
+            workbook.active.append([value or None for value in row])
+        workbook.save(buffer)
+        self.assert_imported(self.run_import('xlsx', buffer.getvalue()))
+
+    def test_import_failed(self):
+        """Tests failed imports are recorded in the job"""
+        job = ImportJob(file_format='xlsx')
+        job.file.save('users.xlsx', ContentFile(b'invalid'))
+        with self.assertLogs('Core.tasks', 'ERROR'):
+            self.assertIn('failed', import_users.run(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.FAILED)
+
+
+class ArchiveTasksTest(TestCase):
+    """Test class for the admin log archive celery task"""
+
+    def setUp(self):
+        """setup log entries of different ages"""
+        self.user = sample_user()
+        content_type = ContentType.objects.get_for_model(get_user_model())
+        for days in (400, 380, 370, 10):
+            entry = LogEntry.objects.log_action(
+                self.user.pk, content_type.pk, self.user.pk, str(self.user),
+                CHANGE, f'{days} days ago'
+            )
+            LogEntry.objects.filter(pk=entry.pk).update(
+                action_time=timezone.now() - timedelta(days=days)
+            )
+
+    @override_settings(LOG_ENTRY_RETENTION_DAYS=365)
+    def test_archive_log_entries(self):
+        """Tests old entries are moved to archives in batches"""
+        self.assertIn('Archived 3', archive_log_entries.run(batch_size=2))
+        self.assertEqual(
+            list(LogEntry.objects.values_list('change_message', flat=True)),
+            ['10 days ago']
+        )
+        first, second = LogArchive.objects.order_by('first_action_time')
+        self.assertEqual((first.count, second.count), (2, 1))
+        entries = list(archived_entries(first))
+        self.assertEqual(
+            [entry['change_message'] for entry in entries],
+            ['400 days ago', '380 days ago']
+        )
+        self.assertEqual(entries[0]['user'], self.user.email)
+        self.assertEqual(entries[0]['app_label'], 'Core')
+        self.assertIn('Archived 0', archive_log_entries.run())
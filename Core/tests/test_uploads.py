@@ -0,0 +1,78 @@
+"""Core > tests > test_uploads.py"""
+# PYTHON IMPORTS
+import os
+from io import BytesIO
+# DJANGO IMPORTS
+from django.test import SimpleTestCase, override_settings
+# PLUGIN IMPORTS
+from PIL import Image
+# CORE IMPORTS
+from Core.uploads import ImageUploadHandler, UploadRejected, image_header_size
+
+
+def image_bytes(size=(100, 100), fmt='PNG'):
+    """Returns the bytes of an image"""
+    buffer = BytesIO()
+    Image.new('RGB', size, (1, 2, 3)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@override_settings(IMAGE_UPLOAD_MAX_SIZE=4096, IMAGE_UPLOAD_MAX_PIXELS=10000)
+class ImageUploadHandlerTests(SimpleTestCase):
+    """Test class for the streaming image upload handler"""
+
+    def upload(self, data, chunk_size=1024):
+        """Streams data through a new handler, returns the handler"""
+        handler = ImageUploadHandler()
+        handler.handle_raw_input(None, {}, len(data), b'boundary')
+        handler.new_file('image', 'test.png', 'image/png', None)
+        for start in range(0, len(data), chunk_size):
+            handler.receive_data_chunk(data[start:start + chunk_size], start)
+        handler.file_complete(len(data))
+        return handler
+
+    def test_header_size(self):
+        """Tests reading image sizes from headers"""
+        self.assertEqual(image_header_size(image_bytes((30, 20), 'JPEG')),
+                         ('JPEG', (30, 20)))
+        self.assertEqual(image_header_size(image_bytes((30, 20), 'GIF')),
+                         ('GIF', (30, 20)))
+        self.assertIsNone(image_header_size(image_bytes()[:10]))
+        with self.assertRaises(UploadRejected):
+            image_header_size(b'%PDF-1.4 not an image')
+
+    def test_valid_image(self):
+        """Tests a valid image is written to a temporary file"""
+        data = image_bytes()
+        handler = self.upload(data)
+        with open(handler.file.temporary_file_path(), 'rb') as file:
+            self.assertEqual(file.read(), data)
+        handler.file.close()
+
+    def test_invalid_header(self):
+        """Tests non images are rejected on the first chunk"""
+        handler = ImageUploadHandler()
+        handler.new_file('image', 'test.png', 'image/png', None)
+        path = handler.file.temporary_file_path()
+        with self.assertLogs('Core.uploads', 'WARNING'), \
+                self.assertRaises(UploadRejected):
+            handler.receive_data_chunk(b'<?php echo "image"; ?>' * 50, 0)
+        self.assertFalse(os.path.exists(path))
+
+    def test_size_limit(self):
+        """Tests files and requests over the byte limit are rejected"""
+        with self.assertLogs('Core.uploads', 'WARNING'), \
+                self.assertRaises(UploadRejected) as error:
+            self.upload(image_bytes() + b'0' * 4096)
+        self.assertIn('exceeds 4096 bytes', str(error.exception))
+        handler = ImageUploadHandler()
+        with self.assertLogs('Core.uploads', 'WARNING'), \
+                self.assertRaises(UploadRejected):
+            handler.handle_raw_input(None, {}, 10 ** 7, b'boundary')
+
+    def test_pixel_limit(self):
+        """Tests decompression bombs are rejected by their header"""
+        with self.assertLogs('Core.uploads', 'WARNING'), \
+                self.assertRaises(UploadRejected) as error:
+            self.upload(image_bytes((1000, 1000)))
+        self.assertIn('1000x1000', str(error.exception))
@@ -1,11 +1,24 @@
 """Core > tests > views > test_admin.py"""
 # PYTHON IMPORTS
+import tempfile
 from http import HTTPStatus
+from unittest.mock import patch
 # DJANGO IMPORTS
 from django.conf import settings
+from django.contrib.admin.models import ADDITION, CHANGE, LogEntry
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.formats import date_format
+from django.utils.text import capfirst
 # CORE IMPORTS
+from Core.archive import archive_log_entries
+from Core.models import ExportJob, ImportJob, LogArchive
 from Core.tests.samples import sample_user, sample_staffuser, sample_superuser
 
 
@@ -62,3 +75,174 @@ class UserListPrivateTests(TestCase):
 
         response = self.client.get(ADMIN_URL, follow=True)
         self.assertEqual(response.status_code, HTTPStatus.OK)  # 200 OK
+
+    def test_region_stats_dashboard(self):
+        """Tests the region statistics dashboard for superuser"""
+        self.client.login(email="super@email.com", password="superpass")
+
+        response = self.client.get(f"{ADMIN_URL}/Core/regionstat/")
+        self.assertEqual(response.status_code, HTTPStatus.OK)  # 200 OK
+        self.assertContains(response, 'Age Band')
+
+    def test_background_export(self):
+        """Tests user exports are queued as jobs and notified when done"""
+        self.client.login(email="super@email.com", password="superpass")
+        with patch('Core.tasks.export_users.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"{ADMIN_URL}/Core/user/export/?is_staff__exact=1",
+                {'file_format': '1'}  # XLSX
+            )
+        self.assertRedirects(response, f"{ADMIN_URL}/Core/exportjob/")
+        job = ExportJob.objects.get()
+        delay.assert_called_once_with(job.pk)
+        self.assertEqual(job.file_format, 'xlsx')
+        self.assertIsNone(job.pks)  # rebuilt by the task
+        self.assertEqual(job.query, {'is_staff__exact': ['1']})
+
+        with patch('Core.tasks.export_users.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"{ADMIN_URL}/Core/user/", {
+                'action': 'export_admin_action', 'file_format': '0',
+                '_selected_action': [self.user.pk],
+            })
+        self.assertEqual(ExportJob.objects.get(file_format='csv').pks,
+                         [self.user.pk])
+
+        with patch('Core.tasks.export_users.delay'), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"{ADMIN_URL}/Core/user/?q=staff", {
+                'action': 'export_admin_action', 'file_format': '0',
+                '_selected_action': [self.user.pk], 'select_across': '1',
+            })
+        across = ExportJob.objects.latest('pk')
+        self.assertEqual((across.pks, across.query), (None, {'q': ['staff']}))
+        ExportJob.objects.filter(pk=across.pk).delete()
+
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=ExportJob.DONE, file='exports/users.xlsx'
+        )
+        response = self.client.get(f"{ADMIN_URL}/Core/exportjob/")
+        self.assertContains(response, f"Export #{job.pk} is ready")
+        self.assertContains(response, f"/Core/exportjob/{job.pk}/download/")
+        response = self.client.get(f"{ADMIN_URL}/Core/user/")
+        self.assertNotContains(response, f"Export #{job.pk} is ready")
+
+    def test_export_download(self):
+        """Tests exported files are private and downloaded through the admin
+        by users with the export permission"""
+        private = tempfile.TemporaryDirectory()
+        self.addCleanup(private.cleanup)
+        settings_override = override_settings(PRIVATE_ROOT=private.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        job = ExportJob.objects.create(
+            file_format='csv', status=ExportJob.DONE
+        )
+        job.file.save('users.csv', ContentFile(b'email'))
+        with self.assertRaises(ValueError):  # not served as media
+            job.file.url
+        url = f"{ADMIN_URL}/Core/exportjob/{job.pk}/download/"
+
+        self.client.login(email="staff@email.com", password="staffpass")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        ExportJob.objects.filter(pk=job.pk).update(
+            requested_by=self.staffuser
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(b''.join(response.streaming_content), b'email')
+
+        self.client.login(email="super@email.com", password="superpass")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        ExportJob.objects.filter(pk=job.pk).update(file='')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_background_import(self):
+        """Tests user imports are queued as jobs and notified when done"""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.client.login(email="super@email.com", password="superpass")
+        upload = SimpleUploadedFile(
+            'users.csv', b'email,first_name\nnew@email.com,New\n'
+        )
+        with override_settings(PRIVATE_ROOT=media.name), \
+                patch('Core.tasks.import_users.delay') as delay, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"{ADMIN_URL}/Core/user/import/", {
+                'import_file': upload, 'input_format': '0',  # CSV
+            })
+        self.assertRedirects(response, f"{ADMIN_URL}/Core/importjob/")
+        job = ImportJob.objects.get()
+        delay.assert_called_once_with(job.pk)
+        self.assertEqual(job.file_format, 'csv')
+        self.assertFalse(USER_MODEL.objects.filter(
+            email='new@email.com'
+        ).exists())  # imported by the task
+
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.DONE, created=1, failed=1,
+            row_errors=[{'row': 3, 'errors': ['email: Required']}]
+        )
+        response = self.client.get(f"{ADMIN_URL}/Core/user/")
+        self.assertContains(response, f"Import #{job.pk} finished")
+        response = self.client.get(
+            f"{ADMIN_URL}/Core/importjob/{job.pk}/change/"
+        )
+        self.assertContains(response, "Row 3: email: Required")
+
+    def test_log_entry_list_queries(self):
+        """Tests log entry rows are listed with links without a query each"""
+        self.client.login(email="super@email.com", password="superpass")
+        url = f"{ADMIN_URL}/admin/logentry/"
+        content_type = ContentType.objects.get_for_model(USER_MODEL)
+        LogEntry.objects.log_action(
+            self.superuser.pk, content_type.pk, self.user.pk, str(self.user),
+            ADDITION
+        )
+        self.client.get(url)  # caches content types and sessions
+        with CaptureQueriesContext(connection) as one_row:
+            response = self.client.get(url)
+        for user in (self.user, self.superuser):
+            self.assertContains(
+                response, f'href="{ADMIN_URL}/Core/user/{user.pk}/change/"'
+            )
+        for user in (self.staffuser, self.superuser):
+            LogEntry.objects.log_action(
+                self.superuser.pk, content_type.pk, user.pk, str(user), CHANGE
+            )
+        with self.assertNumQueries(len(one_row)):
+            self.client.get(url)
+
+    def test_log_archive_view(self):
+        """Tests archived log entries are shown on the archive page"""
+        self.client.login(email="super@email.com", password="superpass")
+        content_type = ContentType.objects.get_for_model(USER_MODEL)
+        LogEntry.objects.log_action(
+            self.superuser.pk, content_type.pk, self.user.pk, str(self.user),
+            CHANGE, 'Changed phone.'
+        )
+        archive_log_entries(days=-1)
+        archive = LogArchive.objects.get()
+        response = self.client.get(f"{ADMIN_URL}/Core/logarchive/")
+        self.assertContains(response, str(archive))
+        response = self.client.get(
+            f"{ADMIN_URL}/Core/logarchive/{archive.pk}/change/"
+        )
+        self.assertContains(response, 'Changed phone.')
+
+    def test_cached_date_hierarchy(self):
+        """Tests the date drilldown is read from the daily counts unless
+        the list is filtered"""
+        self.client.login(email="super@email.com", password="superpass")
+        today = capfirst(date_format(timezone.localdate(), 'MONTH_DAY_FORMAT'))
+        response = self.client.get(f"{ADMIN_URL}/Core/user/")
+        self.assertContains(response, f"{today} (3)")
+        response = self.client.get(f"{ADMIN_URL}/Core/user/?is_staff__exact=1")
+        self.assertContains(response, today)
+        self.assertNotContains(response, f"{today} (")
+        response = self.client.get(f"{ADMIN_URL}/admin/logentry/")
+        self.assertEqual(response.status_code, HTTPStatus.OK)  # 200 OK
@@ -0,0 +1,126 @@
+"""Core > tests > views > test_media.py"""
+# PYTHON IMPORTS
+import os
+import tempfile
+from http import HTTPStatus
+# DJANGO IMPORTS
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+# DRF IMPORTS
+from rest_framework.authtoken.models import Token
+# CORE IMPORTS
+from Core.models import Profile
+from Core.tests.samples import sample_user, sample_staffuser
+from Core.tests.utils import suppress_warnings
+
+
+def get_media_url(path):
+    """Returns media url"""
+    return reverse('media', kwargs={'path': path})
+
+
+@override_settings(MEDIA_ACCEL_REDIRECT=True)
+class MediaViewTests(TestCase):
+    """Tests Media View for owners, staff and other users"""
+    def setUp(self):
+        """setup"""
+        self.user = sample_user()
+        self.otheruser = sample_user(email="other@sample.com")
+        self.staffuser = sample_staffuser()
+        self.url = get_media_url(f'Users/{self.user.pk}/photo.png')
+        self.client = Client()
+
+    def test_public_view(self):
+        """Tests that anonymous user is redirected to login"""
+        response = self.client.get(self.url)
+        self.assertRedirects(
+            response, f"{settings.LOGIN_URL}?next={self.url}",
+            fetch_redirect_response=False
+        )
+
+    def test_owner_view(self):
+        """Tests the owner gets the file from nginx with cache headers"""
+        self.client.login(email="user@sample.com", password="samplepwd")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)  # 200
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            f'/protected-media/Users/{self.user.pk}/photo.png'
+        )
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn(
+            f'max-age={settings.MEDIA_CACHE_MAX_AGE}',
+            response['Cache-Control']
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_token_view(self):
+        """Tests api clients get their files with their token"""
+        token = Token.objects.create(user=self.user)
+        response = self.client.get(
+            self.url, HTTP_AUTHORIZATION=f'Token {token.key}'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)  # 200
+
+    @suppress_warnings
+    def test_invalid_token_view(self):
+        """Tests an invalid token is denied, not redirected to login"""
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Token bad')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)  # 403
+
+    def test_staff_view(self):
+        """Tests staff can view other users' files"""
+        self.client.login(email="staff@email.com", password="staffpass")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)  # 200
+
+    @suppress_warnings
+    def test_other_user_view(self):
+        """Tests a normal user cannot view other users' files"""
+        self.client.login(email="other@sample.com", password="samplepwd")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)  # 403
+
+        self.user.is_active = False
+        self.user.save()
+        self.client.login(email="user@sample.com", password="samplepwd")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)  # 403
+
+    @suppress_warnings
+    def test_path_traversal(self):
+        """Tests paths outside the media folder are not found"""
+        self.client.login(email="staff@email.com", password="staffpass")
+        response = self.client.get(get_media_url('Users/../../settings.py'))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)  # 404
+
+    @suppress_warnings
+    def test_content_addressed_view(self):
+        """Tests owners can view their content addressed image"""
+        name = 'blobs/ab/cd/abcd.png'
+        Profile.objects.filter(user=self.user).update(image=name)
+        self.client.login(email="user@sample.com", password="samplepwd")
+        response = self.client.get(get_media_url(name))
+        self.assertEqual(response.status_code, HTTPStatus.OK)  # 200
+
+        self.client.login(email="other@sample.com", password="samplepwd")
+        response = self.client.get(get_media_url(name))
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)  # 403
+
+    def test_django_view(self):
+        """Tests files are sent by Django without nginx"""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        folder = os.path.join(media.name, 'Users', str(self.user.pk))
+        os.makedirs(folder)
+        with open(os.path.join(folder, 'photo.png'), 'wb') as file:
+            file.write(b'png')
+        self.client.login(email="user@sample.com", password="samplepwd")
+        with override_settings(MEDIA_ACCEL_REDIRECT=False,
+                               MEDIA_ROOT=media.name):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)  # 200
+        self.assertEqual(b''.join(response.streaming_content), b'png')
+        self.assertNotIn('X-Accel-Redirect', response)
@@ -0,0 +1,118 @@
+"""Core > uploads.py
+Upload handler for image uploads, streaming each file to a temporary file
+and rejecting it as soon as the request or file exceeds the byte limit, the
+first chunks are not a supported image header, or the header declares more
+pixels than allowed (decompression bombs), instead of after the whole body
+is received and buffered.
+"""
+# PYTHON IMPORTS
+import logging
+from io import BytesIO
+from sys import _getframe
+# DJANGO IMPORTS
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+# PLUGIN IMPORTS
+from PIL import Image
+
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+# leading bytes of the supported image formats, WebP: RIFF....WEBP
+SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a')
+HEADER_LIMIT = 256 * 1024  # bytes read at most to find the image size
+MULTIPART_OVERHEAD = 64 * 1024  # form fields and boundaries of a request
+
+
+class UploadRejected(MultiPartParserError):
+    """Upload stopped before it was fully received"""
+
+
+def has_image_signature(header):
+    """Tests if the first 12 bytes of a file are a supported image format"""
+    return header.startswith(SIGNATURES) or (
+        header[:4] == b'RIFF' and header[8:12] == b'WEBP'
+    )
+
+
+def image_header_size(header):
+    """Returns (format, (width, height)) of image header bytes, None while
+    more bytes are needed. Raises UploadRejected for unsupported images"""
+    if len(header) >= 12 and not has_image_signature(header[:12]):
+        raise UploadRejected('Upload a valid image')
+    try:
+        with Image.open(BytesIO(header)) as image:  # reads the header only
+            if image.format not in IMAGE_FORMATS:
+                raise UploadRejected(f'Unsupported format {image.format}')
+            return image.format, image.size
+    except Image.DecompressionBombError:
+        raise UploadRejected('Image exceeds the pixel limit')
+    except (OSError, SyntaxError, ValueError):  # truncated header
+        if len(header) >= HEADER_LIMIT:
+            raise UploadRejected('Upload a valid image')
+        return None
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Streams uploaded images to temporary files, rejecting them early
+    Limits: settings.IMAGE_UPLOAD_MAX_SIZE bytes per file (and request) and
+    settings.IMAGE_UPLOAD_MAX_PIXELS pixels per image"""
+
+    def __init__(self, request=None):
+        """init with the limits from settings"""
+        super().__init__(request)
+        self.max_size = settings.IMAGE_UPLOAD_MAX_SIZE
+        self.max_pixels = settings.IMAGE_UPLOAD_MAX_PIXELS
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        """Rejects requests declaring a body larger than the limit"""
+        if content_length > self.max_size + MULTIPART_OVERHEAD:
+            self.reject(f'Request body exceeds {self.max_size} bytes')
+
+    def new_file(self, *args, **kwargs):
+        """Starts a temporary file and header check for each file"""
+        super().new_file(*args, **kwargs)
+        self.header, self.checked = b'', False
+
+    def receive_data_chunk(self, raw_data, start):
+        """Writes a chunk after checking the size and image header"""
+        if start + len(raw_data) > self.max_size:
+            self.reject(f'File exceeds {self.max_size} bytes')
+        if not self.checked:
+            self.header += raw_data
+            self.check_header()
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        """Rejects files ending before their image header"""
+        if not self.checked:
+            self.reject('Upload a valid image')
+        return super().file_complete(file_size)
+
+    def check_header(self):
+        """Checks the image format and pixels once the header is received"""
+        try:
+            found = image_header_size(self.header)
+        except UploadRejected as e:
+            self.reject(str(e))
+        if found is None:
+            return
+        image_format, (width, height) = found
+        if width * height > self.max_pixels:
+            self.reject(
+                f'Image of {width}x{height} pixels exceeds '
+                f'{self.max_pixels} pixels'
+            )
+        self.header, self.checked = b'', True
+
+    def reject(self, reason):
+        """Removes the temporary file and stops reading the request"""
+        logger.warning(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"Rejected upload {getattr(self, 'file_name', '')}: {reason}"
+        )
+        self.upload_interrupted()
+        raise UploadRejected(reason)
@@ -0,0 +1,108 @@
+"""Core > views > media.py"""
+# PYTHON IMPORTS
+import logging
+import mimetypes
+import posixpath
+from sys import _getframe
+from urllib.parse import quote
+# DJANGO IMPORTS
+from django.conf import settings
+from django.contrib.auth.mixins import UserPassesTestMixin
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views import View
+from django.views.static import serve
+# DRF IMPORTS
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+# CORE IMPORTS
+from Core.renditions import rendition_names
+from Core.storage import BLOB_DIR
+# PROJECT IMPORTS
+from utils import test_user
+
+
+logger = logging.getLogger(__name__)
+
+
+def media_owner_names(user):
+    """Returns the media file names of a user's profile: the image and its
+    renditions, for names not under Users/<id>/ (ex: content addressed)"""
+    profile = getattr(user, 'profile', None)
+    if profile is None or not profile.image:
+        return set()
+    return {profile.image.name, *rendition_names(profile.image_renditions)}
+
+
+def api_user(request):
+    """Returns the user of the api credentials of a request, ex: the
+    Authorization token header, None without credentials
+    Sessions are authenticated by the middleware already"""
+    for authentication in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        if issubclass(authentication, SessionAuthentication):
+            continue
+        try:
+            result = authentication().authenticate(request)
+        except AuthenticationFailed as e:  # invalid or inactive token
+            raise PermissionDenied(e.detail)
+        if result is not None:
+            return result[0]
+    return None
+
+
+class MediaView(UserPassesTestMixin, View):
+    """Serves media files to their owner, staff and superusers
+    Files are delivered by nginx from settings.MEDIA_ACCEL_PREFIX with
+    X-Accel-Redirect, by Django when settings.MEDIA_ACCEL_REDIRECT is off
+    Api clients are authenticated by their token, as by the api"""
+
+    def dispatch(self, request, *args, **kwargs):
+        """Overriding to authenticate api clients without session"""
+        if not request.user.is_authenticated:
+            request.user = api_user(request) or request.user
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_path(self):
+        """Returns the normalized media path, raises Http404 outside media"""
+        path = posixpath.normpath(self.kwargs['path']).lstrip('/')
+        if path.startswith('..') or path == '.':
+            raise Http404('Media file not found')
+        return path
+
+    def test_func(self):
+        """Tests if user owns the file or is_active and is_staff/is_superuser
+        Owned files are under Users/<id>/ or the user's profile image"""
+        logger.debug(  # prints class and function name
+            f"{self.__class__.__name__}.{_getframe().f_code.co_name} "
+            f"Testing {self.request.user} access to {self.kwargs['path']}"
+        )
+        user, path = self.request.user, self.get_path()
+        if not user.is_active:
+            return False
+
+        # tests if the file belongs to the user trying to view it
+        is_owner = path.startswith(f'Users/{user.pk}/') or (
+            path.startswith(f'{BLOB_DIR}/') and path in media_owner_names(user)
+        )
+
+        return is_owner or test_user(user)
+
+    def get(self, request, path):
+        """Returns the file, delivered by nginx when enabled"""
+        path = self.get_path()
+        if settings.MEDIA_ACCEL_REDIRECT:
+            response = HttpResponse()
+            response['X-Accel-Redirect'] = \
+                f'{settings.MEDIA_ACCEL_PREFIX}{quote(path)}'
+            content_type = mimetypes.guess_type(path)[0]
+            response['Content-Type'] = content_type or \
+                'application/octet-stream'
+        else:
+            response = serve(request, path, settings.MEDIA_ROOT)
+        # private, shared caches must not serve it to other users
+        patch_cache_control(
+            response, private=True, max_age=settings.MEDIA_CACHE_MAX_AGE
+        )
+        return response
@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 # PYTHON IMPORTS
 import os
+# CELERY IMPORTS
+from celery.schedules import crontab
 # PROJECT IMPORTS
 from DJMAPS.local_settings import (
     SECRET_KEY, TEMPLATES_DIR, STATICFILES_DIR, STATIC_DIR, MEDIA_DIR,
@@ -237,6 +239,37 @@ STATICFILES_DIRS = [STATICFILES_DIR, ]  # development environment
 MEDIA_URL = '/media/'
 MEDIA_ROOT = MEDIA_DIR
 
+# media is served by Core.views.MediaView to owners and staff, the file is
+# then sent by nginx from its internal location, see examples/nginx.example
+MEDIA_ACCEL_REDIRECT = not DEBUG  # when off, Django sends the file
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 30 * 24 * 3600  # seconds, private browser cache
+
+# storage of profile images, 'Core.storage.ContentAddressedStorage' stores
+# identical images once by content hash, see the gc_blobs command
+PROFILE_IMAGE_STORAGE = os.getenv(
+    'PROFILE_IMAGE_STORAGE', 'django.core.files.storage.FileSystemStorage'
+)
+
+# private files, not served as media, ex: admin import and export job files
+PRIVATE_ROOT = os.getenv('PRIVATE_ROOT', os.path.join(BASE_DIR, 'private'))
+JOB_FILE_STORAGE = os.getenv('JOB_FILE_STORAGE', 'Core.storage.PrivateStorage')
+JOB_FILE_RETENTION_DAYS = 7  # job files are deleted after, see Core.tasks
+# admin user exports and their files need the view permission on users
+IMPORT_EXPORT_EXPORT_PERMISSION_CODE = 'view'
+
+# (width, height) of the profile image renditions generated by celery,
+# each stored as JPEG and WebP beside the original image
+IMAGE_RENDITIONS = {
+    'thumb': (64, 64),
+    'small': (160, 160),
+    'medium': (400, 400),
+}
+
+# limits of images uploaded to the api, checked while the upload is streamed
+IMAGE_UPLOAD_MAX_SIZE = 5 * 1024 * 1024  # bytes
+IMAGE_UPLOAD_MAX_PIXELS = 25000000  # width x height, ex: 5000 x 5000
+
 
 # Admin panel configuration ---------------------------------------------------
 # https://github.com/farridav/django-jazzmin
@@ -244,6 +277,10 @@ MEDIA_ROOT = MEDIA_DIR
 JAZZMIN_SETTINGS = CONFIG
 
 ADMIN_URL = 'manage'  # do not include any leading/trailing slashes
+# changelists above this many rows show the planner's estimate, not COUNT(*)
+ADMIN_COUNT_ESTIMATE_THRESHOLD = 10000
+# admin log entries older than this are moved to LogArchive, see Core.archive
+LOG_ENTRY_RETENTION_DAYS = 365
 
 
 # Logging ---------------------------------------------------------------------
@@ -278,6 +315,77 @@ CELERY_CACHE_BACKEND = os.getenv(
     'CELERY_CACHE_BACKEND', CELERY_CACHE_BACKEND
 )
 
+# https://docs.celeryproject.org/en/stable/userguide/periodic-tasks.html
+# synced into django_celery_beat's database scheduler (celery beat -S django)
+CELERY_BEAT_SCHEDULE = {
+    'rebuild-density': {
+        'task': 'Core.tasks.rebuild_density',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'refresh-region-stats': {
+        'task': 'Core.tasks.refresh_region_stats',
+        'schedule': crontab(minute='*/5'),
+    },
+    'geocode-profiles': {  # profiles changed since they were geocoded
+        'task': 'Core.tasks.geocode_profiles',
+        'schedule': crontab(minute='*/15'),
+    },
+    'archive-log-entries': {
+        'task': 'Core.tasks.archive_log_entries',
+        'schedule': crontab(hour=3, minute=30),
+    },
+    'rebuild-daily-counts': {  # after the archive, fixes cascade deletes
+        'task': 'Core.tasks.rebuild_daily_counts',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    'clean-job-files': {
+        'task': 'Core.tasks.clean_job_files',
+        'schedule': crontab(hour=4, minute=30),
+    },
+    'backup-tables-full': {
+        'task': 'Core.tasks.backup_tables',
+        'schedule': crontab(hour=1, minute=0, day_of_week=0),
+        'kwargs': {'incremental': 0},
+    },
+    'backup-tables': {
+        'task': 'Core.tasks.backup_tables',
+        'schedule': crontab(hour=1, minute=0, day_of_week='1-6'),
+    },
+    'mediabackup-full': {
+        'task': 'Core.tasks.mediabackup',
+        'schedule': crontab(hour=2, minute=0, day_of_week=0),
+        'kwargs': {'incremental': 0},
+    },
+    'mediabackup': {
+        'task': 'Core.tasks.mediabackup',
+        'schedule': crontab(hour=2, minute=0, day_of_week='1-6'),
+    },
+    'verify-backup': {
+        'task': 'Core.tasks.verify_backup',
+        'schedule': crontab(hour=1, minute=30),
+    },
+    'clean-backups': {
+        'task': 'Core.tasks.clean_backups',
+        'schedule': crontab(hour=5, minute=0),
+    },
+}
+
+
+# Geocoding -------------------------------------------------------------------
+# geocoder classes tried in order by the geocode_profiles task, the gazetteer
+# geocoder locates profiles at their thana/district/division centroid
+GEOCODERS = [
+    'Core.geocoding.GazetteerGeocoder',
+]
+
+# in-process packed R-tree of profile locations for nearest profile queries,
+# rebuilt after max age seconds (None: never) to pick up bulk updates
+SPATIAL_INDEX_ENABLED = False
+SPATIAL_INDEX_MAX_AGE = 3600
+
+# most profiles the map streams as points, larger boxes are clustered
+MAP_MAX_POINTS = 5000
+
 
 # DbBackup --------------------------------------------------------------------
 # https://django-dbbackup.readthedocs.io/
@@ -295,3 +403,28 @@ CELERY_CACHE_BACKEND = os.getenv(
 
 DBBACKUP_STORAGE = 'django.core.files.storage.FileSystemStorage'
 DBBACKUP_STORAGE_OPTIONS = {'location': 'backup/'}
+# parallel compression of the dbbackup celery task, see Core.backups
+DBBACKUP_COMPRESS_WORKERS = int(
+    os.getenv('DBBACKUP_COMPRESS_WORKERS', os.cpu_count() or 1)
+)
+DBBACKUP_COMPRESS_BLOCK_SIZE = 4 * 1024 * 1024  # bytes gzipped per worker
+
+# table backups of the backup_tables celery task, see Core.backups
+BACKUP_TABLES_DIR = 'tables'  # in the dbbackup storage
+BACKUP_APPS = ['auth', 'authtoken', 'admin', 'Core']
+BACKUP_EXCLUDE = [  # rebuilt from the other tables
+    'Core.CellDensity', 'Core.RegionDensity', 'Core.RegionStat',
+    'Core.ProfileStat', 'Core.DailyCount',
+]
+BACKUP_APPEND_ONLY = {  # tables never updated: creation time field
+    'admin.LogEntry': 'action_time', 'Core.LogArchive': 'created_at',
+}
+BACKUP_RETENTION_COUNT = 14  # runs always kept
+BACKUP_RETENTION_DAYS = 30  # runs kept by age
+
+# media backups of the mediabackup celery task, see Core.backups
+BACKUP_MEDIA_DIR = 'media'  # in the dbbackup storage
+BACKUP_MEDIA_EXCLUDE = [  # folders of MEDIA_ROOT
+    'blobs/tmp',  # uploads being saved, see Core.storage
+    'exports',  # admin export files, generated again on demand
+]
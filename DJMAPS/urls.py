@@ -15,11 +15,10 @@ Including another URLconf
 """
 # DJANGO IMPORTS
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 # CORE IMPORTS
-from Core.views import IndexView, SignupView, LoginView
+from Core.views import IndexView, SignupView, LoginView, MediaView
 
 urlpatterns = [
     # index url ---------------------------------------------------------------
@@ -46,12 +45,13 @@ urlpatterns = [
     path('api-auth/', include('rest_framework.urls')),
 ]
 
-# serve media files in development environment --------------------------------
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT
-    )
+# media files, permission checked and delivered by nginx ----------------------
+urlpatterns += [
+    path(
+        f"{settings.MEDIA_URL.strip('/')}/<path:path>", MediaView.as_view(),
+        name='media'
+    ),
+]
 
 # debug toolbar ---------------------------------------------------------------
 if settings.DEBUG:
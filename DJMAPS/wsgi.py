@@ -10,6 +10,8 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 import os
 # DJANGO IMPORTS
 from django.core.wsgi import get_wsgi_application
+# CORE IMPORTS
+from Core.autocomplete import warm_address_index
 
 
 os.environ.setdefault(
@@ -17,3 +19,4 @@ os.environ.setdefault(
 )
 
 application = get_wsgi_application()
+warm_address_index()  # before the first request